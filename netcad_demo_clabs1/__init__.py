@@ -20,7 +20,47 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
-from .designs import b1_f1
-from .designs import b1_f2
-from .designs import b2_f9
-from .plugins import containerlabs
+# =============================================================================
+# The design modules are resolved lazily, on first access, so that importing
+# this package does not import every design, device role, and profile.  The
+# `netcad.toml` design "package" values refer to the design modules as
+# attributes of this package, for example "netcad_demo_clabs1.b1_f1" resolves
+# to the module `netcad_demo_clabs1.designs.b1_f1`.  The containerlabs plugin is
+# imported by netcad using its package name in `netcad.toml`.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from importlib import import_module
+from importlib.util import find_spec
+from pkgutil import iter_modules
+from pathlib import Path
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+_DESIGNS_PACKAGE = __name__ + ".designs"
+
+
+def __getattr__(name: str):
+    """
+    Resolve the design module by name, for example "b1_f1", the first time it
+    is accessed.  The module is then stored in this package namespace so that
+    subsequent access does not come back here.
+    """
+    if name.startswith("_") or not find_spec(f"{_DESIGNS_PACKAGE}.{name}"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = design_mod = import_module(f"{_DESIGNS_PACKAGE}.{name}")
+    return design_mod
+
+
+def __dir__():
+    """include the design module names, without importing them"""
+    designs_dir = Path(__file__).parent / "designs"
+    return sorted({*globals(), *(mod.name for mod in iter_modules([str(designs_dir)]))})
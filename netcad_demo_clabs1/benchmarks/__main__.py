@@ -0,0 +1,307 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from pathlib import Path
+import json
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import click
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .pipeline import PHASES, run_benchmarks, compare_baseline
+from .importtime import measure_importtime, compare_importtime
+from .checks import CHECK_PHASES, run_check_engine
+from .memory import run_memory
+
+
+@click.group()
+def cli():
+    """netcad-demo-clabs1 benchmarks ..."""
+
+
+# -----------------------------------------------------------------------------
+#
+# benchmarks pipeline
+#
+# -----------------------------------------------------------------------------
+
+
+@cli.command("pipeline")
+@click.option(
+    "--sizes",
+    help="comma separated list of campus sizes, in floors",
+    default="10,100,1000,10000",
+    show_default=True,
+)
+@click.option("--floors-per-building", default=10, show_default=True)
+@click.option("--access-switches", default=2, show_default=True)
+@click.option(
+    "--templates-dir",
+    help="device configuration templates directory",
+    default="templates",
+    type=click.Path(path_type=Path, exists=True, file_okay=False),
+)
+@click.option("--memory/--no-memory", help="measure peak memory", default=True)
+@click.option(
+    "--baseline",
+    "baseline_file",
+    help="baseline results file to compare with",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.option(
+    "--threshold",
+    help="allowed regression ratio, compared to the baseline",
+    default=0.25,
+    show_default=True,
+)
+@click.option(
+    "--save",
+    "save_file",
+    help="save the results, for use as a baseline",
+    type=click.Path(path_type=Path, dir_okay=False),
+)
+def cli_pipeline(
+    sizes: str,
+    floors_per_building: int,
+    access_switches: int,
+    templates_dir: Path,
+    memory: bool,
+    baseline_file: Path,
+    threshold: float,
+    save_file: Path,
+):
+    """
+    Benchmark the design pipeline using a synthetic campus.
+    """
+    results = run_benchmarks(
+        [int(size) for size in sizes.split(",")],
+        memory=memory,
+        floors_per_building=floors_per_building,
+        access_switches=access_switches,
+        templates_dir=templates_dir,
+    )
+
+    columns = [*PHASES, "total"]
+    print(f"{'floors':>8} " + " ".join(f"{col:>22}" for col in columns) + " mem/floor")
+
+    for size, size_results in results.items():
+        per_floor = size_results["per_floor_ms"]
+        print(
+            f"{size:>8} "
+            + " ".join(f"{per_floor[col]:>19.3f} ms" for col in columns)
+            + f" {size_results.get('per_floor_memory_bytes', '-')}"
+        )
+
+    if save_file:
+        save_file.write_text(json.dumps(results, indent=3))
+        print(f"SAVE: {save_file}")
+
+    if not baseline_file:
+        return
+
+    baseline = json.loads(baseline_file.read_text())
+    if regressions := compare_baseline(results, baseline, threshold=threshold):
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        raise click.ClickException(f"{len(regressions)} regression(s) found")
+
+    print(f"No regressions, compared to baseline {baseline_file}")
+
+
+# -----------------------------------------------------------------------------
+#
+# benchmarks importtime
+#
+# -----------------------------------------------------------------------------
+
+
+@cli.command("importtime")
+@click.option(
+    "--statement",
+    help="the Python statement that is timed",
+    default="import netcad_demo_clabs1",
+    show_default=True,
+)
+@click.option("--repeat", default=5, show_default=True)
+@click.option("--top", help="number of slowest modules to show", default=15)
+@click.option(
+    "--baseline",
+    "baseline_file",
+    help="baseline results file to compare with",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.option(
+    "--threshold",
+    help="allowed regression ratio, compared to the baseline",
+    default=0.25,
+    show_default=True,
+)
+@click.option(
+    "--save",
+    "save_file",
+    help="save the results, for use as a baseline",
+    type=click.Path(path_type=Path, dir_okay=False),
+)
+def cli_importtime(
+    statement: str,
+    repeat: int,
+    top: int,
+    baseline_file: Path,
+    threshold: float,
+    save_file: Path,
+):
+    """
+    Benchmark the import time, which is the bulk of the CLI startup latency.
+    """
+    total_us, modules = measure_importtime(statement, repeat=repeat)
+
+    for module, cumulative in sorted(modules.items(), key=lambda i: -i[1])[:top]:
+        print(f"{cumulative:>10} us  {module}")
+
+    print(f"{total_us:>10} us  TOTAL: {statement}")
+
+    if save_file:
+        save_file.write_text(
+            json.dumps(dict(statement=statement, total_us=total_us, modules=modules))
+        )
+        print(f"SAVE: {save_file}")
+
+    if not baseline_file:
+        return
+
+    baseline = json.loads(baseline_file.read_text())
+    if regressions := compare_importtime(total_us, baseline["total_us"], threshold):
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        raise click.ClickException(f"{len(regressions)} regression(s) found")
+
+    print(f"No regressions, compared to baseline {baseline_file}")
+
+
+# -----------------------------------------------------------------------------
+#
+# benchmarks checks
+#
+# -----------------------------------------------------------------------------
+
+
+@cli.command("checks")
+@click.option(
+    "--sizes",
+    help="comma separated list of campus sizes, in interfaces",
+    default="1000,10000,100000",
+    show_default=True,
+)
+@click.option("--ports", help="interfaces per device", default=48, show_default=True)
+@click.option(
+    "--fail-ratio",
+    help="fraction of interfaces that fail their check",
+    default=0.01,
+    show_default=True,
+)
+def cli_checks(sizes: str, ports: int, fail_ratio: float):
+    """
+    Benchmark the offline check engine using a synthetic campus.
+    """
+    print(
+        f"{'interfaces':>10} {'rows':>10} {'failed':>8} "
+        + " ".join(f"{col:>16}" for col in CHECK_PHASES)
+    )
+
+    for size in sizes.split(","):
+        results = run_check_engine(int(size), ports=ports, fail_ratio=fail_ratio)
+        print(
+            f"{results['interfaces']:>10} {results['rows']:>10} {results['failed']:>8} "
+            + " ".join(f"{results[col] * 1_000:>13.1f} ms" for col in CHECK_PHASES)
+        )
+
+
+# -----------------------------------------------------------------------------
+#
+# benchmarks memory
+#
+# -----------------------------------------------------------------------------
+
+
+@cli.command("memory")
+@click.option(
+    "--interfaces",
+    help="campus size, in interfaces",
+    default=100_000,
+    show_default=True,
+)
+@click.option("--floors-per-building", default=10, show_default=True)
+@click.option("--access-switches", default=2, show_default=True)
+@click.option("--top", help="number of largest source files to show", default=10)
+@click.option(
+    "--save",
+    "save_file",
+    help="save the results",
+    type=click.Path(path_type=Path, dir_okay=False),
+)
+def cli_memory(
+    interfaces: int,
+    floors_per_building: int,
+    access_switches: int,
+    top: int,
+    save_file: Path,
+):
+    """
+    Benchmark the memory of the design objects using a synthetic campus.
+    """
+    results = run_memory(
+        interfaces,
+        floors_per_building=floors_per_building,
+        access_switches=access_switches,
+        top=top,
+    )
+
+    for filename, size in results["top_files"]:
+        print(f"{size:>12} B  {filename}")
+
+    print(
+        f"{results['floors']} floors, {results['devices']} devices, "
+        f"{results['interfaces']} interfaces, {results['profiles']} profiles"
+    )
+    print(
+        f"{results['bytes']:>12} B  TOTAL\n"
+        f"{results['bytes_per_device']:>12} B  per device\n"
+        f"{results['bytes_per_interface']:>12} B  per interface"
+    )
+
+    if save_file:
+        save_file.write_text(json.dumps(results, indent=3))
+        print(f"SAVE: {save_file}")
+
+
+if __name__ == "__main__":
+    cli()
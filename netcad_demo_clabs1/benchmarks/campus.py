@@ -0,0 +1,160 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the synthetic campus generator.  The campus is comprised
+# of N buildings x M floors; each floor is a standard floor design with K
+# access switches, built using the same device roles as the User designs.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Iterator
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "iter_campus_designs",
+    "create_floor_design",
+    "CAMPUS_OOB_PREFIX",
+    "CAMPUS_SITE_CONFIG",
+    "CAMPUS_CORE_DEVICE_TYPE",
+]
+
+# the synthetic campus OOB network; a /12 has room for 65,536 floors using the
+# default /28 management subnet per floor.
+
+CAMPUS_OOB_PREFIX = "172.16.0.0/12"
+
+# the synthetic campus core switch device type; 128 ports has room for 64
+# access switches per floor, using two uplinks each.
+
+CAMPUS_CORE_DEVICE_TYPE = "cEOS-128"
+
+# the synthetic campus VLAN supernets; a /12 per VLAN role carved into a /22
+# per building and a /26 per floor has room for 1,024 buildings of 16 floors.
+
+CAMPUS_SITE_CONFIG = dict(
+    site_supernets={
+        "Phones": "10.16.0.0/12",
+        "Printers": "10.32.0.0/12",
+        "IPTV": "10.48.0.0/12",
+        "WIFI_Employee": "10.64.0.0/12",
+        "Employee_Desk": "10.80.0.0/12",
+        "WIFI_Visitor": "10.96.0.0/12",
+        "Inband_MGMT": "10.112.0.0/12",
+    },
+    site_building_prefixlen=22,
+    site_floor_prefixlen=26,
+)
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def create_floor_design(
+    net_id: int, bld_id: int, flr_id: int, access_switches: int = 2
+) -> Design:
+    """
+    Create the design instance for a synthetic building-floor.  The design is
+    configured in the same manner as a design in the `netcad.toml` file, but is
+    not yet built; see `create_std_design`.
+
+    Parameters
+    ----------
+    net_id: int
+        The network Id value of the floor, unique across the campus.
+
+    bld_id: int
+        The building Id value.
+
+    flr_id: int
+        The floor Id value, within the building.
+
+    access_switches: int
+        The number of access switches on the floor.
+
+    Returns
+    -------
+    Design
+        The design instance, configured but not built.
+    """
+    return Design(
+        name=f"b{bld_id}.f{flr_id}",
+        config=dict(
+            net_id=net_id,
+            building=bld_id,
+            floor=flr_id,
+            access_switches=access_switches,
+            core_device_type=CAMPUS_CORE_DEVICE_TYPE,
+            oob_prefix=CAMPUS_OOB_PREFIX,
+            **CAMPUS_SITE_CONFIG,
+        ),
+    )
+
+
+def iter_campus_designs(
+    floors: int, floors_per_building: int = 10, access_switches: int = 2
+) -> Iterator[Design]:
+    """
+    Yields the design instances for a synthetic campus of the given number of
+    floors.  The floors are numbered within each building, and the buildings
+    are added as needed.
+
+    Parameters
+    ----------
+    floors: int
+        The total number of floors in the campus.
+
+    floors_per_building: int
+        The number of floors in each building.
+
+    access_switches: int
+        The number of access switches on each floor.
+
+    Yields
+    ------
+    Design
+        The design instance for each floor, configured but not built.
+    """
+    for floor_idx in range(floors):
+        bld_id, flr_id = divmod(floor_idx, floors_per_building)
+        yield create_floor_design(
+            net_id=floor_idx + 1,
+            bld_id=bld_id + 1,
+            flr_id=flr_id + 1,
+            access_switches=access_switches,
+        )
@@ -0,0 +1,192 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the offline check engine benchmark.  The checks, and the
+# device state snapshot, of a synthetic campus of access switches are created
+# in memory, a fraction of the device state is changed so that some checks
+# fail, and then the checks are evaluated.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List
+from time import perf_counter
+import json
+import random
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ..check_engine import (
+    CheckTable,
+    DeviceState,
+    evaluate_device,
+    expected_device_state,
+)
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["CHECK_PHASES", "synthetic_device_checks", "run_check_engine"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+CHECK_PHASES = ("load_snapshot", "evaluate")
+
+_VLANS = [
+    dict(name="Employee_Desk", vlan_id=200, description="For Employee Desk ports"),
+    dict(name="WIFI_Employee", vlan_id=300, description="For SSID Employee Wifi"),
+    dict(name="WIFI_Visitor", vlan_id=301, description="For SSID Visitor Wifi"),
+]
+
+
+def synthetic_device_checks(hostname: str, ports: int = 48) -> List[dict]:
+    """
+    Returns the interfaces, switchports, and vlans check collections of a
+    synthetic access switch; the last two ports are the uplinks.
+    """
+    if_names = [f"Ethernet{port}" for port in range(1, ports + 1)]
+    access, uplinks = if_names[:-2], if_names[-2:]
+
+    interfaces = [
+        dict(
+            check_type=None,
+            check_params=dict(interface=if_name, interface_flags={}),
+            expected_results=dict(
+                used=True, oper_up=True, desc=f"{hostname}-{if_name}", speed=None
+            ),
+        )
+        for if_name in if_names
+    ]
+
+    switchports = [
+        dict(
+            check_type="switchport",
+            check_params=dict(if_name=if_name),
+            expected_results=dict(switchport_mode="access", vlan=_VLANS[0]),
+        )
+        for if_name in access
+    ] + [
+        dict(
+            check_type="switchport",
+            check_params=dict(if_name=if_name),
+            expected_results=dict(
+                switchport_mode="trunk", native_vlan=None, trunk_allowed_vlans=_VLANS
+            ),
+        )
+        for if_name in uplinks
+    ]
+
+    vlans = [
+        dict(
+            check_type="interfaces",
+            check_params=dict(vlan_id=vlan["vlan_id"]),
+            expected_results=dict(
+                vlan=vlan, interfaces=(access if idx == 0 else []) + uplinks
+            ),
+        )
+        for idx, vlan in enumerate(_VLANS)
+    ]
+
+    return [
+        dict(name="interfaces", device=hostname, exclusive=True, checks=interfaces),
+        dict(name="switchports", device=hostname, exclusive=True, checks=switchports),
+        dict(name="vlans", device=hostname, exclusive=False, checks=vlans),
+    ]
+
+
+def run_check_engine(
+    interfaces: int, ports: int = 48, fail_ratio: float = 0.01, seed: int = 0
+) -> Dict[str, float]:
+    """
+    Evaluate the checks of a synthetic campus with the given total number of
+    interfaces.
+
+    Parameters
+    ----------
+    interfaces: int
+        The total number of interfaces, rounded up to whole devices.
+
+    ports: int
+        The number of interfaces of each device.
+
+    fail_ratio: float
+        The fraction of the interfaces whose description is changed in the
+        device state, so that the check fails.
+
+    seed: int
+        The random seed used to select the changed interfaces.
+
+    Returns
+    -------
+    dict
+        The time of each phase, in seconds, and the row counts of the results.
+    """
+    rand = random.Random(seed)
+    devices = -(-interfaces // ports)
+
+    campus = dict()
+    for dev_id in range(devices):
+        hostname = f"acc{dev_id:05}.1"
+        collections = synthetic_device_checks(hostname, ports=ports)
+        state = expected_device_state(collections)
+
+        for if_name, record in state["interfaces"].items():
+            if rand.random() < fail_ratio:
+                record["desc"] = "changed"
+
+        campus[hostname] = (collections, json.dumps(state))
+
+    # the snapshot files are parsed as part of the benchmark, since that is
+    # part of the offline evaluation.
+
+    ts_start = perf_counter()
+    states = {
+        hostname: DeviceState(json.loads(snapshot))
+        for hostname, (_, snapshot) in campus.items()
+    }
+    ts_loaded = perf_counter()
+
+    table = CheckTable()
+    for hostname, (collections, _) in campus.items():
+        evaluate_device(table, collections, states[hostname])
+
+    ts_done = perf_counter()
+
+    return dict(
+        devices=devices,
+        interfaces=devices * ports,
+        rows=len(table),
+        failed=table.columns["passed"].count(False),
+        load_snapshot=ts_loaded - ts_start,
+        evaluate=ts_done - ts_loaded,
+    )
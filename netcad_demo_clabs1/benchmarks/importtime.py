@@ -0,0 +1,160 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the import-time benchmark, used to track the CLI startup
+# latency.  The import is run in a fresh Python interpreter with the
+# "-X importtime" option, and the report that Python writes to stderr is
+# parsed to obtain the cumulative import time of each module.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Tuple
+from time import perf_counter
+import subprocess
+import sys
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["measure_importtime", "compare_importtime"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def measure_importtime(statement: str, repeat: int = 5) -> Tuple[int, Dict[str, int]]:
+    """
+    Run the import statement in a fresh interpreter, using "-X importtime", and
+    return the cumulative import time of each module.  The statement is run
+    `repeat` times and the minimum time is kept, which reduces the noise from
+    the OS.
+
+    Parameters
+    ----------
+    statement: str
+        The Python statement to run, for example "import netcad_demo_clabs1".
+
+    repeat: int
+        The number of times to run the statement.
+
+    Returns
+    -------
+    tuple
+        The total time, in microseconds, to run the statement; that is the
+        interpreter run time less the run time of an empty interpreter.  And
+        the cumulative import time, in microseconds, by module name.
+    """
+    modules: Dict[str, int] = dict()
+    run_us, empty_us = list(), list()
+
+    for _ in range(repeat):
+        empty_us.append(_run_python(["-c", "pass"])[0])
+
+        elapsed_us, proc = _run_python(["-X", "importtime", "-c", statement])
+        run_us.append(elapsed_us)
+
+        for module, cumulative in _parse_importtime(proc.stderr):
+            modules[module] = min(modules.get(module, cumulative), cumulative)
+
+    return max(min(run_us) - min(empty_us), 0), modules
+
+
+def compare_importtime(total_us: int, baseline_us: int, threshold: float) -> List[str]:
+    """
+    Compare the total import time to the baseline.
+
+    Parameters
+    ----------
+    total_us: int
+        The current total import time, in microseconds.
+
+    baseline_us: int
+        The baseline total import time, in microseconds.
+
+    threshold: float
+        The allowed regression ratio; for example 0.25 allows the current value
+        to be up to 25% greater than the baseline value.
+
+    Returns
+    -------
+    List[str]
+        The description of the regression; empty if there is none.
+    """
+    if total_us > baseline_us * (1 + threshold):
+        return [f"import time: {total_us} us, baseline {baseline_us} us"]
+
+    return []
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _run_python(args: List[str]) -> Tuple[int, subprocess.CompletedProcess]:
+    """run a fresh interpreter, returns the elapsed microseconds and process"""
+    ts_start = perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    return int((perf_counter() - ts_start) * 1_000_000), proc
+
+
+def _parse_importtime(report: str) -> List[Tuple[str, int]]:
+    """
+    Parse the "-X importtime" report lines, for example:
+
+        import time: self [us] | cumulative | imported package
+        import time:       321 |        654 | netcad_demo_clabs1
+
+    Returns
+    -------
+    List[Tuple[str, int]]
+        The (module-name, cumulative-us) values.
+    """
+    results = list()
+
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        try:
+            _, cumulative, module = line.split(":", 1)[1].split("|")
+            results.append((module.strip(), int(cumulative)))
+        except ValueError:
+            # the header line
+            continue
+
+    return results
@@ -0,0 +1,169 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+# =============================================================================
+# This file contains the design memory benchmark.  A synthetic campus is built,
+# floor by floor, until it has the requested number of interfaces; the memory
+# allocated for the campus designs is measured using tracemalloc, and reported
+# per device and per interface.  The source files that allocated the most
+# memory are reported so that the largest per-object costs can be found.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Tuple
+import gc
+import tracemalloc
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ..designs.std_design import create_std_design
+from .campus import iter_campus_designs
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["run_memory"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def run_memory(
+    interfaces: int = 100_000,
+    floors_per_building: int = 10,
+    access_switches: int = 2,
+    top: int = 10,
+) -> dict:
+    """
+    Build a synthetic campus with at least the given number of interfaces, and
+    measure the memory allocated for the designs.  All of the designs are
+    retained until the campus is complete, as they would be when the campus is
+    built in a single process.
+
+    Parameters
+    ----------
+    interfaces: int
+        The number of interfaces in the campus, rounded up to whole floors.
+
+    floors_per_building: int
+        The number of floors in each building.
+
+    access_switches: int
+        The number of access switches on each floor.
+
+    top: int
+        The number of source files reported, that allocated the most memory.
+
+    Returns
+    -------
+    dict
+        The campus counts, the memory allocated in bytes, the bytes per device
+        and per interface, and the bytes allocated by the top source files.
+    """
+    campus = list()
+    counts = dict(floors=0, devices=0, interfaces=0, profiles=0)
+
+    # the designs are generated without a floor limit; the campus is complete
+    # once the requested number of interfaces is reached.
+
+    designs = iter_campus_designs(
+        interfaces,
+        floors_per_building=floors_per_building,
+        access_switches=access_switches,
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    snapshot_start = tracemalloc.take_snapshot()
+
+    while counts["interfaces"] < interfaces:
+        design = next(designs)
+        create_std_design(design)
+        campus.append(design)
+        _count_design(design, counts)
+
+    gc.collect()
+    snapshot_done = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated, by_file = _snapshot_diff(snapshot_start, snapshot_done)
+
+    return dict(
+        counts,
+        bytes=allocated,
+        bytes_per_device=allocated // counts["devices"],
+        bytes_per_interface=allocated // counts["interfaces"],
+        top_files=by_file[:top],
+    )
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _count_design(design, counts: Dict[str, int]):
+    """add the device, interface, and interface profile counts of the design"""
+    counts["floors"] += 1
+
+    for dev_obj in design.devices.values():
+        counts["devices"] += 1
+        counts["interfaces"] += len(dev_obj.interfaces)
+        counts["profiles"] += sum(
+            1 for iface in dev_obj.interfaces.values() if iface.profile is not None
+        )
+
+
+def _snapshot_diff(
+    snapshot_start: tracemalloc.Snapshot, snapshot_done: tracemalloc.Snapshot
+) -> Tuple[int, List[Tuple[str, int]]]:
+    """
+    Returns the bytes allocated between the snapshots, and the bytes allocated
+    by each source file, largest first; the tracemalloc allocations are not
+    included.
+    """
+    exclude = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = snapshot_done.filter_traces(exclude).compare_to(
+        snapshot_start.filter_traces(exclude), "filename"
+    )
+
+    by_file = sorted(
+        (
+            (stat.traceback[0].filename, stat.size_diff)
+            for stat in stats
+            if stat.size_diff > 0
+        ),
+        key=lambda item: -item[1],
+    )
+
+    return sum(stat.size_diff for stat in stats), by_file
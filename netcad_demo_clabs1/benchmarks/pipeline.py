@@ -0,0 +1,254 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the design pipeline benchmark.  A synthetic campus is
+# built and rendered, and the time spent in each pipeline phase is recorded,
+# along with the peak memory used.  The results can be stored as a baseline,
+# and later runs compared to the baseline to detect regressions.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Sequence, Optional
+from pathlib import Path
+from time import perf_counter
+import tracemalloc
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ..designs.std_design import create_std_design, set_vlan_interfaces
+from ..design_update import update_design
+from ..interface_index import build_interface_index
+from ..plugins.containerlabs.clabs_jinja2 import get_config_j2env, get_template
+from ..plugins.containerlabs.clabs_topology import render_topology_chunks
+from ..plugins.containerlabs.consts import DEFAULT_TOPOLOGY_TEMPLATE
+from .campus import iter_campus_designs
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["PHASES", "run_pipeline", "run_benchmarks", "compare_baseline"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+PHASES = (
+    "create_std_design",
+    "create_vlan_interfaces",
+    "interface_index",
+    "render_topology",
+    "render_configs",
+)
+
+
+def run_pipeline(
+    floors: int,
+    floors_per_building: int = 10,
+    access_switches: int = 2,
+    templates_dir: Path = Path("templates"),
+) -> Dict[str, float]:
+    """
+    Build and render a synthetic campus of the given number of floors.  All of
+    the designs are retained until the campus is complete, as they would be
+    when the campus is built in a single process.
+
+    Parameters
+    ----------
+    floors: int
+        The number of floors in the campus.
+
+    floors_per_building: int
+        The number of floors in each building.
+
+    access_switches: int
+        The number of access switches on each floor.
+
+    templates_dir: Path
+        The directory of the device configuration templates.
+
+    Returns
+    -------
+    Dict[str, float]
+        The total seconds spent in each of the pipeline phases.
+    """
+    timings = dict.fromkeys(PHASES, 0.0)
+    topo_template = get_template(DEFAULT_TOPOLOGY_TEMPLATE)
+    config_env = get_config_j2env(templates_dir)
+    campus = list()
+
+    for design in iter_campus_designs(
+        floors, floors_per_building=floors_per_building, access_switches=access_switches
+    ):
+        ts_start = perf_counter()
+        create_std_design(design)
+        ts_design = perf_counter()
+
+        # the designs that add variances, such as b1_f1, invoke the SVI
+        # creation again; measure the cost of that re-invocation.
+
+        set_vlan_interfaces(design)
+        update_design(design, reason="vlan_interfaces")
+        ts_vlans = perf_counter()
+
+        build_interface_index(design)
+        ts_index = perf_counter()
+
+        for _ in render_topology_chunks(topo_template, design, "br-dummy"):
+            pass
+        ts_topo = perf_counter()
+
+        for dev_obj in design.devices.values():
+            if dev_obj.is_pseudo:
+                continue
+            config_env.get_template(str(dev_obj.template)).render(device=dev_obj)
+        ts_configs = perf_counter()
+
+        timings["create_std_design"] += ts_design - ts_start
+        timings["create_vlan_interfaces"] += ts_vlans - ts_design
+        timings["interface_index"] += ts_index - ts_vlans
+        timings["render_topology"] += ts_topo - ts_index
+        timings["render_configs"] += ts_configs - ts_topo
+
+        campus.append(design)
+
+    return timings
+
+
+def run_benchmarks(
+    sizes: Sequence[int], memory: bool = True, **pipeline_kwargs
+) -> dict:
+    """
+    Run the pipeline benchmark for each of the campus sizes.
+
+    Parameters
+    ----------
+    sizes: Sequence[int]
+        The campus sizes, in floors.
+
+    memory: bool
+        When True, the pipeline is run a second time with tracemalloc enabled
+        to measure the peak memory.  This is a separate run since tracemalloc
+        slows down the pipeline.
+
+    Other Parameters
+    ----------------
+    See `run_pipeline`.
+
+    Returns
+    -------
+    dict
+        The results, by campus size, that can be stored as a baseline.
+    """
+    results = dict()
+
+    for floors in sizes:
+        timings = run_pipeline(floors, **pipeline_kwargs)
+        total = sum(timings.values())
+
+        size_results = dict(
+            floors=floors,
+            seconds=dict(timings, total=total),
+            per_floor_ms={
+                phase: secs * 1_000 / floors
+                for phase, secs in dict(timings, total=total).items()
+            },
+        )
+
+        if memory:
+            tracemalloc.start()
+            run_pipeline(floors, **pipeline_kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            size_results["peak_memory_bytes"] = peak
+            size_results["per_floor_memory_bytes"] = peak // floors
+
+        results[str(floors)] = size_results
+
+    return results
+
+
+def compare_baseline(
+    results: dict, baseline: dict, threshold: float, min_ms: Optional[float] = 0.01
+) -> List[str]:
+    """
+    Compare the benchmark results to the baseline results.  The per-floor
+    time of each phase, and the per-floor memory, are compared for each campus
+    size that is in both.
+
+    Parameters
+    ----------
+    results: dict
+        The current results, from `run_benchmarks`.
+
+    baseline: dict
+        The baseline results, from a prior `run_benchmarks`.
+
+    threshold: float
+        The allowed regression ratio; for example 0.25 allows the current value
+        to be up to 25% greater than the baseline value.
+
+    min_ms: float, optional
+        The per-floor phase times less than this value, in milliseconds, are
+        not compared since they are dominated by timer noise.
+
+    Returns
+    -------
+    List[str]
+        The description of each regression found; empty if there are none.
+    """
+    regressions = list()
+
+    for size, cur in results.items():
+        if not (base := baseline.get(size)):
+            continue
+
+        for phase, cur_ms in cur["per_floor_ms"].items():
+            base_ms = base["per_floor_ms"].get(phase)
+            if base_ms is None or base_ms < min_ms:
+                continue
+
+            if cur_ms > base_ms * (1 + threshold):
+                regressions.append(
+                    f"{size} floors: {phase}: {cur_ms:.3f} ms/floor, "
+                    f"baseline {base_ms:.3f} ms/floor"
+                )
+
+        cur_mem = cur.get("per_floor_memory_bytes")
+        base_mem = base.get("per_floor_memory_bytes")
+
+        if cur_mem and base_mem and cur_mem > base_mem * (1 + threshold):
+            regressions.append(
+                f"{size} floors: memory: {cur_mem} bytes/floor, "
+                f"baseline {base_mem} bytes/floor"
+            )
+
+    return regressions
@@ -0,0 +1,462 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the offline check engine.  The generated checks are
+# evaluated against a snapshot of the device state, captured into local JSON
+# files, rather than against the live devices.  The snapshot is a file per
+# device, `<snapshot-dir>/<hostname>.json`:
+#
+#   {
+#     "interfaces": {"Ethernet1": {"used": true, "oper_up": true,
+#                                  "desc": "acc01.11-et7", "speed": 1000}},
+#     "switchports": {"Ethernet1": {"switchport_mode": "trunk",
+#                                   "native_vlan": 411,
+#                                   "trunk_allowed_vlans": [300, 301]},
+#                     "Ethernet2": {"switchport_mode": "access", "vlan": 200}},
+#     "vlans": {"200": {"name": "Employee_Desk",
+#                       "interfaces": ["Ethernet3", "Vlan200"]}},
+#     "ipaddrs": {"Management0": {"if_ipaddr": "172.20.20.2/24"}},
+#     "cabling": {"Ethernet1": {"device": "acc01.11", "port_id": "Ethernet7"}}
+#   }
+#
+# The checks are evaluated in batches rather than one at a time: the checks of
+# the same kind in a collection are turned into columns, one per expected
+# field, the measured values are looked up in the indexed snapshot in one pass,
+# and then each expected column is compared to its measured column.  An
+# expected value of null, for example the interface "speed", is not checked.
+#
+# The result is a pass/fail table with a row per check field.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+import json
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .check_storage import CheckStorageError, load_check_collection
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "CheckTable",
+    "DeviceState",
+    "CHECK_KINDS",
+    "check_kind_name",
+    "evaluate_collection",
+    "evaluate_device",
+    "iter_device_checks",
+    "load_snapshot",
+    "expected_device_state",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class CheckTable:
+    """
+    The pass/fail table of the evaluated checks, stored as columns.
+
+    Attributes
+    ----------
+    columns: Dict[str, list]
+        The column values, by the column name; see COLUMNS.
+
+    skipped: Dict[Tuple[str, str], int]
+        The number of checks not evaluated, by (device, collection); the checks
+        of a kind that the engine does not support.
+    """
+
+    COLUMNS = ("device", "collection", "check", "field", "expected", "measured")
+
+    def __init__(self):
+        self.columns: Dict[str, list] = {name: list() for name in self.COLUMNS}
+        self.columns["passed"] = list()
+        self.skipped: Dict[Tuple[str, str], int] = dict()
+
+    def __len__(self):
+        return len(self.columns["passed"])
+
+    def extend(
+        self,
+        device: str,
+        collection: str,
+        field: str,
+        checks: List[str],
+        expected: list,
+        measured: list,
+    ):
+        """
+        Add the rows of a field comparison; the expected and measured columns
+        are compared element by element.
+        """
+        cols = self.columns
+        count = len(checks)
+
+        cols["device"].extend([device] * count)
+        cols["collection"].extend([collection] * count)
+        cols["field"].extend([field] * count)
+        cols["check"].extend(checks)
+        cols["expected"].extend(expected)
+        cols["measured"].extend(measured)
+        cols["passed"].extend(map(_equals, expected, measured))
+
+    def rows(self, failed_only: bool = False) -> Iterator[dict]:
+        """yields each row as a dict, optionally only the failed rows"""
+        names = list(self.columns)
+
+        for row in zip(*self.columns.values()):
+            if failed_only and row[-1]:
+                continue
+            yield dict(zip(names, row))
+
+    def summary(self) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """returns the (passed, failed) row counts, by (device, collection)"""
+        counts: Dict[Tuple[str, str], List[int]] = dict()
+        cols = self.columns
+
+        for device, collection, passed in zip(
+            cols["device"], cols["collection"], cols["passed"]
+        ):
+            counts.setdefault((device, collection), [0, 0])[0 if passed else 1] += 1
+
+        return {key: (passed, failed) for key, (passed, failed) in counts.items()}
+
+
+class DeviceState:
+    """
+    The snapshot of a device state, indexed by interface and VLAN.
+
+    Attributes
+    ----------
+    sections: Dict[str, dict]
+        The state records, by section name and then key; for example
+        `sections["vlans"][200]`.
+    """
+
+    def __init__(self, data: dict):
+        self.sections: Dict[str, dict] = {
+            name: dict(records) for name, records in data.items()
+        }
+
+        # JSON object keys are strings; the VLANs are indexed by VLAN-ID.
+
+        if vlans := self.sections.get("vlans"):
+            self.sections["vlans"] = {int(key): value for key, value in vlans.items()}
+
+    @classmethod
+    def load(cls, filepath: Path) -> "DeviceState":
+        """returns the device state from the snapshot file"""
+        return cls(json.loads(Path(filepath).read_text()))
+
+
+class _CheckKind:
+    """
+    The evaluation of a kind of check.
+
+    Attributes
+    ----------
+    section: str
+        The device state section that is measured.
+
+    key: Callable
+        Returns the section key from the check params.
+
+    expected: Callable
+        Returns the expected fields from the check expected results.
+
+    measured: Callable
+        Returns the measured fields from the device state record.
+    """
+
+    def __init__(
+        self,
+        section: str,
+        key: Callable[[dict], object],
+        expected: Callable[[dict], dict],
+        measured: Callable[[dict], dict] = dict,
+    ):
+        self.section = section
+        self.key = key
+        self.expected = expected
+        self.measured = measured
+
+
+def _vlan_id(vlan) -> Optional[int]:
+    return vlan["vlan_id"] if isinstance(vlan, dict) else vlan
+
+
+def _vlan_ids(vlans) -> Optional[tuple]:
+    return None if vlans is None else tuple(sorted(map(_vlan_id, vlans)))
+
+
+def _switchport_fields(record: dict) -> dict:
+    fields = dict(record)
+    for name in ("vlan", "native_vlan"):
+        if name in fields:
+            fields[name] = _vlan_id(fields[name])
+    if "trunk_allowed_vlans" in fields:
+        fields["trunk_allowed_vlans"] = _vlan_ids(fields["trunk_allowed_vlans"])
+    return fields
+
+
+def _vlan_fields(record: dict) -> dict:
+    return dict(
+        name=(record.get("vlan") or {}).get("name", record.get("name")),
+        interfaces=tuple(sorted(record.get("interfaces", ()))),
+    )
+
+
+# the kinds of checks that are evaluated, by kind name; the kind of a check is
+# its collection name, other than the "switchport" check type, which is also
+# used in the "cabling" collection.
+
+CHECK_KINDS: Dict[str, _CheckKind] = {
+    "interfaces": _CheckKind(
+        section="interfaces",
+        key=lambda params: params["interface"],
+        expected=dict,
+    ),
+    "switchports": _CheckKind(
+        section="switchports",
+        key=lambda params: params["if_name"],
+        expected=_switchport_fields,
+        measured=_switchport_fields,
+    ),
+    "vlans": _CheckKind(
+        section="vlans",
+        key=lambda params: params["vlan_id"],
+        expected=_vlan_fields,
+        measured=_vlan_fields,
+    ),
+    "ipaddrs": _CheckKind(
+        section="ipaddrs",
+        key=lambda params: params["if_name"],
+        expected=dict,
+    ),
+    "cabling": _CheckKind(
+        section="cabling",
+        key=lambda params: params["interface"],
+        expected=dict,
+    ),
+}
+
+
+def check_kind_name(collection_name: str, check: dict) -> str:
+    """returns the kind name of the check in the named collection"""
+    return "switchports" if check["check_type"] == "switchport" else collection_name
+
+
+def evaluate_collection(table: CheckTable, collection: dict, state: DeviceState):
+    """
+    Evaluate the checks of the collection against the device state, adding
+    the results to the table.
+
+    Parameters
+    ----------
+    table: CheckTable
+        The results table.
+
+    collection: dict
+        The check collection, as stored in the netcad JSON check file.
+
+    state: DeviceState
+        The device state snapshot.
+    """
+    device, name = collection["device"], collection["name"]
+    by_kind: Dict[str, List[dict]] = dict()
+
+    for check in collection["checks"]:
+        by_kind.setdefault(check_kind_name(name, check), list()).append(check)
+
+    for kind, checks in by_kind.items():
+        if (check_kind := CHECK_KINDS.get(kind)) is None:
+            table.skipped[(device, name)] = table.skipped.get((device, name), 0) + len(
+                checks
+            )
+            continue
+
+        _evaluate_kind(table, device, name, check_kind, checks, state)
+
+    # an exclusive collection fails for each item in the device state that is
+    # not in the checks; for example an unexpected VLAN.
+
+    if (check_kind := CHECK_KINDS.get(name)) is None or not (
+        exclusive := collection.get("exclusive")
+    ):
+        return
+
+    if isinstance(exclusive, dict):
+        expected_keys = {
+            _vlan_id(each)
+            for each in (exclusive.get("expected_results") or {}).get("vlans", [])
+        }
+    else:
+        expected_keys = {
+            check_kind.key(check["check_params"]) for check in by_kind.get(name, [])
+        }
+
+    section = state.sections.get(check_kind.section, {})
+    if unexpected := [key for key in section if key not in expected_keys]:
+        table.extend(
+            device,
+            name,
+            "exists",
+            [str(key) for key in unexpected],
+            [False] * len(unexpected),
+            [True] * len(unexpected),
+        )
+
+
+def iter_device_checks(device_dir: Path) -> Iterator[dict]:
+    """
+    Yields the check collections of the device check directory, in any of the
+    check storage formats.
+    """
+    for filepath in sorted(Path(device_dir).iterdir()):
+        if filepath.name.startswith("."):
+            continue
+        try:
+            yield load_check_collection(filepath)
+        except CheckStorageError:
+            continue
+
+
+def evaluate_device(
+    table: CheckTable, collections: Iterable[dict], state: DeviceState
+) -> CheckTable:
+    """evaluate all of the check collections of a device; returns the table"""
+    for collection in collections:
+        evaluate_collection(table, collection, state)
+    return table
+
+
+def load_snapshot(snapshot_dir: Path) -> Dict[str, DeviceState]:
+    """returns the device states of the snapshot directory, by hostname"""
+    return {
+        filepath.stem: DeviceState.load(filepath)
+        for filepath in sorted(Path(snapshot_dir).glob("*.json"))
+    }
+
+
+def expected_device_state(collections: Iterable[dict]) -> dict:
+    """
+    Returns the device state, in the snapshot file form, in which all of the
+    checks pass; for example to be used as the starting point of a snapshot.
+    """
+    data: Dict[str, dict] = dict()
+
+    for collection in collections:
+        for check in collection["checks"]:
+            kind = check_kind_name(collection["name"], check)
+            if (check_kind := CHECK_KINDS.get(kind)) is None:
+                continue
+
+            key = check_kind.key(check["check_params"])
+            record = {
+                field: list(value) if isinstance(value, tuple) else value
+                for field, value in check_kind.expected(
+                    check["expected_results"]
+                ).items()
+                if value is not None
+            }
+
+            data.setdefault(check_kind.section, {})[str(key)] = record
+
+    return data
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _equals(expected, measured) -> bool:
+    """an expected value of None is not checked"""
+    return expected is None or expected == measured
+
+
+def _evaluate_kind(
+    table: CheckTable,
+    device: str,
+    name: str,
+    check_kind: _CheckKind,
+    checks: List[dict],
+    state: DeviceState,
+):
+    """evaluate the checks of the same kind as a batch"""
+    section = state.sections.get(check_kind.section, {})
+
+    keys = [check_kind.key(check["check_params"]) for check in checks]
+    records = [section.get(key) for key in keys]
+    check_names = [str(key) for key in keys]
+
+    # the checks of missing items fail the "exists" field, the remaining fields
+    # are compared to None.
+
+    table.extend(
+        device,
+        name,
+        "exists",
+        check_names,
+        [True] * len(keys),
+        [record is not None for record in records],
+    )
+
+    expected_rows = [check_kind.expected(check["expected_results"]) for check in checks]
+    measured_rows = [
+        check_kind.measured(record) if record is not None else {} for record in records
+    ]
+
+    fields: Dict[str, None] = dict()
+    for row in expected_rows:
+        fields.update(dict.fromkeys(row))
+
+    for field in fields:
+        expected = [row.get(field) for row in expected_rows]
+        measured = [row.get(field) for row in measured_rows]
+
+        # only the rows with an expected value are in the table.
+
+        if selected := [idx for idx, value in enumerate(expected) if value is not None]:
+            if len(selected) != len(expected):
+                expected = [expected[idx] for idx in selected]
+                measured = [measured[idx] for idx in selected]
+                names = [check_names[idx] for idx in selected]
+            else:
+                names = check_names
+
+            table.extend(device, name, field, names, expected, measured)
@@ -0,0 +1,507 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the storage formats of the generated check files, the
+# `checks/<device>/<name>.json` files.  In addition to the indented JSON layout,
+# used by netcad, a check collection can be stored as a stream of records:
+#
+#   * "ndjson" - one JSON record per line
+#   * "msgpack" - a sequence of msgpack objects, requires the msgpack package
+#
+# The first record is the collection header; all of the collection values
+# other than the checks, for example "name" and "device".  Each remaining record
+# is a single check.  The stream can be compressed using "gzip", or "zstd"
+# which requires the zstandard package.
+#
+# Default-value elision: a value that is the same in most of the checks, for
+# example `"check_type": null`, is stored once in the header "defaults" and
+# omitted from each check that has that value.  Only the values present in all
+# of the checks are elided, so restoring the defaults is lossless.
+#
+# The record formats are read one check at a time, so a validator can iterate
+# the checks of a large collection without loading the whole file.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+from collections import Counter
+import copy
+import gzip
+import io
+import json
+import zlib
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "CHECK_FORMATS",
+    "CHECK_COMPRESSIONS",
+    "CheckStorageError",
+    "check_filename",
+    "find_check_file",
+    "encode_check_collection",
+    "iter_checks",
+    "read_check_header",
+    "load_check_collection",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+CHECK_FORMATS = ("json", "ndjson", "msgpack")
+CHECK_COMPRESSIONS = ("none", "gzip", "zstd")
+
+_FORMAT_SUFFIX = {"json": ".json", "ndjson": ".ndjson", "msgpack": ".msgpack"}
+_COMPRESSION_SUFFIX = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# the header record "format" value, used to recognize the record formats.
+
+_HEADER_FORMAT = "netcad-checks/1"
+
+# the minimum number of checks that use a value for it to be a default; below
+# this the header entries are larger than the values elided.
+
+_MIN_DEFAULT_CHECKS = 4
+
+# the number of checks encoded per output chunk.
+
+_CHUNK_CHECKS = 256
+
+
+class CheckStorageError(ValueError):
+    """
+    Raised when a check file cannot be written or read; for example the format
+    requires a package that is not installed, or the file is not valid.
+    """
+
+
+def check_filename(name: str, fmt: str = "json", compression: str = "none") -> str:
+    """
+    Returns the check file name for the collection name, format, and
+    compression; for example "interfaces.ndjson.gz".
+
+    Raises
+    ------
+    CheckStorageError
+        When the format or compression is not known, or the "json" format is
+        used with compression.
+    """
+    if fmt not in _FORMAT_SUFFIX:
+        raise CheckStorageError(f"unknown check format {fmt!r}")
+
+    if compression not in _COMPRESSION_SUFFIX:
+        raise CheckStorageError(f"unknown check compression {compression!r}")
+
+    if fmt == "json" and compression != "none":
+        raise CheckStorageError("the json check format does not support compression")
+
+    return name + _FORMAT_SUFFIX[fmt] + _COMPRESSION_SUFFIX[compression]
+
+
+def find_check_file(device_dir: Path, name: str) -> Optional[Path]:
+    """
+    Returns the check file for the collection name in the device check
+    directory, in any of the formats; or None if there is no such file.
+    """
+    for fmt in CHECK_FORMATS:
+        for compression in CHECK_COMPRESSIONS:
+            if fmt == "json" and compression != "none":
+                continue
+            filepath = Path(device_dir) / check_filename(name, fmt, compression)
+            if filepath.exists():
+                return filepath
+
+    return None
+
+
+def encode_check_collection(
+    collection: dict, fmt: str = "json", compression: str = "none", elide: bool = True
+) -> Iterator[bytes]:
+    """
+    Encode the check collection, producing the content as a stream of chunks;
+    for example to be written using `ArtifactWriter.write_chunks`.
+
+    Parameters
+    ----------
+    collection: dict
+        The check collection, as stored in the netcad JSON check file.
+
+    fmt: str
+        One of CHECK_FORMATS.
+
+    compression: str
+        One of CHECK_COMPRESSIONS.
+
+    elide: bool
+        When True, the record formats omit the default values from each check.
+
+    Yields
+    ------
+    bytes
+    """
+    check_filename("", fmt, compression)
+
+    if fmt == "json":
+        yield json.dumps(collection, indent=3).encode()
+        return
+
+    checks = collection.get("checks", [])
+    header = {key: value for key, value in collection.items() if key != "checks"}
+    defaults, order = _find_defaults(checks) if elide else ([], {})
+
+    header["format"] = _HEADER_FORMAT
+    header["keys"] = list(collection)
+    header["defaults"] = [[list(path), value] for path, value in defaults]
+    header["order"] = [[list(path), keys] for path, keys in order.items()]
+    header["count"] = len(checks)
+
+    encode = _get_encoder(fmt)
+    compressor = _get_compressor(compression)
+
+    def records() -> Iterator[bytes]:
+        yield encode(header)
+        for offset in range(0, len(checks), _CHUNK_CHECKS):
+            yield b"".join(
+                encode(_elide(check, defaults, order) if defaults else check)
+                for check in checks[offset : offset + _CHUNK_CHECKS]
+            )
+
+    if compressor is None:
+        yield from records()
+        return
+
+    for chunk in records():
+        if data := compressor.compress(chunk):
+            yield data
+
+    yield compressor.flush()
+
+
+def read_check_header(filepath: Path) -> dict:
+    """
+    Returns the collection values, other than the checks, from the check file
+    in any of the formats.
+    """
+    filepath = Path(filepath)
+
+    if _file_format(filepath) == "json":
+        collection = json.loads(filepath.read_text())
+        collection.pop("checks", None)
+        return collection
+
+    records = _iter_records(filepath)
+    header = next(records)
+    records.close()
+    return _public_header(header)
+
+
+def iter_checks(filepath: Path) -> Iterator[dict]:
+    """
+    Yields each check from the check file, in any of the formats, with the
+    default values restored.  The record formats are read one check at a time.
+    """
+    filepath = Path(filepath)
+
+    if _file_format(filepath) == "json":
+        yield from json.loads(filepath.read_text()).get("checks", [])
+        return
+
+    records = _iter_records(filepath)
+    header = next(records)
+    defaults = [(tuple(path), value) for path, value in header["defaults"]]
+    order = {tuple(path): keys for path, keys in header["order"]}
+
+    for record in records:
+        yield _restore(record, defaults, order) if defaults else record
+
+
+def load_check_collection(filepath: Path) -> dict:
+    """
+    Returns the complete check collection, the same as stored in the netcad
+    JSON check file, from the check file in any of the formats.
+    """
+    filepath = Path(filepath)
+
+    if _file_format(filepath) == "json":
+        return json.loads(filepath.read_text())
+
+    records = _iter_records(filepath)
+    header = next(records)
+    records.close()
+
+    collection = _public_header(header)
+    collection["checks"] = list(iter_checks(filepath))
+    return {key: collection[key] for key in header["keys"]}
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+# the path of keys to a value within a check, for example
+# ("check_params", "interface").
+
+KeyPath = Tuple[str, ...]
+
+
+def _file_format(filepath: Path) -> str:
+    """returns the format of the check file, based on the file suffixes"""
+    suffixes = filepath.suffixes
+    if suffixes and suffixes[-1] in (".gz", ".zst"):
+        suffixes = suffixes[:-1]
+
+    for fmt, suffix in _FORMAT_SUFFIX.items():
+        if suffixes and suffixes[-1] == suffix:
+            return fmt
+
+    raise CheckStorageError(f"{filepath}: unknown check file format")
+
+
+def _public_header(header: dict) -> dict:
+    """returns the header without the storage values"""
+    return {
+        key: value
+        for key, value in header.items()
+        if key not in ("format", "keys", "defaults", "order", "count")
+    }
+
+
+def _iter_records(filepath: Path) -> Iterator[dict]:
+    """
+    Yields the header record, and then each check record, of the record format
+    file; the file is read as the records are consumed.
+    """
+    fmt = _file_format(filepath)
+
+    with _open_stream(filepath) as ifile:
+        records = _decode_records(ifile, fmt)
+        header = next(records, None)
+
+        if not isinstance(header, dict) or header.get("format") != _HEADER_FORMAT:
+            raise CheckStorageError(f"{filepath}: not a check record file")
+
+        yield header
+        yield from records
+
+
+def _decode_records(ifile, fmt: str) -> Iterator[dict]:
+    """yields each record decoded from the binary file stream"""
+    if fmt == "ndjson":
+        for line in ifile:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    msgpack = _import_optional("msgpack", "msgpack")
+    yield from msgpack.Unpacker(ifile, raw=False)
+
+
+def _open_stream(filepath: Path):
+    """returns the binary file stream, decompressing as needed"""
+    if filepath.suffix == ".gz":
+        return gzip.open(filepath, "rb")
+
+    if filepath.suffix == ".zst":
+        zstandard = _import_optional("zstandard", "zstd")
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(filepath, "rb"), closefd=True
+            )
+        )
+
+    return open(filepath, "rb")
+
+
+def _get_encoder(fmt: str):
+    """returns the function that encodes a record to bytes"""
+    if fmt == "ndjson":
+        return lambda record: (
+            json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        )
+
+    msgpack = _import_optional("msgpack", "msgpack")
+    packer = msgpack.Packer(use_bin_type=True)
+    return packer.pack
+
+
+def _get_compressor(compression: str):
+    """returns the streaming compressor object, or None"""
+    if compression == "gzip":
+        # wbits=31 produces the gzip container; the header mtime is zero, so
+        # that the same content is always the same bytes.
+        return zlib.compressobj(level=6, wbits=31)
+
+    if compression == "zstd":
+        zstandard = _import_optional("zstandard", "zstd")
+        return zstandard.ZstdCompressor().compressobj()
+
+    return None
+
+
+def _import_optional(package: str, feature: str):
+    """import the optional package required by the storage feature"""
+    try:
+        return __import__(package)
+    except ImportError:
+        raise CheckStorageError(
+            f"the {feature} check storage requires the {package} package; "
+            f"pip install {package}"
+        )
+
+
+def _leaf_paths(value: dict, prefix: KeyPath = ()) -> Iterable[Tuple[KeyPath, object]]:
+    """yields the (path, value) of each leaf value; empty dicts are leaves"""
+    for key, item in value.items():
+        if isinstance(item, dict) and item:
+            yield from _leaf_paths(item, prefix + (key,))
+        else:
+            yield prefix + (key,), item
+
+
+def _find_defaults(
+    checks: List[dict],
+) -> Tuple[List[Tuple[KeyPath, object]], Dict[KeyPath, List[str]]]:
+    """
+    Returns the (path, value) defaults; for each leaf path present in all of
+    the checks, the most common value when used by enough of the checks.  Also
+    returns the key order of each dict that contains a default value, so that
+    the restored dict keys are in the same order as the original.
+    """
+    if len(checks) < _MIN_DEFAULT_CHECKS:
+        return [], {}
+
+    counts: Dict[KeyPath, Counter] = dict()
+    values: Dict[Tuple[KeyPath, str], object] = dict()
+    present: Counter = Counter()
+    keys: Dict[KeyPath, Dict[str, None]] = dict()
+
+    for check in checks:
+        for path, value in _leaf_paths(check):
+            value_key = json.dumps(value, sort_keys=True)
+            counts.setdefault(path, Counter())[value_key] += 1
+            values[(path, value_key)] = value
+            present[path] += 1
+            for depth in range(len(path)):
+                keys.setdefault(path[:depth], {})[path[depth]] = None
+
+    defaults = list()
+    for path, path_counts in counts.items():
+        if present[path] != len(checks):
+            continue
+
+        value_key, count = path_counts.most_common(1)[0]
+        if count >= _MIN_DEFAULT_CHECKS:
+            defaults.append((path, values[(path, value_key)]))
+
+    order = {
+        path[:depth]: list(keys[path[:depth]])
+        for path, _ in defaults
+        for depth in range(len(path))
+    }
+
+    return defaults, order
+
+
+def _elide(
+    check: dict,
+    defaults: List[Tuple[KeyPath, object]],
+    order: Dict[KeyPath, List[str]],
+) -> dict:
+    """
+    Returns a copy of the check without the default values.  If the check
+    cannot be restored exactly, for example its keys are not in the same order
+    as the other checks, then the check is returned as-is.
+    """
+    elided = copy.deepcopy(check)
+
+    for path, value in defaults:
+        parents = [elided]
+        for key in path[:-1]:
+            parents.append(parents[-1][key])
+
+        if parents[-1][path[-1]] != value:
+            continue
+
+        del parents[-1][path[-1]]
+
+        # remove the parent dicts that are now empty; these are restored
+        # along with the default value.
+
+        for depth in range(len(path) - 1, 0, -1):
+            if parents[depth]:
+                break
+            del parents[depth - 1][path[depth - 1]]
+
+    restored = _restore(copy.deepcopy(elided), defaults, order)
+    if json.dumps(restored) != json.dumps(check):
+        return check
+
+    return elided
+
+
+def _restore(
+    check: dict,
+    defaults: List[Tuple[KeyPath, object]],
+    order: Dict[KeyPath, List[str]],
+) -> dict:
+    """returns the check with the elided default values restored"""
+    touched = set()
+
+    for path, value in defaults:
+        node = check
+        for depth, key in enumerate(path[:-1]):
+            if key not in node:
+                node[key] = dict()
+                touched.add(path[:depth])
+            node = node[key]
+
+        if path[-1] not in node:
+            node[path[-1]] = (
+                copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            )
+            touched.add(path[:-1])
+
+    # the restored keys were added at the end of their dict; put the keys back
+    # into the original order.
+
+    for path in touched:
+        node = check
+        for key in path:
+            node = node[key]
+
+        reordered = {key: node[key] for key in order[path] if key in node}
+        reordered.update(node)
+        node.clear()
+        node.update(reordered)
+
+    return check
@@ -0,0 +1,348 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the content-addressed check store.  The checks of the
+# same device role are mostly the same across the building-floor designs; for
+# example the "vlans" checks of "acc01.11" and "acc01.12" only differ by the
+# hostnames.  The store keeps each unique check once, as an object file named by
+# its content hash, and each device has a small manifest of the object hashes:
+#
+#   <store>/objects/<hh>/<sha256>.json
+#   <store>/manifests/<hostname>.json
+#
+# The hostnames in a check are stored relative to the device "site", the
+# building-floor suffix of the hostname; for example "core01.11-et1" in the
+# checks of "acc01.11" is stored as "core01.%s-et1".  The same check of each
+# floor is therefore the same object.
+#
+# When loaded, each object is decoded once per site, or once when it does not
+# refer to the site, and is shared by all of the check collections that refer
+# to it.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .check_storage import CheckStorageError, load_check_collection
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["CheckStore"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class CheckStore:
+    """
+    The content-addressed check store.
+
+    Examples
+    --------
+        store = CheckStore("check-store")
+        for device_dir in Path("checks").iterdir():
+            store.put_checks_dir(device_dir)
+
+        collections = store.get_device("acc01.11")
+
+    Attributes
+    ----------
+    root_dir: Path
+        The store directory.
+
+    objects_written: int
+        The number of objects written by this instance.
+
+    objects_reused: int
+        The number of object references that were already in the store.
+
+    bytes_written: int
+        The size of the objects written by this instance.
+    """
+
+    OBJECTS_DIR = "objects"
+    MANIFESTS_DIR = "manifests"
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+        self.objects_written = 0
+        self.objects_reused = 0
+        self.bytes_written = 0
+
+        self._stored: Set[str] = set()
+        self._loaded: Dict[Tuple[str, Optional[str]], object] = dict()
+
+    # -------------------------------------------------------------------------
+    # Public methods
+    # -------------------------------------------------------------------------
+
+    def put_device(self, hostname: str, collections: Iterable[dict]) -> Path:
+        """
+        Store the check collections of the device, replacing the prior
+        manifest of the device.
+
+        Parameters
+        ----------
+        hostname: str
+            The device hostname.
+
+        collections: Iterable[dict]
+            The check collections, as stored in the netcad JSON check files.
+
+        Returns
+        -------
+        Path
+            The device manifest file.
+        """
+        site = _site_of(hostname)
+        manifest = dict(device=hostname, collections=list())
+
+        for collection in collections:
+            header = {
+                key: value for key, value in collection.items() if key != "checks"
+            }
+            manifest["collections"].append(
+                dict(
+                    name=collection["name"],
+                    keys=list(collection),
+                    header=self._put(header, site),
+                    checks=[self._put(check, site) for check in collection["checks"]],
+                )
+            )
+
+        manifest_file = self._manifest_file(hostname)
+        _write_file(manifest_file, json.dumps(manifest, indent=1).encode())
+        return manifest_file
+
+    def put_checks_dir(self, device_dir: Path) -> Path:
+        """
+        Store the check files, in any of the check storage formats, of the
+        device check directory; the directory name is the device hostname.
+
+        Returns
+        -------
+        Path
+            The device manifest file.
+        """
+        device_dir = Path(device_dir)
+        collections = list()
+
+        for filepath in sorted(device_dir.iterdir()):
+            if filepath.name.startswith("."):
+                continue
+            try:
+                collections.append(load_check_collection(filepath))
+            except CheckStorageError:
+                continue
+
+        return self.put_device(device_dir.name, collections)
+
+    def devices(self) -> List[str]:
+        """returns the hostnames of the devices in the store"""
+        return sorted(
+            filepath.stem
+            for filepath in (self.root_dir / self.MANIFESTS_DIR).glob("*.json")
+        )
+
+    def get_device(self, hostname: str) -> Dict[str, dict]:
+        """
+        Load the check collections of the device.  The checks, and the
+        collection values, are shared with the other collections that refer to
+        the same objects; and so must not be modified.
+
+        Returns
+        -------
+        Dict[str, dict]
+            The check collections, by collection name.
+        """
+        manifest = json.loads(self._manifest_file(hostname).read_text())
+        site = _site_of(hostname)
+        collections = dict()
+
+        for entry in manifest["collections"]:
+            collection = dict(self._get(entry["header"], site))
+            collection["checks"] = [
+                self._get(digest, site) for digest in entry["checks"]
+            ]
+            collections[entry["name"]] = {key: collection[key] for key in entry["keys"]}
+
+        return collections
+
+    def stats(self) -> dict:
+        """
+        Returns the number of manifests, object references, unique objects,
+        and the total size of the objects in the store.
+        """
+        references = 0
+        for hostname in self.devices():
+            manifest = json.loads(self._manifest_file(hostname).read_text())
+            references += sum(
+                1 + len(entry["checks"]) for entry in manifest["collections"]
+            )
+
+        objects = list((self.root_dir / self.OBJECTS_DIR).glob("*/*.json"))
+
+        return dict(
+            manifests=len(self.devices()),
+            references=references,
+            objects=len(objects),
+            object_bytes=sum(filepath.stat().st_size for filepath in objects),
+        )
+
+    def prune(self) -> List[Path]:
+        """
+        Remove the objects that are not referred to by any manifest.
+
+        Returns
+        -------
+        List[Path]
+            The object files removed.
+        """
+        referenced = set()
+        for hostname in self.devices():
+            manifest = json.loads(self._manifest_file(hostname).read_text())
+            for entry in manifest["collections"]:
+                referenced.add(entry["header"])
+                referenced.update(entry["checks"])
+
+        removed = list()
+        for filepath in sorted((self.root_dir / self.OBJECTS_DIR).glob("*/*.json")):
+            if filepath.stem not in referenced:
+                filepath.unlink()
+                self._stored.discard(filepath.stem)
+                removed.append(filepath)
+
+        return removed
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+
+    def _manifest_file(self, hostname: str) -> Path:
+        return self.root_dir / self.MANIFESTS_DIR / f"{hostname}.json"
+
+    def _object_file(self, digest: str) -> Path:
+        return self.root_dir / self.OBJECTS_DIR / digest[:2] / f"{digest}.json"
+
+    def _put(self, value, site: Optional[str]) -> str:
+        """store the value as an object, if not already stored; returns the hash"""
+        content = _to_site_relative(
+            json.dumps(value, separators=(",", ":")), site
+        ).encode()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if digest in self._stored or self._object_file(digest).exists():
+            self.objects_reused += 1
+        else:
+            _write_file(self._object_file(digest), content)
+            self.objects_written += 1
+            self.bytes_written += len(content)
+
+        self._stored.add(digest)
+        return digest
+
+    def _get(self, digest: str, site: Optional[str]):
+        """returns the object value, decoding the object once per site"""
+        if (value := self._loaded.get((digest, None))) is not None:
+            return value
+
+        if (value := self._loaded.get((digest, site))) is not None:
+            return value
+
+        text, site_relative = _from_site_relative(
+            self._object_file(digest).read_text(), site
+        )
+        value = json.loads(text)
+        self._loaded[(digest, site if site_relative else None)] = value
+        return value
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+# a hostname, for example "acc01.11", is the device name and its site.
+
+_HOSTNAME_SITE = r"\b([A-Za-z][A-Za-z_-]*\d+)\.{site}\b"
+
+# within an object, "%s" is the site and "%%" is a literal "%".
+
+_SITE_RELATIVE = re.compile(r"%(%|s)")
+
+
+def _site_of(hostname: str) -> Optional[str]:
+    """returns the site of the hostname; "11" for "acc01.11" """
+    _, dot, site = hostname.rpartition(".")
+    return site if dot and site else None
+
+
+def _to_site_relative(text: str, site: Optional[str]) -> str:
+    """returns the object content, with the site of each hostname replaced"""
+    text = text.replace("%", "%%")
+    if site is None:
+        return text
+
+    return re.sub(_HOSTNAME_SITE.format(site=re.escape(site)), r"\1.%s", text)
+
+
+def _from_site_relative(text: str, site: Optional[str]) -> Tuple[str, bool]:
+    """
+    Returns the object content with the site restored, and whether the content
+    referred to the site.
+    """
+    site_relative = False
+
+    def restore(match: re.Match) -> str:
+        nonlocal site_relative
+        if match.group(1) == "%":
+            return "%"
+        site_relative = True
+        return site
+
+    return _SITE_RELATIVE.sub(restore, text), site_relative
+
+
+def _write_file(filepath: Path, content: bytes):
+    """write the file content atomically, using a temporary file and rename"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = filepath.with_name(f".{filepath.name}.{os.getpid()}")
+    tmp_file.write_bytes(content)
+    os.replace(tmp_file, filepath)
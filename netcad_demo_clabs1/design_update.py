@@ -0,0 +1,315 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the incremental design update.  Each `design.update()`
+# rebuilds every design service across every device, even when the design did
+# not change since the prior update.  The `update_design` function instead
+# compares a fingerprint of each device, its interface cabling and its interface
+# profiles, against the fingerprint taken at the prior update; and only the
+# design services affected by the changed devices are rebuilt:
+#
+#   * a device added or removed, or a cabling change, rebuilds all services
+#   * an interface profile or description change rebuilds all services other
+#     than the topology service, since cabling is not affected
+#   * no change rebuilds nothing
+#
+# Each update is recorded in a trace, see `UpdateTracker`, showing which
+# devices changed and which services were rebuilt.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Optional, Tuple
+from time import perf_counter
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+from netcad.device import Device
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .profiling import span
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["update_design", "get_update_tracker", "UpdateTracker", "UpdateRecord"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the design services that only depend on the cabling, and not the interface
+# profiles.
+
+CABLING_SERVICES = {"topology"}
+
+
+class UpdateRecord:
+    """
+    The trace of a single design update.
+
+    Attributes
+    ----------
+    reason: str
+        The caller provided reason for the update, for example "desk_ports".
+
+    devices_changed: List[str]
+        The hostnames of the devices that changed since the prior update.
+
+    services_built: List[str]
+        The names of the design services that were rebuilt.
+
+    interfaces_examined: int
+        The number of device interfaces fingerprinted.
+
+    duration: float
+        The update time, in seconds.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason
+        self.devices_changed: List[str] = list()
+        self.services_built: List[str] = list()
+        self.interfaces_examined = 0
+        self.duration = 0.0
+
+    def __str__(self):
+        return (
+            f"update[{self.reason}]: {len(self.devices_changed)} devices changed, "
+            f"services built: {', '.join(self.services_built) or 'none'}, "
+            f"{self.interfaces_examined} interfaces examined, "
+            f"{self.duration * 1_000:.3f} ms"
+        )
+
+
+class UpdateTracker:
+    """
+    The device fingerprints taken at the prior update of a design, and the
+    trace of all updates.
+
+    Attributes
+    ----------
+    records: List[UpdateRecord]
+        The trace of each update, in order.
+
+    build_counts: Dict[str, int]
+        The number of times each design service was rebuilt.
+    """
+
+    def __init__(self):
+        self.records: List[UpdateRecord] = list()
+        self.build_counts: Dict[str, int] = dict()
+        self._services: Tuple[str, ...] = tuple()
+        self._cabling: Dict[str, tuple] = dict()
+        self._profiles: Dict[str, tuple] = dict()
+
+    def report(self):
+        """print the trace of each update"""
+        for record in self.records:
+            print(record)
+
+    def examine(self, design: Design, record: UpdateRecord) -> Optional[set]:
+        """
+        Compare the device fingerprints to those of the prior update, and
+        record the changed devices.
+
+        Returns
+        -------
+        set, optional
+            The names of the design services to rebuild; None when all of the
+            services need to be rebuilt.
+        """
+        services = tuple(design.services)
+        rebuild_all = services != self._services
+        rebuild = set()
+
+        prior_names = set(self._cabling)
+        cabling, profiles = dict(), dict()
+
+        for dev_name, dev_obj in design.devices.items():
+            dev_cabling, dev_profiles = _fingerprint(dev_obj)
+            cabling[dev_name] = dev_cabling
+            profiles[dev_name] = dev_profiles
+            record.interfaces_examined += len(dev_profiles)
+
+            if dev_cabling != self._cabling.get(dev_name):
+                rebuild_all = True
+            elif dev_profiles != self._profiles.get(dev_name):
+                rebuild.update(set(services) - CABLING_SERVICES)
+            else:
+                continue
+
+            record.devices_changed.append(dev_name)
+
+        if removed := prior_names - set(cabling):
+            record.devices_changed.extend(sorted(removed))
+            rebuild_all = True
+
+        self._services = services
+        self._cabling, self._profiles = cabling, profiles
+
+        return None if rebuild_all else rebuild
+
+
+def get_update_tracker(design: Design) -> UpdateTracker:
+    """returns the update tracker of the design, creating it on first use"""
+    if (tracker := design.config.get("update_tracker")) is None:
+        design.config["update_tracker"] = tracker = UpdateTracker()
+    return tracker
+
+
+def update_design(design: Design, reason: str = "update") -> UpdateRecord:
+    """
+    Update the design services affected by the changes made since the prior
+    update; see the file header for details.  The first update of a design
+    is always a complete `design.update()`.
+
+    Parameters
+    ----------
+    design: Design
+        The design instance being built.
+
+    reason: str
+        The reason for the update, used in the trace.
+
+    Returns
+    -------
+    UpdateRecord
+        The trace of this update.
+    """
+    tracker = get_update_tracker(design)
+    record = UpdateRecord(reason)
+    ts_start = perf_counter()
+
+    with span("design.update"):
+        rebuild = tracker.examine(design, record)
+
+        if rebuild is None:
+            design.update()
+            record.services_built.extend(design.services)
+        else:
+            for svc_name in sorted(rebuild):
+                with span(f"design.update.{svc_name}"):
+                    design.services[svc_name].build()
+                record.services_built.append(svc_name)
+
+    for svc_name in record.services_built:
+        tracker.build_counts[svc_name] = tracker.build_counts.get(svc_name, 0) + 1
+
+    record.duration = perf_counter() - ts_start
+    tracker.records.append(record)
+    return record
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _fingerprint(device: Device) -> Tuple[tuple, tuple]:
+    """
+    Returns the cabling fingerprint, and the profile fingerprint, of the
+    device.  The profile fingerprint is made of the profile class and the
+    values of its attributes, so that a profile changed in place is found.
+    """
+    cabling, profiles = list(), list()
+
+    for if_name, iface in device.interfaces.items():
+        if iface.cable_id:
+            cabling.append((if_name, iface.cable_id))
+
+        profile = iface.profile
+        profiles.append(
+            (
+                if_name,
+                iface.desc,
+                type(profile).__qualname__,
+                _value_key(getattr(profile, "__dict__", {}), frozenset({id(profile)})),
+            )
+        )
+
+    return tuple(cabling), tuple(profiles)
+
+
+def _value_key(value, _seen: frozenset = frozenset()):
+    """
+    Returns a comparable key of the profile attribute value.  The reference to
+    an interface, for example the profile back-reference to its interface, is
+    keyed by the device and interface names, rather than by the interface
+    content, so that the key does not recurse into the interface.
+
+    Any other object is keyed by its repr() when its class defines one, or
+    else by its attribute values; the default repr() holds the object id, and
+    so would never match the key of a prior process.  An object referenced by
+    its own attribute values is keyed by its name.
+
+    Raises
+    ------
+    TypeError
+        When the value has neither a repr(), attribute values, nor a name
+        that can be used as its key.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _value_key(v, _seen)) for k, v in value.items()))
+
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_key(each, _seen) for each in value)
+
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_value_key(each, _seen) for each in value), key=repr))
+
+    if hasattr(value, "vlan_id"):
+        return ("vlan", value.vlan_id, value.name)
+
+    if (device := getattr(value, "device", None)) is not None and hasattr(
+        value, "name"
+    ):
+        return ("interface", getattr(device, "name", None), value.name)
+
+    value_type = type(value).__qualname__
+
+    if type(value).__repr__ is not object.__repr__:
+        return (value_type, repr(value))
+
+    if hasattr(value, "__dict__") and id(value) not in _seen:
+        return (value_type, _value_key(vars(value), _seen | {id(value)}))
+
+    if isinstance(name := getattr(value, "name", None), str):
+        return (value_type, name)
+
+    raise TypeError(f"{value_type}: value cannot be fingerprinted: {value!r}")
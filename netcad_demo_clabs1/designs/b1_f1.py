@@ -37,6 +37,8 @@ from netcad.design import Design
 
 from .std_design import create_std_design, set_vlan_interfaces
 from ..profiles.access import DeskUser
+from ..interface_index import build_interface_index
+from ..design_update import update_design
 
 
 # -----------------------------------------------------------------------------
@@ -73,9 +75,15 @@ def create_design(design: Design) -> Design:
 
     create_std_design(design)
 
+    # the desk ports add VLANs to the core, create only the SVIs that are now
+    # missing.
+
     _add_desk_ports(design)
     set_vlan_interfaces(design)
 
+    # the desk ports changed the interface classification, rebuild the index.
+    build_interface_index(design)
+
     return design
 
 
@@ -94,4 +102,4 @@ def _add_desk_ports(design: Design):
     sw2.interfaces["Ethernet2"].profile = DeskUser(desc="Alice")
     sw2.interfaces["Ethernet3"].profile = DeskUser(desc="John")
 
-    design.update()
+    update_design(design, reason="desk_ports")
@@ -0,0 +1,115 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+
+# =============================================================================
+# This file contains the design for any building-floor network that is declared
+# in a floor spec file; see `floor_specs.py` for the file format.  The
+# `netcad.toml` design config "spec_file" value is the path to the floor spec
+# file, and the design name selects the floor in the file:
+#
+#     [[design]]
+#         name = "b3.f1"
+#         package = "netcad_demo_clabs1.spec_floor"
+#
+#         [design.config]
+#             spec_file = "floor-specs.toml"
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict
+from pathlib import Path
+from functools import lru_cache
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ..floor_specs import (
+    FloorSpec,
+    FloorSpecError,
+    load_floor_specs,
+    build_floor_design,
+)
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["create_design"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def create_design(design: Design) -> Design:
+    """
+    This function is the "design entry-point" for a floor spec network.  The
+    name of this function **MUST** be `create_desgin` as this name is required
+    so that the netcad tool can process it.
+
+    The design config values in the `netcad.toml` file take precedence over
+    the values in the floor spec.
+
+    Parameters
+    ----------
+    design: Design
+        The design instance that needs to be filled in with the specifics of
+        building-floor design
+
+    Returns
+    -------
+    Design
+        The updated design instance.
+    """
+    spec_file = Path(design.config["spec_file"]).resolve()
+    specs = _load_specs(spec_file, spec_file.stat().st_mtime_ns)
+
+    if (spec := specs.get(design.name)) is None:
+        raise FloorSpecError(f"{design.name}: not found in floor spec file {spec_file}")
+
+    for key, value in spec.config.items():
+        design.config.setdefault(key, value)
+
+    return build_floor_design(spec, design)
+
+
+@lru_cache()
+def _load_specs(spec_file: Path, mtime_ns: int) -> Dict[str, FloorSpec]:
+    """
+    Returns the floor specs by design name; the file is loaded once for all of
+    the designs, and again only when the file changes.
+    """
+    return {spec.name: spec for spec in load_floor_specs(spec_file)}
@@ -25,12 +25,19 @@
 # will be designed with the following:
 #
 #   * one core switch
-#   * two access swiches
+#   * two access swiches, by default
 #   * one access-point
 #
-# Each access switch will be connected via two ethernet ports to the core. The
-# access-point will be connected to the first access switch.  For specific
-# cabling design, refer to the `device_roles` module for each.
+# The number of access switches can be changed using the design config
+# "access_switches" value in the `netcad.toml` configuration file.
+#
+# Each access switch will be connected via two ethernet ports to the core; the
+# number of uplinks can be changed using the design config "access_uplinks"
+# value.  The 8-port core has room for four access switches, so floors with
+# more access switches must set the design config "core_device_type" to a
+# device type with more ports; see `port_allocator.py`.  The access-point will
+# be connected to the first access switch.  For specific cabling design, refer
+# to the `device_roles` module for each.
 #
 # =============================================================================
 
@@ -39,9 +46,9 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
+from typing import Dict, Iterable, List, Tuple
 from pathlib import Path
-from itertools import islice
-from ipaddress import IPv4Interface, IPv4Network
+from ipaddress import IPv4Interface
 
 # -----------------------------------------------------------------------------
 # Public Imports
@@ -57,15 +64,18 @@ from netcad.vlans import (
     VlanProfileLike,
 )
 
-from netcad.ipam import IPAM
-
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
 from ..profiles.clab_ma0 import Management0
 from ..device_roles import CoreSwitch, AccessSwitch, AnyDevice, FloorAccessPoint
-from ..ipam import create_site_ipam
+from ..ipam import create_site_ipam, DesignIPAM
+from ..interface_index import build_interface_index
+from ..mgmt_ipam import get_mgmt_allocator
+from ..port_allocator import get_port_ranges
+from ..design_update import update_design
+from ..profiling import span
 
 # -----------------------------------------------------------------------------
 # Exports
@@ -89,6 +99,12 @@ def create_std_design(design: Design):
     ----------
     design: Design
         The design instance that will be build
+
+    Raises
+    ------
+    ValueError
+        When the design config "access_switches" value is less than 1; the
+        first access switch is needed for the access-point.
     """
 
     # The building and floor ID values are taken from the `netcad.toml`
@@ -99,15 +115,33 @@ def create_std_design(design: Design):
     # create the IP Address Management instance that stores all of the subnets
     # used in the design.
 
-    ipam = create_site_ipam(design)
+    create_site_ipam(design)
 
-    # create the standard set of four devices per building-floor
+    # create the standard set of devices per building-floor; by default there
+    # are four devices, a core, two access switches, and an access-point.
+
+    n_access = design.config.get("access_switches", 2)
+    if not isinstance(n_access, int) or n_access < 1:
+        raise ValueError(
+            f"{design.name}: design config access_switches must be at least 1, "
+            f"got {n_access!r}"
+        )
 
     core = CoreSwitch(dev_id=1, bld_id=bld_id, flr_id=flr_id)
-    sw1 = AccessSwitch(dev_id=1, bld_id=bld_id, flr_id=flr_id)
-    sw2 = AccessSwitch(dev_id=2, bld_id=bld_id, flr_id=flr_id)
+    core.device_type = design.config.get("core_device_type", core.device_type)
+    access_sws = [
+        AccessSwitch(dev_id=dev_id, bld_id=bld_id, flr_id=flr_id)
+        for dev_id in range(1, n_access + 1)
+    ]
     ap1 = FloorAccessPoint(dev_id=1, bld_id=bld_id, flr_id=flr_id)
 
+    # create the port allocators of the cabled devices, using the port range
+    # of each device type.
+
+    port_ranges = get_port_ranges(design.config)
+    for dev in (core, *access_sws):
+        dev.get_ports(port_ranges)
+
     # save the nicknames of the devices in the design.config area so that these
     # devices can be retrieved later without having to know the explicit
     # hostname values.
@@ -115,161 +149,158 @@ def create_std_design(design: Design):
     design.config["nicknames"] = dev_nicknames = dict()
 
     dev_nicknames["core01"] = core
-    dev_nicknames["acc01"] = sw1
-    dev_nicknames["acc02"] = sw2
+    for sw in access_sws:
+        dev_nicknames[f"acc{sw.dev_id:02}"] = sw
     dev_nicknames["ap01"] = ap1
 
     # connect the devices together in the standard configuration; see device
     # roles for sepcific details.  Connect the AP01 device to the first access
     # switch on Ethernet1.
 
-    sw1.build_uplink_to_core(core)
-    sw2.build_uplink_to_core(core)
-    ap1.build_uplink(sw1.interfaces["Ethernet1"])
+    uplinks = design.config.get("access_uplinks", AccessSwitch.uplink_count)
+    for sw in access_sws:
+        sw.build_uplink_to_core(core, uplinks=uplinks)
+
+    ap_port = access_sws[0].get_ports().reserve("Ethernet1", owner=ap1.name)
+    ap1.build_uplink(access_sws[0].interfaces[ap_port])
 
     # Add the devices to the desgin services for topology and vlans.
 
-    all_devs = [core, sw1, sw2, ap1]
+    all_devs = [core, *access_sws, ap1]
 
     design.add_devices(*all_devs).add_services(
         TopologyDesignService(topology_name=design.name, devices=all_devs),
         VlansDesignService(devices=all_devs),
-    ).update()
+    )
+
+    update_design(design, reason="devices")
 
-    # assgin IP addresses to the management interfaces
+    # assgin IP addresses to the management interfaces; the core is first,
+    # followed by the access switches.  Note the .1 is assigned to the
+    # containerlab system host interface.
 
     net_id = design.config["net_id"]
-    mgmt_subnet = get_mgmt_subnet(net_id=net_id, ipam=ipam)
+    mgmt_devs = [core, *access_sws]
 
-    # Note the .1 is assigned to the containerlab system host interface
+    mgmt_ipaddrs = get_mgmt_allocator(design.config).assign(
+        (dev.name, net_id, host_index) for host_index, dev in enumerate(mgmt_devs)
+    )
 
-    set_mgmt_ipaddr(core, mgmt_subnet, host_offset=2)
-    set_mgmt_ipaddr(sw1, mgmt_subnet, host_offset=3)
-    set_mgmt_ipaddr(sw2, mgmt_subnet, host_offset=4)
+    for dev in mgmt_devs:
+        set_mgmt_ipaddr(dev, mgmt_ipaddrs[dev.name])
 
     set_vlan_interfaces(design)
+    update_design(design, reason="vlan_interfaces")
 
-    design.update()
+    build_interface_index(design)
 
 
-def set_vlan_interfaces(design: Design):
+def set_vlan_interfaces(design: Design) -> Dict[str, List[str]]:
     """
-    Assgin IP addresses to the SVIs on devices that need them.
-    """
-    ipam = design.ipams[0]
-    dev_nn = design.config["nicknames"]
-
-    create_vlan_interfaces(dev_nn["core01"], ipam=ipam, host_offset=1)
-
-
-def get_mgmt_subnet(net_id: int, ipam: IPAM) -> IPv4Network:
-    """
-    This function is used to determine the management subnet for this design.
-    The OOB network is carved up into /28 chunks per "network ID"; i.e each
-    building-floor has a designated network ID value, and that value determines
-    which /28 chunk to use.  This approach allows us to use the single
-    containerlab / docker network that is a /24.
-
-    Parameters
-    ----------
-    net_id: int
-        The network ID value as defined in the `netcad.toml` configuration file
-        for this specific design network.
-
-    ipam: IPAM
-        The IPAM instance that stores the overall OOB network instance.
+    Assgin IP addresses to the SVIs on devices that need them; that is, the
+    devices whose device-role defines the `svi_host_offset` value.  This
+    function can be called again after the design is changed, only the missing
+    SVIs are created.
 
     Returns
     -------
-    IPv4Network
-        The network instance that will be used as the base network for assigning
-        the Management0 interface IP addresss.
+    Dict[str, List[str]]
+        The SVI interface names created, by device hostname.
     """
+    ipam = design.ipams[0]
 
-    oob_subnet = ipam["OOB"]
-
-    # chunk the OOB network into /28 subnets and then use the design 'net_id'
-    # value to select the specific subnet to use for this design.  So if
-    # net_id=1 then this desgin will get the first /28, if net_id=2 it will get
-    # the second /28, etc.
+    l3_devices = [
+        (dev, dev.svi_host_offset + dev.dev_id - 1)
+        for dev in design.devices.values()
+        if dev.svi_host_offset
+    ]
 
-    oob_pf28s = oob_subnet.ip_network.subnets(new_prefix=28)
-    design_p28 = next(islice(oob_pf28s, net_id - 1, None))
-    return design_p28
+    with span("vlan_interfaces"):
+        return create_vlan_interfaces(l3_devices, ipam=ipam)
 
 
-def set_mgmt_ipaddr(device: AnyDevice, mgmt_subnet: IPv4Network, host_offset: int):
+def set_mgmt_ipaddr(device: AnyDevice, ma0_if_ipaddr: IPv4Interface):
     """
-    This function defines the Management0 interface on the device.  The IP
-    address is the mgmt-subnet base network address + the host-offset.  The
-    Management0 is set to use a /24 prefix, artifically, so that it will conform
-    to the use of the docker-network that is a /24 for all host manaegment.
+    This function defines the Management0 interface on the device.  The
+    Management0 interface uses the OOB network prefix, rather than the design
+    management subnet prefix, so that it will conform to the use of the single
+    docker-network for all host manaegment.
 
     Parameters
     ----------
     device: AnyDevice
         The device that is begin assigned its Management0
 
-    mgmt_subnet: IPv4Network
-        The IPv4 network instance for this network design management subnet.
-
-    host_offset: int
-        The device IP offset value that is added to the subnet base to compute
-        the specific IP interface address.
+    ma0_if_ipaddr: IPv4Interface
+        The Management0 interface address, see `MgmtAllocator`.
     """
 
-    host_ip = mgmt_subnet.network_address + host_offset
-
     with device.interfaces["Management0"] as ma0:
-        ma0_if_ipaddr = IPv4Interface((host_ip, 24))
         ma0.profile = Management0(if_ipaddr=ma0_if_ipaddr)
         device.primary_ip = ma0_if_ipaddr.ip
 
 
-def create_vlan_interfaces(device: AnyDevice, ipam: IPAM, host_offset: int):
+def create_vlan_interfaces(
+    devices: Iterable[Tuple[AnyDevice, int]], ipam: DesignIPAM
+) -> Dict[str, List[str]]:
     """
     This function is used to create Vlan Interfaces for each VLAN defined on the
-    device.  For example, if a device has 4 VLANs defined, and those VLANs have assocaited
-    IPAM networks, then this function will create SVIs for each of those four VLANs.
+    devices.  For example, if a device has 4 VLANs defined, and those VLANs have
+    assocaited IPAM networks, then this function will create SVIs for each of
+    those four VLANs.  A "Vlan<n>" interface that already exists on the device
+    is not changed, so the function can be called again after VLANs are added
+    to the devices.
 
     Parameters
     ----------
-    device: AnyDevice
-        The device that is being designed.
+    devices: Iterable[Tuple[AnyDevice, int]]
+        The devices that are being designed, and the host offset of each.  The
+        host offset is added to the base of each of the VLAN associated networks
+        to compute the device specific SVI interface IP address.
 
-    ipam: IPAM
-        The IPAM instance that holds all of the subnets defined in the design.
-        Some of these will have "names" that are VlanProfile instances.  Each of
-        these is then used to design in the SVI interface.
-
-    host_offset: int
-        This value is used to add to the base of each of the VLAN associated
-        networks to compute the device specific SVI interface IP address.
+    ipam: DesignIPAM
+        The IPAM instance that holds all of the subnets defined in the design,
+        indexed by VLAN-ID.  Each of these is then used to design in the SVI
+        interface.
 
+    Returns
+    -------
+    Dict[str, List[str]]
+        The SVI interface names created, by device hostname.
     """
-
-    vlan_svc: DeviceVlanDesignServiceLike = device.services["vlans"]
-
-    # obtain the list of all vlans used by this device in the design
-
-    dev_vlans = vlan_svc.all_vlans()
-
-    # find all of the IPAM subnets that are VLAN associated, and whose VLANs are
-    # begin used on this device.
-
-    subnets_used = [
-        (vlan, subnet) for vlan, subnet in ipam.items() if vlan in dev_vlans
-    ]
-
-    # for each VLAN subnet that should be on this device create a "Vlan<n>"
-    # interface and calcualte+assign the IP interface address.
-
-    vlan: VlanProfileLike
-    for vlan, subnet in subnets_used:
-        with device.interfaces[f"Vlan{vlan.vlan_id}"] as iface:
-            if_ipaddr = subnet.interface(name=iface, offset_octet=host_offset)
-            iface.desc = vlan.name
-            iface.profile = InterfaceVlan(
-                vlan=vlan, template=Path("interface_vlan.jinja2")
-            )
-            iface.profile.if_ipaddr = if_ipaddr
+    created = dict()
+
+    for device, host_offset in devices:
+        vlan_svc: DeviceVlanDesignServiceLike = device.services["vlans"]
+
+        # find the VLAN-IDs used by this device in the design, that have an
+        # IPAM subnet, and do not yet have an SVI.
+
+        vlan_ids = ipam.vlan_subnets.keys() & {
+            vlan.vlan_id for vlan in vlan_svc.all_vlans()
+        }
+
+        missing = [
+            vlan_id
+            for vlan_id in sorted(vlan_ids)
+            if f"Vlan{vlan_id}" not in device.interfaces
+        ]
+
+        # for each VLAN subnet that should be on this device create a "Vlan<n>"
+        # interface and calcualte+assign the IP interface address.
+
+        vlan: VlanProfileLike
+        for vlan_id in missing:
+            vlan, subnet = ipam.vlan_subnets[vlan_id]
+            with device.interfaces[f"Vlan{vlan_id}"] as iface:
+                if_ipaddr = subnet.interface(name=iface, offset_octet=host_offset)
+                iface.desc = vlan.name
+                iface.profile = InterfaceVlan(
+                    vlan=vlan, template=Path("interface_vlan.jinja2")
+                )
+                iface.profile.if_ipaddr = if_ipaddr
+
+        if missing:
+            created[device.name] = [f"Vlan{vlan_id}" for vlan_id in missing]
+
+    return created
@@ -24,12 +24,14 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
+from typing import Optional
 from pathlib import Path
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
+from ..port_allocator import PortAllocationError
 from ..profiles.trunks import UplinkTrunk, PeeringTrunk
 from .any_device import AnyContainerEosDevice
 from .core_switch import CoreSwitch
@@ -38,68 +40,88 @@ from .core_switch import CoreSwitch
 class AccessSwitch(AnyContainerEosDevice):
     """
     Define the baseclass for all access-switch devices.  The general purpose of
-    the access switch will to cable interfaces Ethernet7 and Ethernet8 to a
-    core-switch. See the `build_uplink_to_core` for details.
+    the access switch will to cable its last ports, Ethernet7 and Ethernet8 on
+    the 8-port device, to a core-switch. See the `build_uplink_to_core` for
+    details.
     """
 
-    UPLINK_PORTS = ["Ethernet7", "Ethernet8"]
+    # the default number of uplinks to the core; can be changed using the
+    # design config "access_uplinks" value.
+
+    uplink_count = 2
 
     sort_key = (1, 0)
     device_base_name = "acc"
     template = Path("access_switch.jinja2")
 
-    def build_uplink_to_core(self, core: CoreSwitch):
+    def build_uplink_to_core(self, core: CoreSwitch, uplinks: Optional[int] = None):
         """
         This method is used to declare the cabling between this access switch
-        and the designated core switch.  The access switch will always use eth7
-        and eth8.  The designated core swtich interfaces are calculated baased
-        on the access-switch "device Id".  The first access switch (dev_id=1)
-        will use the first two ports on the core switch, the second access
-        switch (dev_id=2) will use the next two (eth3, eth4), and so on.
+        and the designated core switch.  The access switch uses the last ports
+        of its port range, eth7 and eth8 on the 8-port device.  The core switch
+        interfaces are taken from the core port allocator, lowest first, so
+        when the access switches are cabled in dev-id order the first access
+        switch (dev_id=1) uses the first two ports on the core switch, the
+        second access switch (dev_id=2) uses the next two (eth3, eth4), and so
+        on.
 
         Notes
         -----
-        The design use of an 8-port core swtich allows for at most 4 access
-        switches.  There is no enforcement of this fact in the design.  TODO:
-        add such enforcement.
+        The 8-port core switch allows for at most 4 access switches with two
+        uplinks each; a floor with more access switches must use a core device
+        type with more ports, see the design config "core_device_type".
 
         Parameters
         ----------
         core: AnyContainerEosDevice
             The core switch where this access switch will be connected.
 
+        uplinks: int, optional
+            The number of uplinks; defaults to the `uplink_count`.  An access
+            switch with 0 uplinks is not cabled to the core.
+
+        Raises
+        ------
+        PortAllocationError
+            When either device does not have enough free ports, or the number
+            of uplinks is negative.
         """
-        if_defs = self.interfaces
+        if uplinks is None:
+            uplinks = self.uplink_count
 
-        # there are two uplink interfaces from the access device to the core
-        # device. calculate the starting interface number based on the access
-        # switch dev-id value.
+        if uplinks < 0:
+            raise PortAllocationError(
+                f"{self.name}: invalid number of uplinks to {core.name}: {uplinks}"
+            )
 
-        core_intf_baseport_id = (self.dev_id - 1) * 2 + 1
+        if_defs = self.interfaces
         core_if_defs = core.interfaces
 
+        # allocate the uplink interfaces on both devices before cabling, so
+        # that a capacity error leaves neither device partially cabled; the
+        # core ports are released when the access ports cannot be allocated.
+
+        core_ports = core.get_ports()
+        core_intfnames = core_ports.allocate(uplinks, owner=self.name)
+
+        try:
+            up_intfnames = self.get_ports().allocate_last(uplinks, owner=core.name)
+        except PortAllocationError:
+            core_ports.release(core_intfnames)
+            raise
+
         # dynamically build the cabling-id value based on the core and with
         # dev-id values.
 
         base_cable_id = f"uplink_{self.name}_{core.name}"
-        up1_intfname, up2_intfname = self.UPLINK_PORTS
-
-        with if_defs[up1_intfname] as up1, if_defs[up2_intfname] as up2:
-
-            # cable the access-swtich eth7 to the first core interface
 
-            up1.profile = UplinkTrunk()
-            up1.cable_id = base_cable_id + "_1"
+        for cable_num, (up_intfname, core_intfname) in enumerate(
+            zip(up_intfnames, core_intfnames), start=1
+        ):
+            with if_defs[up_intfname] as uplink:
+                uplink.profile = UplinkTrunk()
+                uplink.cable_id = f"{base_cable_id}_{cable_num}"
 
-            with core_if_defs[f"Ethernet{core_intf_baseport_id}"] as core_intf:
+            with core_if_defs[core_intfname] as core_intf:
                 core_intf.profile = PeeringTrunk()
-                core_intf.cable_id = up1.cable_id
-
-            # cable the access-swtich eth8 to the second core interface
-
-            up2.profile = UplinkTrunk()
-            up2.cable_id = base_cable_id + "_2"
-
-            with core_if_defs[f"Ethernet{core_intf_baseport_id + 1}"] as uplink:
-                uplink.profile = PeeringTrunk()
-                uplink.cable_id = up2.cable_id
+                core_intf.cable_id = uplink.cable_id
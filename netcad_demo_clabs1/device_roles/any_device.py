@@ -20,12 +20,29 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Optional
+
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
 from netcad.device import Device
 
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ..port_allocator import (
+    get_port_ranges,
+    PortAllocator,
+    PortAllocationError,
+    PortRange,
+)
+
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
@@ -39,6 +56,11 @@ __all__ = ["AnyDevice", "AnyContainerEosDevice"]
 #
 # -----------------------------------------------------------------------------
 
+# the device sort-key values, so that each distinct (file, rank) key is stored
+# once rather than per device.
+
+_SORT_KEYS: Dict[tuple, tuple] = dict()
+
 
 class AnyDevice(Device):
     """
@@ -82,10 +104,25 @@ class AnyDevice(Device):
         corner. Each device-role, for example a "core switch" will define their
         own sort-key such that when displaying devices in reports, diagrams, and
         such the devices will be sort-ordered according to this sort-key method.
+
+    svi_host_offset: int, optional
+        Set by the device-roles that route the VLANs, i.e. have SVIs.  The value
+        is the SVI host offset, within each VLAN subnet, of the device with
+        dev_id=1; the device with dev_id=2 uses the next offset, and so on.
+
+    ports: PortAllocator, optional
+        The allocator of the device ports used for cabling; created on first
+        use, see `get_ports`.
     """
 
+    # the per-device attributes are stored in slots rather than the instance
+    # dict; the sort_key is not, since each device-role sets its class value.
+
+    __slots__ = ("bld_id", "flr_id", "dev_id", "ports")
+
     sort_key = tuple()  # (file, rank)
     device_base_name: str = ""
+    svi_host_offset: Optional[int] = None
 
     def __init__(self, dev_id: int, bld_id: int, flr_id: int, **kwargs):
         """
@@ -115,12 +152,44 @@ class AnyDevice(Device):
         super().__init__(name=name, **kwargs)
 
         # set the "(file,rank)" sort key based on the base-class file and the
-        # dev-id rank
-        self.sort_key = (self.sort_key[0], dev_id)
+        # dev-id rank; the key is shared by the devices of the same role and
+        # rank on each floor.
+
+        sort_key = (self.sort_key[0], dev_id)
+        self.sort_key = _SORT_KEYS.setdefault(sort_key, sort_key)
 
         self.bld_id = bld_id
         self.flr_id = flr_id
         self.dev_id = dev_id
+        self.ports: Optional[PortAllocator] = None
+
+    def get_ports(
+        self, port_ranges: Optional[Dict[str, PortRange]] = None
+    ) -> PortAllocator:
+        """
+        Returns the port allocator of the device, created on first use using
+        the port range of the device type.
+
+        Parameters
+        ----------
+        port_ranges: Dict[str, PortRange], optional
+            The port range of each device type; defaults to the ranges of
+            the device-type specs, see `get_port_ranges`.
+
+        Raises
+        ------
+        PortAllocationError
+            When the device type has no port range.
+        """
+        if self.ports is None:
+            port_ranges = port_ranges or get_port_ranges()
+            if (port_range := port_ranges.get(self.device_type)) is None:
+                raise PortAllocationError(
+                    f"{self.name}: no port range for device type {self.device_type!r}"
+                )
+            self.ports = PortAllocator(self.name, port_range)
+
+        return self.ports
 
     def __lt__(self, other: "AnyDevice"):
         """used for sorrting devices amoung each other"""
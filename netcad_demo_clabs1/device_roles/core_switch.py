@@ -53,3 +53,8 @@ class CoreSwitch(AnyContainerEosDevice):
     sort_key = (0, 0)
     device_base_name = "core"
     template = Path("core_switch.jinja2")
+
+    # the core is the L3 device in the floor; the SVI address of the first core
+    # is the .1 of each VLAN subnet.
+
+    svi_host_offset = 1
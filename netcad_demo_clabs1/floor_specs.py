@@ -0,0 +1,326 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the floor spec file support.  A floor spec file declares
+# any number of building-floor designs, and their variances from the standard
+# design, without a Python module per floor.  The file is TOML:
+#
+#     [defaults]
+#     access_switches = 2
+#
+#     [[floor]]
+#     building = 1
+#     floor = 1
+#     net_id = 1
+#
+#       [[floor.port]]
+#       device = "acc02"
+#       interface = "Ethernet1"
+#       profile = "DeskUser"
+#       desc = "Bob"
+#
+# Each floor must have the "building", "floor", and "net_id" values.  The
+# design name defaults to "b<building>.f<floor>", and can be set using "name".
+# All other floor values, and the [defaults] values, are used as the design
+# config; the same as the [design.config] in the `netcad.toml` file.
+#
+# Each port assigns an interface profile, by class name, to an interface of a
+# device; the device is given by its nickname, for example "core01" or "acc02".
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterable, Iterator, List, Optional, Type
+from pathlib import Path
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+from netcad.vlans import InterfaceL2Access
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .designs.std_design import create_std_design, set_vlan_interfaces
+from .design_update import update_design
+from .port_allocator import PortAllocationError
+from .interface_index import build_interface_index
+from .profiles import access
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "FloorSpec",
+    "PortSpec",
+    "FloorSpecError",
+    "PORT_PROFILES",
+    "load_floor_specs",
+    "build_floor_design",
+    "iter_floor_designs",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the interface profiles that can be used in a floor spec, by class name.
+
+PORT_PROFILES = {name: getattr(access, name) for name in access.__all__}
+
+
+class FloorSpecError(ValueError):
+    """
+    Raised when the floor spec file is not valid, or a floor spec cannot be
+    applied to its design.
+    """
+
+
+class PortSpec:
+    """
+    The interface profile assignment of a single port.
+
+    Attributes
+    ----------
+    device: str
+        The device nickname, for example "acc02".
+
+    interface: str
+        The interface name, for example "Ethernet1".
+
+    profile: Type[InterfaceL2Access]
+        The interface profile class.
+
+    desc: str
+        The interface description.
+    """
+
+    def __init__(self, device: str, interface: str, profile: str, desc: str = ""):
+        if (profile_cls := PORT_PROFILES.get(profile)) is None:
+            raise FloorSpecError(
+                f"{device}:{interface}: unknown profile {profile!r}, "
+                f"expected one of: {', '.join(sorted(PORT_PROFILES))}"
+            )
+
+        self.device = device
+        self.interface = interface
+        self.profile: Type[InterfaceL2Access] = profile_cls
+        self.desc = desc
+
+
+class FloorSpec:
+    """
+    The declaration of a single building-floor design.
+
+    Attributes
+    ----------
+    name: str
+        The design name.
+
+    config: dict
+        The design config, including the "building", "floor", and "net_id"
+        values.
+
+    ports: List[PortSpec]
+        The interface profile assignments that vary from the standard design.
+    """
+
+    REQUIRED = ("building", "floor", "net_id")
+
+    def __init__(self, config: dict, ports: Optional[List[PortSpec]] = None):
+        if missing := [key for key in self.REQUIRED if key not in config]:
+            raise FloorSpecError(f"floor {config}: missing {', '.join(missing)}")
+
+        config = dict(config)
+        self.name: str = config.pop("name", f"b{config['building']}.f{config['floor']}")
+        self.config = config
+        self.ports = ports or list()
+
+
+def load_floor_specs(filepath: Path) -> List[FloorSpec]:
+    """
+    Load the floor specs from the spec file; see the file header for the file
+    format.
+
+    Parameters
+    ----------
+    filepath: Path
+        The floor spec file.
+
+    Returns
+    -------
+    List[FloorSpec]
+        The floor specs, in the file order.
+
+    Raises
+    ------
+    FloorSpecError
+        When the file is not valid; for example a profile name is unknown, or
+        the design name, network ID, or building-floor is not unique.
+    """
+    filepath = Path(filepath)
+    spec_data = _load_toml(filepath)
+    defaults = spec_data.get("defaults", {})
+
+    specs = list()
+    for floor_data in spec_data.get("floor", []):
+        floor_data = {**defaults, **floor_data}
+        try:
+            ports = [PortSpec(**port) for port in floor_data.pop("port", [])]
+        except TypeError as exc:
+            raise FloorSpecError(f"{filepath}: floor {floor_data}: port {exc}")
+
+        specs.append(FloorSpec(floor_data, ports))
+
+    for what, key in (
+        ("design name", lambda spec: spec.name),
+        ("net_id", lambda spec: spec.config["net_id"]),
+        (
+            "building-floor",
+            lambda spec: (spec.config["building"], spec.config["floor"]),
+        ),
+    ):
+        seen: Dict = dict()
+        for spec in specs:
+            if (prior := seen.setdefault(key(spec), spec.name)) != spec.name:
+                raise FloorSpecError(
+                    f"{filepath}: {spec.name}: {what} {key(spec)} duplicates {prior}"
+                )
+
+    return specs
+
+
+def build_floor_design(spec: FloorSpec, design: Optional[Design] = None) -> Design:
+    """
+    Build the standard building-floor design, and then apply the floor spec
+    port assignments.
+
+    Parameters
+    ----------
+    spec: FloorSpec
+        The floor spec.
+
+    design: Design, optional
+        The design instance to build, as created by netcad from the
+        `netcad.toml` file.  When not provided, a design instance is created
+        from the floor spec.
+
+    Returns
+    -------
+    Design
+        The built design instance.
+
+    Raises
+    ------
+    FloorSpecError
+        When a spec port names an unknown device, or a port that is not in the
+        device port range or is already used.
+    """
+    if design is None:
+        design = Design(name=spec.name, config=dict(spec.config))
+
+    create_std_design(design)
+
+    if not spec.ports:
+        return design
+
+    # the same as the b1_f1 design; the ports change the VLANs used on the
+    # core, so create the missing SVIs and rebuild the interface index.
+
+    dev_nn = design.config["nicknames"]
+
+    for port in spec.ports:
+        if (dev_obj := dev_nn.get(port.device)) is None:
+            raise FloorSpecError(
+                f"{spec.name}: unknown device {port.device!r}, "
+                f"expected one of: {', '.join(dev_nn)}"
+            )
+
+        # reserve the port using the device port allocator so that a spec port
+        # cannot take a port already used, for example by a core uplink or the
+        # access-point, or used by another spec port.
+
+        try:
+            ports = dev_obj.get_ports()
+            if owner := ports.owner(port.interface):
+                raise PortAllocationError(
+                    f"{dev_obj.name}: {port.interface} already allocated to {owner}"
+                )
+            ports.reserve(port.interface, owner=f"floor spec {spec.name}")
+
+        except PortAllocationError as exc:
+            raise FloorSpecError(f"{spec.name}: {exc}")
+
+        dev_obj.interfaces[port.interface].profile = port.profile(desc=port.desc)
+
+    update_design(design, reason="floor_spec_ports")
+    set_vlan_interfaces(design)
+    build_interface_index(design)
+
+    return design
+
+
+def iter_floor_designs(specs: Iterable[FloorSpec]) -> Iterator[Design]:
+    """
+    Yields the built design for each floor spec, one at a time, so that the
+    caller can generate the artifacts of each design and then release it before
+    the next design is built.
+
+    Parameters
+    ----------
+    specs: Iterable[FloorSpec]
+        The floor specs, see `load_floor_specs`.
+
+    Yields
+    ------
+    Design
+    """
+    for spec in specs:
+        yield build_floor_design(spec)
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _load_toml(filepath: Path) -> dict:
+    """returns the content of the TOML file"""
+    try:
+        import tomllib
+    except ImportError:
+        # Python < 3.11; the toml package is installed with netcad.
+        import toml
+
+        return toml.loads(filepath.read_text())
+
+    return tomllib.loads(filepath.read_text())
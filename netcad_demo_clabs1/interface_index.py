@@ -0,0 +1,226 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the design interface index.  The index classifies each
+# device interface in the design, once, so that the containerlab topology,
+# shard, and config generators do not each need to re-walk and re-classify all
+# of the device interfaces.
+#
+# The device checks are built by netcad itself, `netcad build checks`, which
+# does not use this index; only the generators of this package read it.
+#
+# The index is kept on the design `interface_index` attribute, rather than in
+# the design.config area, so that the design config remains serializable; for
+# example as part of the design snapshot cache key.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Tuple, Set
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+from netcad.device import Device, DeviceInterface
+from netcad.topology import TopologyServiceLike
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .profiling import span
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "InterfaceIndex",
+    "DeviceInterfaceIndex",
+    "build_interface_index",
+    "get_interface_index",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class DeviceInterfaceIndex:
+    """
+    The classification of the interfaces on a single device.  Each of the
+    lists retains the device interface order.
+
+    Attributes
+    ----------
+    device: Device
+        The device that is indexed.
+
+    cabled: List[DeviceInterface]
+        The interfaces that are cabled in the design.
+
+    used_uncabled: List[DeviceInterface]
+        The used interfaces that are not cabled, excluding the management and
+        virtual interfaces; for example a desk-user access port.
+
+    unused: List[DeviceInterface]
+        The interfaces that are not used, and not cabled.
+
+    mgmt: List[DeviceInterface]
+        The used interfaces whose profile is management-only.
+
+    virtual: List[DeviceInterface]
+        The used interfaces whose profile is virtual; for example SVIs.
+
+    uncabled: List[DeviceInterface]
+        The used-uncabled and unused interfaces, in device interface order.
+        These are the interfaces that need to be created in the containerlab
+        topology without a cable to another device.
+
+    clab_names: Dict[str, str]
+        The containerlab endpoint name, for example "core01.11:et1", by
+        interface name.
+    """
+
+    def __init__(self, device: Device, cabled_ports: Set[DeviceInterface]):
+        self.device = device
+        self.cabled: List[DeviceInterface] = list()
+        self.used_uncabled: List[DeviceInterface] = list()
+        self.unused: List[DeviceInterface] = list()
+        self.mgmt: List[DeviceInterface] = list()
+        self.virtual: List[DeviceInterface] = list()
+        self.uncabled: List[DeviceInterface] = list()
+        self.clab_names: Dict[str, str] = dict()
+
+        dev_name = device.name
+
+        for ifobj in device.interfaces.values():
+            self.clab_names[ifobj.name] = f"{dev_name}:{ifobj.short_name.lower()}"
+
+            if ifobj in cabled_ports:
+                self.cabled.append(ifobj)
+                continue
+
+            if not ifobj.used:
+                self.unused.append(ifobj)
+                self.uncabled.append(ifobj)
+                continue
+
+            if ifobj.profile.is_mgmt_only:
+                self.mgmt.append(ifobj)
+            elif ifobj.profile.is_virtual:
+                self.virtual.append(ifobj)
+            else:
+                self.used_uncabled.append(ifobj)
+                self.uncabled.append(ifobj)
+
+    def clab_name(self, ifobj: DeviceInterface) -> str:
+        """returns the containerlab endpoint name for the interface"""
+        return self.clab_names[ifobj.name]
+
+
+class InterfaceIndex:
+    """
+    The classification of all device interfaces in a design.  The index is
+    built once the design is complete, see `build_interface_index`.
+
+    Attributes
+    ----------
+    cables: List[Tuple[DeviceInterface, DeviceInterface]]
+        The cable endpoints, in the design cabling order.  Each endpoint pair
+        is ordered by (device, interface).
+
+    cabled_ports: Set[DeviceInterface]
+        All cabled interfaces in the design.
+
+    devices: Dict[str, DeviceInterfaceIndex]
+        The device interface index, by device name.
+    """
+
+    def __init__(self, design: Design):
+        # TODO: should not use hardcoded 'topology', but for demo ok.
+        topo_svc: TopologyServiceLike = design.services["topology"]
+
+        self.cables: List[Tuple[DeviceInterface, DeviceInterface]] = list()
+        self.cabled_ports: Set[DeviceInterface] = set()
+
+        for endpoints in topo_svc.cabling.cables.values():
+            end_a, end_b = sorted(endpoints, key=lambda e: (e.device, e))
+            self.cables.append((end_a, end_b))
+            self.cabled_ports.update((end_a, end_b))
+
+        self.devices: Dict[str, DeviceInterfaceIndex] = {
+            dev_name: DeviceInterfaceIndex(dev_obj, self.cabled_ports)
+            for dev_name, dev_obj in design.devices.items()
+        }
+
+    def clab_name(self, ifobj: DeviceInterface) -> str:
+        """returns the containerlab endpoint name for the interface"""
+        return self.devices[ifobj.device.name].clab_name(ifobj)
+
+
+def build_interface_index(design: Design) -> InterfaceIndex:
+    """
+    Build the interface index for the design, and store it as the design
+    `interface_index` attribute so that it can be retrieved by the generators.
+    This function should be called once the design is complete; that is after
+    the final `design.update()`.  Calling this function again rebuilds the
+    index.
+
+    Parameters
+    ----------
+    design: Design
+        The completed design instance.
+
+    Returns
+    -------
+    InterfaceIndex
+    """
+    with span("interface_index"):
+        design.interface_index = if_index = InterfaceIndex(design)
+
+    return if_index
+
+
+def get_interface_index(design: Design) -> InterfaceIndex:
+    """
+    Returns the interface index for the design; building it if it was not
+    already built.
+
+    Parameters
+    ----------
+    design: Design
+        The completed design instance.
+
+    Returns
+    -------
+    InterfaceIndex
+    """
+    return getattr(design, "interface_index", None) or build_interface_index(design)
@@ -25,27 +25,77 @@
 # used in the design.
 # =============================================================================
 
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Any, Dict, Hashable, Tuple
+
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
 from netcad.design import Design
 from netcad.ipam import IPAM
+from netcad.vlans import VlanProfile
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
-from . import vlans
+from .mgmt_ipam import DEFAULT_OOB_PREFIX
+from .site_ipam import get_site_ipam
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["create_site_ipam"]
+__all__ = ["create_site_ipam", "DesignIPAM"]
+
+
+class DesignIPAM(IPAM):
+    """
+    The design IPAM, indexing the VLAN associated subnets by VLAN-ID value so
+    that the subnet for a VLAN is found without scanning all of the subnets.
+
+    Attributes
+    ----------
+    vlan_subnets: Dict[int, Tuple[VlanProfile, IPAMNetwork]]
+        The VLAN, and its IPAM network, by VLAN-ID.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vlan_subnets: Dict[int, Tuple[VlanProfile, Any]] = dict()
+
+    def network(self, name: Hashable, *args, **kwargs):
+        """
+        Add the network to the IPAM, and to the VLAN index when the network
+        name is a VLAN.
+
+        Raises
+        ------
+        ValueError
+            When a different VLAN with the same VLAN-ID already has a subnet;
+            there can only be one "Vlan<n>" interface per device.
+        """
+        if isinstance(name, VlanProfile):
+            indexed = self.vlan_subnets.get(name.vlan_id)
+            if indexed and indexed[0] != name:
+                raise ValueError(
+                    f"{self.name}: VLAN {name.name} has the same VLAN-ID "
+                    f"{name.vlan_id} as {indexed[0].name}"
+                )
+
+        ipam_net = super().network(name, *args, **kwargs)
 
+        if isinstance(name, VlanProfile):
+            self.vlan_subnets[name.vlan_id] = (name, self[name])
 
-def create_site_ipam(design: Design) -> IPAM:
+        return ipam_net
+
+
+def create_site_ipam(design: Design) -> DesignIPAM:
     """
     This function is responsible for creating the IP subnets used in the design.
     These subnets are associated into an IPAM instance object.  Many of the
@@ -53,6 +103,9 @@ def create_site_ipam(design: Design) -> IPAM:
     easily create SVI interfaces based on recognizing these names are Vlans.
     Refer to the file `designs.std_design.py` for example.
 
+    The VLAN subnets are those of the design building and floor, as carved from
+    the campus-wide IPAM; see `site_ipam.py`.
+
     Notes
     -----
     The IPAM instance created in this function is also added into the
@@ -67,28 +120,32 @@ def create_site_ipam(design: Design) -> IPAM:
 
     Returns
     -------
-    IPAM
+    DesignIPAM
         The IPAM instance that was created in this function.
     """
-    ipam = IPAM(name=design.name)
+    ipam = DesignIPAM(name=design.name)
 
     # The OOB network **MUST** be whatever the containerlab system is using for
     # management bridging.  Mine happened to be the 172.20.20.0/24.  Your
-    # milleage may vary, so if you are trying to use this, be aware.
-    # TODO: should make this setting in the `netcad.toml` config file somehow.
-
-    ipam.network("OOB", prefix="172.20.20.0/24")
+    # milleage may vary, so if you are trying to use this, set the design config
+    # "oob_prefix" value in the `netcad.toml` config file.
 
-    ipam.network(name=vlans.vlan_phones, prefix="10.10.1.0/24")
-    ipam.network(name=vlans.vlan_printers, prefix="10.10.2.0/24")
-    ipam.network(name=vlans.vlan_media_iptvs, prefix="10.10.3.0/24")
+    ipam.network("OOB", prefix=design.config.get("oob_prefix", DEFAULT_OOB_PREFIX))
 
-    ipam.network(name=vlans.vlan_wifi_employee, prefix="10.100.1.0/24")
-    ipam.network(name=vlans.vlan_employee_desk, prefix="10.101.1.0/24")
+    # The VLAN subnets are carved from the campus-wide IPAM by building and
+    # floor; the campus IPAM is shared by all designs, so the design IPAM only
+    # holds the subnets of this floor.  The design IPAM is a copy of the floor
+    # allocation rather than a view onto the campus IPAM, since netcad needs
+    # an IPAM instance of its own per design, with its own IPAM networks, for
+    # the design.ipams and the SVI interface addresses.
 
-    ipam.network(name=vlans.vlan_wifi_visitor, prefix="10.200.1.0/24")
+    site_ipam = get_site_ipam(design.config)
+    floor_subnets = site_ipam.floor_subnets(
+        bld_id=design.config["building"], flr_id=design.config["floor"]
+    )
 
-    ipam.network(name=vlans.vlan_inband_mgmt, prefix="10.254.1.0/24")
+    for vlan, subnet in floor_subnets.items():
+        ipam.network(name=vlan, prefix=subnet)
 
     design.ipams[0] = ipam
     return ipam
@@ -0,0 +1,350 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the management (OOB) address allocator.  The OOB network
+# is carved into equal sized chunks, one per design "network ID", and each
+# device in the design is assigned a host address within the chunk.  The
+# subnet and host addresses are computed arithmetically; there is no need to
+# walk the subnets of the OOB network.
+#
+# The assignments for all designs can be stored in a single address table file
+# so that duplicate addresses across designs are detected.  The table file is
+# only written by the `netcad clab mgmt-table` command; the assignments of the
+# designs built by a command are otherwise only shared within the process, so
+# the designs built by the `--jobs` worker processes are only checked against
+# the table file, and not against each other.
+#
+# The table assignments within the management subnet of a design are part of
+# the design snapshot cache key, see clabs_cache.py; storing the table only
+# invalidates the snapshots of the designs whose subnet assignments changed.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterable, Optional, Tuple, Union
+from pathlib import Path
+from functools import lru_cache
+from ipaddress import IPv4Address, IPv4Interface, IPv4Network
+import json
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "MgmtAllocator",
+    "MgmtAddressTable",
+    "MgmtAddressError",
+    "get_mgmt_allocator",
+    "DEFAULT_OOB_PREFIX",
+    "DEFAULT_OOB_CHUNK_PREFIXLEN",
+    "DEFAULT_MGMT_TABLE",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The OOB network **MUST** be whatever the containerlab system is using for
+# management bridging.  These defaults can be changed using the design config
+# values "oob_prefix" and "oob_chunk_prefixlen" in the `netcad.toml` file.
+
+DEFAULT_OOB_PREFIX = "172.20.20.0/24"
+DEFAULT_OOB_CHUNK_PREFIXLEN = 28
+
+# The management address table file, for all designs.
+
+DEFAULT_MGMT_TABLE = Path(".netcad") / "mgmt-addresses.json"
+
+
+class MgmtAddressError(ValueError):
+    """
+    Raised when a management address cannot be assigned; either the OOB network
+    has no more capacity, or the address is a duplicate.
+    """
+
+
+class MgmtAddressTable:
+    """
+    The management address assignments for all designs, by device hostname.
+    The table is stored as a JSON file.
+
+    Attributes
+    ----------
+    filepath: Path
+        The table file.
+
+    hosts: Dict[str, str]
+        The management IP address, by device hostname.
+    """
+
+    def __init__(self, filepath: Path = DEFAULT_MGMT_TABLE):
+        self.filepath = Path(filepath)
+        self.hosts: Dict[str, str] = dict()
+        self._owners: Dict[str, str] = dict()
+
+        if self.filepath.exists():
+            self.update(json.loads(self.filepath.read_text()))
+
+    def update(self, assignments: Dict[str, Union[str, IPv4Interface]]):
+        """
+        Add the assignments to the table, replacing any prior assignment of the
+        same hostname.
+
+        Raises
+        ------
+        MgmtAddressError
+            When an address is already assigned to a different hostname.
+        """
+        for hostname, if_ipaddr in assignments.items():
+            ip = str(if_ipaddr).split("/")[0]
+            owner = self._owners.get(ip)
+            if owner and owner != hostname:
+                raise MgmtAddressError(
+                    f"{hostname}: management address {ip} already assigned to {owner}"
+                )
+
+            if prior_ip := self.hosts.get(hostname):
+                del self._owners[prior_ip]
+
+            self.hosts[hostname] = ip
+            self._owners[ip] = hostname
+
+    def clear(self):
+        """remove all of the assignments from the table"""
+        self.hosts.clear()
+        self._owners.clear()
+
+    def owner(self, ip: str) -> Optional[str]:
+        """returns the hostname assigned the IP address, if any"""
+        return self._owners.get(ip)
+
+    def within(self, subnet: IPv4Network) -> Dict[str, str]:
+        """returns the assignments whose address is within the subnet"""
+        return {
+            hostname: ip
+            for hostname, ip in self.hosts.items()
+            if IPv4Address(ip) in subnet
+        }
+
+    def save(self):
+        """store the table file"""
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.filepath.write_text(json.dumps(self.hosts, indent=1, sort_keys=True))
+
+
+class MgmtAllocator:
+    """
+    Computes the management subnet of each design, and the management address
+    of each device in the design.
+
+    The OOB network is carved into chunks of `chunk_prefixlen`; the design
+    network ID value selects the chunk, so net_id=1 is the first chunk, net_id=2
+    the second, and so on.  Within the chunk each device is given a host
+    address by its index; the first host address is reserved for the
+    containerlab host interface.
+
+    Attributes
+    ----------
+    oob_network: IPv4Network
+        The OOB network.
+
+    chunk_prefixlen: int
+        The prefix length of each design management subnet.
+
+    table: MgmtAddressTable, optional
+        When provided, the assignments are checked against the table for
+        duplicates assigned to other devices, and each assignment is recorded
+        in the table so that later assignments, for example of other designs
+        built in the same process, are checked against it.
+    """
+
+    # offset of the first device host address in the chunk; .1 is assigned to
+    # the containerlab system host interface.
+
+    FIRST_HOST_OFFSET = 2
+
+    def __init__(
+        self,
+        oob_prefix: Union[str, IPv4Network] = DEFAULT_OOB_PREFIX,
+        chunk_prefixlen: int = DEFAULT_OOB_CHUNK_PREFIXLEN,
+        table: Optional[MgmtAddressTable] = None,
+    ):
+        self.oob_network = IPv4Network(oob_prefix)
+
+        if not self.oob_network.prefixlen <= chunk_prefixlen <= 30:
+            raise MgmtAddressError(
+                f"chunk prefix length /{chunk_prefixlen} not valid for "
+                f"OOB network {self.oob_network}"
+            )
+
+        self.chunk_prefixlen = chunk_prefixlen
+        self.chunk_size = 1 << (32 - chunk_prefixlen)
+        self.max_net_id = 1 << (chunk_prefixlen - self.oob_network.prefixlen)
+        self.max_hosts = self.chunk_size - self.FIRST_HOST_OFFSET - 1
+        self.table = table
+
+        self._base = int(self.oob_network.network_address)
+
+    def subnet(self, net_id: int) -> IPv4Network:
+        """
+        Returns the management subnet for the design network ID.
+
+        Raises
+        ------
+        MgmtAddressError
+            When the network ID is outside the OOB network.
+        """
+        self._check_net_id(net_id)
+        subnet_base = self._base + (net_id - 1) * self.chunk_size
+        return IPv4Network((subnet_base, self.chunk_prefixlen))
+
+    def address(self, net_id: int, host_index: int) -> IPv4Interface:
+        """
+        Returns the management interface address for the device host index,
+        starting at 0, within the design network ID.  The interface uses the
+        OOB network prefix length, since all of the devices share the OOB
+        network.
+
+        Raises
+        ------
+        MgmtAddressError
+            When the network ID or host index is out of range.
+        """
+        self._check_net_id(net_id)
+
+        if not 0 <= host_index < self.max_hosts:
+            raise MgmtAddressError(
+                f"host index {host_index} out of range; a /{self.chunk_prefixlen} "
+                f"management subnet has room for {self.max_hosts} devices"
+            )
+
+        host_ip = (
+            self._base
+            + (net_id - 1) * self.chunk_size
+            + self.FIRST_HOST_OFFSET
+            + host_index
+        )
+        return IPv4Interface((host_ip, self.oob_network.prefixlen))
+
+    def assign(
+        self, requests: Iterable[Tuple[str, int, int]]
+    ) -> Dict[str, IPv4Interface]:
+        """
+        Assign the management addresses for a batch of devices.
+
+        Parameters
+        ----------
+        requests: Iterable[Tuple[str, int, int]]
+            The (hostname, net_id, host_index) of each device.
+
+        Returns
+        -------
+        Dict[str, IPv4Interface]
+            The management interface address, by hostname.
+
+        Raises
+        ------
+        MgmtAddressError
+            When an address is out of range, or is assigned to more than one
+            device in the batch, or is assigned to a different device in the
+            address table.  None of the batch assignments are recorded in the
+            address table.
+        """
+        assignments: Dict[str, IPv4Interface] = dict()
+        owners: Dict[IPv4Interface, str] = dict()
+
+        for hostname, net_id, host_index in requests:
+            if_ipaddr = self.address(net_id, host_index)
+
+            if (owner := owners.setdefault(if_ipaddr, hostname)) != hostname:
+                raise MgmtAddressError(
+                    f"{hostname}: management address {if_ipaddr.ip} "
+                    f"duplicates {owner}"
+                )
+
+            if self.table and (owner := self.table.owner(str(if_ipaddr.ip))):
+                if owner != hostname:
+                    raise MgmtAddressError(
+                        f"{hostname}: management address {if_ipaddr.ip} "
+                        f"already assigned to {owner}"
+                    )
+
+            assignments[hostname] = if_ipaddr
+
+        if self.table:
+            self.table.update(assignments)
+
+        return assignments
+
+    def _check_net_id(self, net_id: int):
+        """raises MgmtAddressError if the network ID is outside the OOB network"""
+        if not 1 <= net_id <= self.max_net_id:
+            raise MgmtAddressError(
+                f"net_id {net_id} out of range; OOB network {self.oob_network} "
+                f"has {self.max_net_id} /{self.chunk_prefixlen} subnets"
+            )
+
+
+def get_mgmt_allocator(design_config: dict) -> MgmtAllocator:
+    """
+    Returns the management allocator for the design config values
+    "oob_prefix" and "oob_chunk_prefixlen".  The allocator is shared by all
+    designs using the same values in this process, and the address table is
+    shared by all designs.
+
+    Parameters
+    ----------
+    design_config: dict
+        The design config, as defined in the `netcad.toml` file.
+
+    Returns
+    -------
+    MgmtAllocator
+    """
+    return _get_mgmt_allocator(
+        design_config.get("oob_prefix", DEFAULT_OOB_PREFIX),
+        design_config.get("oob_chunk_prefixlen", DEFAULT_OOB_CHUNK_PREFIXLEN),
+    )
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+@lru_cache()
+def _get_mgmt_allocator(oob_prefix: str, chunk_prefixlen: int) -> MgmtAllocator:
+    """cached by OOB values; see `get_mgmt_allocator`"""
+    return MgmtAllocator(oob_prefix, chunk_prefixlen, table=_get_mgmt_table())
+
+
+@lru_cache()
+def _get_mgmt_table() -> MgmtAddressTable:
+    """the address table of all designs built in this process"""
+    return MgmtAddressTable()
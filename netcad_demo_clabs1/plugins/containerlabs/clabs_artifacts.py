@@ -0,0 +1,456 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the artifact writer used when saving generated files such
+# as the containerlab topology files, device configs, and check files.  A file
+# is only (re)written when its content changed so that the file mtime is not
+# bumped for content that is the same as the prior run.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Callable, Dict, List, Optional, Union, Iterable, Tuple
+from pathlib import Path
+import functools
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["ArtifactWriter", "stage_artifact"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                               CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def stage_artifact(
+    filepath: Path, chunks: Iterable[Union[str, bytes]]
+) -> Tuple[Path, str]:
+    """
+    Write the content chunks, as they are produced, into a temporary file in
+    the same directory as the artifact file; computing the content hash along
+    the way.  The staged file is then given to `ArtifactWriter.commit_staged`
+    to be moved into place, or discarded if the content did not change.  This
+    function can be used in a worker process, leaving the commit to the main
+    process.
+
+    Parameters
+    ----------
+    filepath: Path
+        The artifact file path.
+
+    chunks: Iterable[str|bytes]
+        The artifact content; str chunks are UTF-8 encoded.
+
+    Returns
+    -------
+    tuple
+        The staged temporary file path, and the content sha256 hex digest.
+    """
+    filepath = Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile(
+        dir=filepath.parent, prefix=f".{filepath.name}.", delete=False
+    ) as ofile:
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                ofile.write(chunk)
+
+        except BaseException:
+            ofile.close()
+            os.unlink(ofile.name)
+            raise
+
+    return Path(ofile.name), digest.hexdigest()
+
+
+class ArtifactWriter:
+    """
+    Writes generated artifact files into a root directory, only when the
+    content of the file changed.  The content hash of each file written is kept
+    in a manifest file in the root directory so that the unchanged files can be
+    detected without reading them back.
+
+    Examples
+    --------
+        with ArtifactWriter(save_dir) as writer:
+            for name, content in ...:
+                writer.write(save_dir / name, content)
+
+        writer.report()
+
+    Attributes
+    ----------
+    root_dir: Path
+        The directory where the artifacts, and the manifest, are stored.
+
+    changed: List[Path]
+        The files that were written because their content changed.
+
+    unchanged: List[Path]
+        The files that were not written since their content was the same.
+
+    removed: List[Path]
+        The previously generated files that were removed.
+    """
+
+    MANIFEST_NAME = ".netcad-artifacts.json"
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = Path(root_dir)
+        self.manifest_file = self.root_dir / self.MANIFEST_NAME
+        self.manifest: Dict[str, dict] = self._load_manifest()
+
+        self.changed: List[Path] = list()
+        self.unchanged: List[Path] = list()
+        self.removed: List[Path] = list()
+
+    # -------------------------------------------------------------------------
+    # Public methods
+    # -------------------------------------------------------------------------
+
+    def write(self, filepath: Path, content: Union[str, bytes]) -> bool:
+        """
+        Write the content to the file if the content is different from what is
+        already stored in the file.  The write is atomic; the content is first
+        written to a temporary file in the same directory and then renamed.
+
+        Parameters
+        ----------
+        filepath: Path
+            The artifact file path.
+
+        content: str|bytes
+            The artifact content; str content is UTF-8 encoded.
+
+        Returns
+        -------
+        bool
+            True if the file was written, False if the content was unchanged.
+        """
+        if isinstance(content, str):
+            content = content.encode()
+
+        filepath = Path(filepath)
+        digest = hashlib.sha256(content).hexdigest()
+
+        if self._is_unchanged(filepath, digest):
+            self.unchanged.append(filepath)
+            return False
+
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(
+            dir=filepath.parent, prefix=f".{filepath.name}.", delete=False
+        ) as ofile:
+            ofile.write(content)
+
+        self._commit(Path(ofile.name), filepath, digest)
+        return True
+
+    def write_chunks(self, filepath: Path, chunks: Iterable[Union[str, bytes]]) -> bool:
+        """
+        Write the content chunks to the file, if the content is different from
+        what is already stored in the file.  The chunks are streamed to disk so
+        that the complete content is never held in memory.
+
+        Parameters
+        ----------
+        filepath: Path
+            The artifact file path.
+
+        chunks: Iterable[str|bytes]
+            The artifact content, for example from `jinja2.Template.generate`.
+
+        Returns
+        -------
+        bool
+            True if the file was written, False if the content was unchanged.
+        """
+        return self.commit_staged(filepath, stage_artifact(filepath, chunks))
+
+    def commit_staged(self, filepath: Path, staged: Tuple[Path, str]) -> bool:
+        """
+        Move the staged file, see `stage_artifact`, into place if the content
+        changed; otherwise the staged file is removed.
+
+        Parameters
+        ----------
+        filepath: Path
+            The artifact file path.
+
+        staged: tuple
+            The staged temporary file path, and the content hash.
+
+        Returns
+        -------
+        bool
+            True if the file was written, False if the content was unchanged.
+        """
+        filepath = Path(filepath)
+        tmp_file, digest = staged
+
+        if self._is_unchanged(filepath, digest):
+            Path(tmp_file).unlink()
+            self.unchanged.append(filepath)
+            return False
+
+        self._commit(Path(tmp_file), filepath, digest)
+        return True
+
+    def keep_current(self, filepath: Path) -> bool:
+        """
+        Keep the file as-is, without regenerating its content, when the file is
+        the same as when it was last written by the writer; that is the size
+        and mtime match the manifest.  A file that is kept is counted as
+        unchanged.
+
+        Parameters
+        ----------
+        filepath: Path
+            The artifact file path.
+
+        Returns
+        -------
+        bool
+            True if the file was kept, False if the file must be regenerated.
+        """
+        filepath = Path(filepath)
+
+        try:
+            st = filepath.stat()
+        except FileNotFoundError:
+            return False
+
+        entry = self.manifest.get(self._key(filepath))
+        if not entry or (entry["size"], entry["mtime_ns"]) != (
+            st.st_size,
+            st.st_mtime_ns,
+        ):
+            return False
+
+        self.unchanged.append(filepath)
+        return True
+
+    def remove_stale(
+        self,
+        directory: Path,
+        pattern: str = "*",
+        select: Optional[Callable[[Path], bool]] = None,
+    ) -> List[Path]:
+        """
+        Remove the files in the directory that match the pattern, were
+        generated by a prior run (that is, are recorded in the manifest), and
+        were not written in this run.  Files that were never generated by the
+        writer are not touched.
+
+        Parameters
+        ----------
+        directory: Path
+            The directory to examine.
+
+        pattern: str
+            The glob pattern used to select files in the directory.
+
+        select: Callable, optional
+            When given, only the files for which select returns True are
+            removed; for example the files of the designs used in this run.
+
+        Returns
+        -------
+        List[Path]
+            The files that were removed.
+        """
+        written = {self._key(each) for each in self.changed + self.unchanged}
+        removed = list()
+
+        for filepath in sorted(Path(directory).glob(pattern)):
+            key = self._key(filepath)
+            if key in written or key not in self.manifest:
+                continue
+
+            if select and not select(filepath):
+                continue
+
+            self.remove(filepath)
+            removed.append(filepath)
+
+        return removed
+
+    def remove(self, filepath: Path):
+        """
+        Remove the file, and its manifest entry; for example a file that is
+        replaced by a file of a different name.
+        """
+        filepath = Path(filepath)
+        filepath.unlink(missing_ok=True)
+        self.manifest.pop(self._key(filepath), None)
+        self.removed.append(filepath)
+
+    def save_manifest(self):
+        """
+        Store the manifest of content hashes into the root directory.
+        """
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(self.manifest, indent=1, sort_keys=True)
+        self.manifest_file.write_text(content)
+
+    def report(self):
+        """
+        Print a summary of the changed, unchanged, and removed files.
+        """
+        for filepath in self.changed:
+            print(f"SAVE: {filepath}")
+
+        for filepath in self.removed:
+            print(f"REMOVE: {filepath}")
+
+        print(
+            f"{self.root_dir}: {len(self.changed)} changed, "
+            f"{len(self.unchanged)} unchanged, {len(self.removed)} removed"
+        )
+
+    # -------------------------------------------------------------------------
+    # Context manager, saves the manifest on exit
+    # -------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.save_manifest()
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+
+    def _key(self, filepath: Path) -> str:
+        """returns the manifest key for the given file path"""
+        filepath = Path(filepath).absolute()
+        try:
+            return str(filepath.relative_to(self.root_dir.absolute()))
+        except ValueError:
+            return str(filepath)
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        """returns the manifest content, or empty if there is no valid manifest"""
+        try:
+            return json.loads(self.manifest_file.read_text())
+        except (OSError, ValueError):
+            return dict()
+
+    def _is_unchanged(self, filepath: Path, digest: str) -> bool:
+        """
+        Returns True if the file on disk has the same content hash.  The
+        manifest is used when the file size and mtime match what was recorded;
+        otherwise the file content is hashed.
+        """
+        try:
+            st = filepath.stat()
+        except FileNotFoundError:
+            return False
+
+        key = self._key(filepath)
+        entry = self.manifest.get(key)
+
+        if entry and (entry["size"], entry["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            return entry["sha256"] == digest
+
+        ondisk_digest = hashlib.sha256(filepath.read_bytes()).hexdigest()
+        if ondisk_digest != digest:
+            return False
+
+        # the file content is the same, but the manifest was out of date.
+        self._record(filepath, digest)
+        return True
+
+    def _commit(self, tmp_file: Path, filepath: Path, digest: str):
+        """rename the written temporary file into place, and record it"""
+        try:
+            os.chmod(tmp_file, _file_mode(filepath))
+            os.replace(tmp_file, filepath)
+        except OSError:
+            tmp_file.unlink()
+            raise
+
+        self._record(filepath, digest)
+        self.changed.append(filepath)
+
+    def _record(self, filepath: Path, digest: str):
+        """record the file content hash, size and mtime in the manifest"""
+        st = filepath.stat()
+        self.manifest[self._key(filepath)] = dict(
+            sha256=digest, size=st.st_size, mtime_ns=st.st_mtime_ns
+        )
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _file_mode(filepath: Path) -> int:
+    """
+    Returns the mode given to the written file; the mode of the existing file,
+    or the mode of a file created via open(), since files created via tempfile
+    are always mode 0600.
+    """
+    try:
+        return stat.S_IMODE(filepath.stat().st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_process_umask()
+
+
+@functools.lru_cache(maxsize=None)
+def _process_umask() -> int:
+    """
+    Returns the process umask, read once on first use.  The umask is read from
+    /proc when available since os.umask can only read the umask by changing it,
+    which is not safe when other threads are creating files.
+    """
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("Umask:"):
+                return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
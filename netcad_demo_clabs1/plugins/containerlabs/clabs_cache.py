@@ -0,0 +1,299 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Optional, Sequence, List, Tuple
+from pathlib import Path
+from functools import lru_cache
+import hashlib
+import importlib.metadata
+import pickle
+import json
+import os
+import re
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design, load_design
+from netcad.config import netcad_globals
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .consts import DEFAULT_CACHE_DIR, ENV_CACHE_DIR
+from ...mgmt_ipam import DEFAULT_MGMT_TABLE, MgmtAddressTable, get_mgmt_allocator
+from ...profiling import span
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "get_cache_dir",
+    "load_design_cached",
+    "clear_design_cache",
+    "get_sources_digest",
+]
+
+# the directory of the design package, all of the files in this package are
+# part of the design snapshot cache key.
+
+_DESIGN_PACKAGE_DIR = Path(__file__).parents[2]
+
+# the netcad device-type specs of the project, used when the design devices are
+# created; these are part of the design snapshot cache key.
+
+_DEVICE_TYPES_DIR = Path(".netcad") / "device-types"
+
+# the snapshot file name form, "<design-name>-<cache-key>.pickle"
+
+_SNAPSHOT_FILE = re.compile(r"(?P<name>.+)-[0-9a-f]{16}\.pickle")
+
+
+# -----------------------------------------------------------------------------
+#
+#                               CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+def get_cache_dir(name: str) -> Path:
+    """
+    Returns the named cache directory within the project cache directory,
+    creating it if it does not exist.
+
+    Parameters
+    ----------
+    name: str
+        The name of the cache, for example "jinja2".
+
+    Returns
+    -------
+    Path
+        The cache directory path.
+    """
+    cache_dir = Path(os.environ.get(ENV_CACHE_DIR) or DEFAULT_CACHE_DIR) / name
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def load_design_cached(design_name: str, use_cache: bool = True) -> Design:
+    """
+    Load the design, using the design snapshot cache.  When the cache contains
+    a snapshot of the fully built design, and none of the design inputs, for
+    example the design package sources or the design config, changed since the
+    snapshot was taken, then the snapshot is loaded rather than re-building the
+    design; see `_design_cache_key` for the inputs.  Otherwise the design is
+    built and a new snapshot is stored.
+
+    Parameters
+    ----------
+    design_name: str
+        The design name as defined in the `netcad.toml` configuration file.
+
+    use_cache: bool
+        When False the design is built without using or updating the cache.
+
+    Returns
+    -------
+    Design
+        The fully built design instance.
+    """
+    if not use_cache:
+        with span("load_design"):
+            return load_design(design_name)
+
+    cache_dir = get_cache_dir("designs")
+    cache_file = cache_dir / f"{design_name}-{_design_cache_key(design_name)}.pickle"
+
+    if cache_file.exists():
+        try:
+            with span("load_snapshot"):
+                return pickle.loads(cache_file.read_bytes())
+        except Exception:  # noqa
+            # the snapshot is corrupt, or refers to code that no longer
+            # exists; rebuild the design.
+            cache_file.unlink()
+
+    with span("load_design"):
+        design_obj = load_design(design_name)
+
+    try:
+        snapshot = pickle.dumps(design_obj, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:  # noqa
+        # the design contains something that cannot be stored, so the design
+        # is used without caching it.
+        return design_obj
+
+    clear_design_cache([design_name])
+
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp_file.write_bytes(snapshot)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+    return design_obj
+
+
+def clear_design_cache(design_names: Optional[Sequence[str]] = None) -> List[Path]:
+    """
+    Remove the design snapshots from the cache.
+
+    Parameters
+    ----------
+    design_names: Sequence[str], optional
+        The names of the designs to remove.  If not provided, then all design
+        snapshots are removed.
+
+    Returns
+    -------
+    List[Path]
+        The snapshot files that were removed.
+    """
+    cache_dir = get_cache_dir("designs")
+    names = set(design_names or ())
+
+    removed = list()
+    for cache_file in sorted(cache_dir.glob("*.pickle")):
+        if not (found := _SNAPSHOT_FILE.fullmatch(cache_file.name)):
+            continue
+        if names and found.group("name") not in names:
+            continue
+
+        cache_file.unlink()
+        removed.append(cache_file)
+
+    return removed
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _design_cache_key(design_name: str) -> str:
+    """
+    Returns the snapshot cache key for the design; which is the hash of the
+    inputs read when the design is built:
+
+        * the design package sources, and the project templates
+        * the design config, and the floor spec file it refers to, if any
+        * the project device-type specs
+        * the management address table assignments within the design
+          management subnet
+        * the installed netcad version
+    """
+    digest = hashlib.sha256(
+        get_sources_digest(_DESIGN_PACKAGE_DIR, Path("templates")).encode()
+    )
+    digest.update(get_sources_digest(_DEVICE_TYPES_DIR, suffixes=(".json",)).encode())
+
+    design_config = netcad_globals.g_netcad_designs[design_name]
+    digest.update(json.dumps(design_config, sort_keys=True, default=str).encode())
+
+    if spec_file := design_config.get("spec_file"):
+        digest.update(_file_digest(Path(spec_file)))
+
+    digest.update(_mgmt_table_digest(design_config))
+    digest.update(_netcad_version().encode())
+
+    return digest.hexdigest()[:16]
+
+
+def _mgmt_table_digest(design_config: dict) -> bytes:
+    """
+    returns the hash of the address table assignments within the design
+    management subnet, the only assignments that can conflict with those of
+    the design; or the hash of the table file when the design subnet is not
+    known from the design config, for example a floor spec design.
+    """
+    try:
+        subnet = get_mgmt_allocator(design_config).subnet(design_config["net_id"])
+        hosts = MgmtAddressTable(DEFAULT_MGMT_TABLE).within(subnet)
+    except (KeyError, ValueError, OSError):
+        return _file_digest(DEFAULT_MGMT_TABLE)
+
+    return hashlib.sha256(json.dumps(hosts, sort_keys=True).encode()).digest()
+
+
+def _file_digest(filepath: Path) -> bytes:
+    """returns the hash of the file content, or of the empty content if missing"""
+    try:
+        return hashlib.sha256(filepath.read_bytes()).digest()
+    except OSError:
+        return hashlib.sha256().digest()
+
+
+@lru_cache()
+def _netcad_version() -> str:
+    """returns the installed netcad package version"""
+    try:
+        return importlib.metadata.version("netcad")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def get_sources_digest(
+    *src_dirs: Path, suffixes: Tuple[str, ...] = (".py", ".jinja2")
+) -> str:
+    """
+    Returns the hash of the source files in the directories, by default the
+    design package directory.  The value is computed once per process.
+
+    Parameters
+    ----------
+    src_dirs: Path
+        The source directories.
+
+    suffixes: Tuple[str]
+        The suffixes of the source files to include.
+
+    Returns
+    -------
+    str
+        The sha256 hex digest.
+    """
+    return _sources_digest(src_dirs or (_DESIGN_PACKAGE_DIR,), suffixes)
+
+
+@lru_cache()
+def _sources_digest(src_dirs: Tuple[Path, ...], suffixes: Tuple[str, ...]) -> str:
+    """cached by the directories and suffixes; see `get_sources_digest`"""
+    digest = hashlib.sha256()
+
+    for src_dir in src_dirs:
+        for src_file in sorted(src_dir.rglob("*")):
+            if not src_file.is_file() or src_file.suffix not in suffixes:
+                continue
+
+            digest.update(str(src_file.relative_to(src_dir)).encode())
+            digest.update(src_file.read_bytes())
+
+    return digest.hexdigest()
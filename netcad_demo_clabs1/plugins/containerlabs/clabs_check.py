@@ -0,0 +1,347 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the lab check runner.  The generated checks of each device
+# are validated against the live device state, collected using eAPI, for all
+# of the devices concurrently:
+#
+#   * the number of devices validated at the same time is limited
+#   * each device uses one eAPI session, one keep-alive connection, for all of
+#     its check families
+#   * the eAPI responses are parsed into the device state snapshot form, and
+#     then evaluated by the offline check engine; see check_engine.py
+#
+# The latency of each eAPI request is recorded, by device and by check family,
+# so that the percentiles can be reported.
+#
+# The device family checks, for example the product model, are not evaluated
+# since the check engine has no device state section for them; they are
+# counted as not evaluated in the results, see `CheckTable.skipped`.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from pathlib import Path
+from time import perf_counter
+import asyncio
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .clabs_eapi import EAPI_COMMANDS, EapiCapture, EapiError, EapiSession
+from ...check_engine import (
+    CHECK_KINDS,
+    CheckTable,
+    DeviceState,
+    check_kind_name,
+    evaluate_device,
+    iter_device_checks,
+)
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "CheckTarget",
+    "LatencyStats",
+    "STATE_PARSERS",
+    "run_lab_checks",
+    "percentiles",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class CheckTarget:
+    """
+    A device to validate.
+
+    Attributes
+    ----------
+    hostname: str
+        The device hostname.
+
+    address: str
+        The address used to connect to the device eAPI.
+
+    collections: List[dict]
+        The check collections of the device.
+    """
+
+    def __init__(self, hostname: str, address: str, checks_dir: Path):
+        self.hostname = hostname
+        self.address = address
+        self.collections = list(iter_device_checks(checks_dir))
+
+    def families(self) -> List[str]:
+        """returns the check families used by the device checks, in order"""
+        found = {
+            check_kind_name(collection["name"], check)
+            for collection in self.collections
+            for check in collection["checks"]
+        }
+        return [
+            family
+            for family in STATE_PARSERS
+            if family in found and family in CHECK_KINDS
+        ]
+
+
+class LatencyStats:
+    """
+    The eAPI request latency samples, in seconds.
+
+    Attributes
+    ----------
+    by_device: Dict[str, List[float]]
+        The samples, by device hostname.
+
+    by_family: Dict[str, List[float]]
+        The samples, by check family.
+    """
+
+    def __init__(self):
+        self.by_device: Dict[str, List[float]] = dict()
+        self.by_family: Dict[str, List[float]] = dict()
+
+    def add(self, hostname: str, family: str, latency: float):
+        self.by_device.setdefault(hostname, list()).append(latency)
+        self.by_family.setdefault(family, list()).append(latency)
+
+
+def percentiles(
+    samples: Sequence[float], points: Iterable[int] = (50, 90, 99)
+) -> Dict[int, float]:
+    """returns the nearest-rank percentile values of the samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {point: 0.0 for point in points}
+
+    return {
+        point: ordered[max(0, -(-point * len(ordered) // 100) - 1)] for point in points
+    }
+
+
+async def run_lab_checks(
+    targets: Iterable[CheckTarget],
+    username: str,
+    password: str,
+    concurrency: int = 16,
+    server: Optional[str] = None,
+    capture: Optional[EapiCapture] = None,
+    on_state: Optional[Callable[[str, dict], None]] = None,
+):
+    """
+    Validate the devices concurrently.
+
+    Parameters
+    ----------
+    targets: Iterable[CheckTarget]
+        The devices to validate.
+
+    username, password: str
+        The eAPI credentials.
+
+    concurrency: int
+        The number of devices validated at the same time.
+
+    server: str, optional
+        The "host:port" of an eAPI replay server, used for all of the devices
+        instead of the device addresses.
+
+    capture: EapiCapture, optional
+        When set, the eAPI responses are recorded.
+
+    on_state: Callable, optional
+        Called with the hostname and the collected device state, in the
+        snapshot file form.
+
+    Returns
+    -------
+    tuple
+        The CheckTable results, the LatencyStats, and the hostnames of the
+        devices that could not be validated.
+    """
+    table = CheckTable()
+    stats = LatencyStats()
+    failed: List[str] = list()
+    limit = asyncio.Semaphore(concurrency)
+
+    # when using the replay server, all of the devices connect to the server
+    # address; the device is selected using the HTTP Host header.
+
+    server_opts = dict()
+    if server:
+        server_host, _, server_port = server.rpartition(":")
+        server_opts = dict(address=server_host, port=int(server_port), use_tls=False)
+
+    async def check_device(target: CheckTarget):
+        state = dict()
+
+        async with limit:
+            session_opts = server_opts or dict(address=target.address)
+
+            async with EapiSession(
+                target.hostname,
+                username=username,
+                password=password,
+                capture=capture,
+                **session_opts,
+            ) as session:
+                try:
+                    for family in target.families():
+                        ts_start = perf_counter()
+                        result = await session.cli(EAPI_COMMANDS[family])
+                        stats.add(target.hostname, family, perf_counter() - ts_start)
+
+                        # an unexpected response shape fails the device, not
+                        # the validation of all of the devices.
+
+                        try:
+                            state[CHECK_KINDS[family].section] = STATE_PARSERS[family](
+                                result
+                            )
+                        except (KeyError, IndexError, TypeError, ValueError) as exc:
+                            raise EapiError(
+                                f"unable to parse {family} "
+                                f"response: {exc.__class__.__name__}: {exc}"
+                            )
+
+                except (EapiError, asyncio.TimeoutError) as exc:
+                    print(f"FAIL: {target.hostname}: {exc or 'timeout'}")
+                    failed.append(target.hostname)
+                    return
+
+        if on_state:
+            on_state(target.hostname, state)
+
+        evaluate_device(table, target.collections, DeviceState(state))
+
+    await asyncio.gather(*(check_device(target) for target in targets))
+    return table, stats, failed
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _vlan_ranges(value: str) -> List[int]:
+    """returns the VLAN-IDs of an EOS VLAN range value, for example "10,20-22" """
+    if value == "ALL":
+        return list(range(1, 4095))
+
+    vlan_ids = list()
+    for part in value.split(","):
+        if not part or part == "NONE":
+            continue
+        start, _, end = part.partition("-")
+        vlan_ids.extend(range(int(start), int(end or start) + 1))
+
+    return vlan_ids
+
+
+def _parse_interfaces(result: list) -> dict:
+    return {
+        if_name: dict(
+            used=rec.get("interfaceStatus") != "disabled",
+            oper_up=rec.get("lineProtocolStatus") == "up",
+            desc=rec.get("description", ""),
+            speed=(rec["bandwidth"] // 1_000_000) if rec.get("bandwidth") else None,
+        )
+        for if_name, rec in result[0]["interfaces"].items()
+    }
+
+
+def _parse_switchports(result: list) -> dict:
+    state = dict()
+
+    for if_name, rec in result[0]["switchports"].items():
+        info = rec.get("switchportInfo", {})
+        if (mode := info.get("mode")) == "access":
+            state[if_name] = dict(switchport_mode=mode, vlan=info.get("accessVlanId"))
+        else:
+            state[if_name] = dict(
+                switchport_mode=mode,
+                native_vlan=info.get("trunkingNativeVlanId"),
+                trunk_allowed_vlans=_vlan_ranges(info.get("trunkAllowedVlans", "")),
+            )
+
+    return state
+
+
+def _parse_vlans(result: list) -> dict:
+    # the VLAN interface, the SVI, is reported as the "Cpu" interface.
+
+    return {
+        vlan_id: dict(
+            name=rec.get("name"),
+            interfaces=sorted(
+                f"Vlan{vlan_id}" if if_name == "Cpu" else if_name
+                for if_name in rec.get("interfaces", {})
+            ),
+        )
+        for vlan_id, rec in result[0]["vlans"].items()
+    }
+
+
+def _parse_ipaddrs(result: list) -> dict:
+    state = dict()
+
+    for if_name, rec in result[0]["interfaces"].items():
+        primary = rec.get("interfaceAddress", {}).get("primaryIp", {})
+        if primary.get("maskLen"):
+            state[if_name] = dict(
+                if_ipaddr=f"{primary['address']}/{primary['maskLen']}"
+            )
+
+    return state
+
+
+def _parse_cabling(result: list) -> dict:
+    return {
+        rec["port"]: dict(device=rec["neighborDevice"], port_id=rec["neighborPort"])
+        for rec in result[0]["lldpNeighbors"]
+    }
+
+
+# the functions that parse the eAPI responses of each check family into the
+# device state snapshot form, by check family; in the order requested.
+
+STATE_PARSERS: Dict[str, Callable[[list], dict]] = {
+    "interfaces": _parse_interfaces,
+    "switchports": _parse_switchports,
+    "vlans": _parse_vlans,
+    "ipaddrs": _parse_ipaddrs,
+    "cabling": _parse_cabling,
+}
@@ -24,34 +24,97 @@
 # System Imports
 # -----------------------------------------------------------------------------
 
-from typing import Tuple
+from typing import Dict, Optional, Sequence, Tuple, List
 from pathlib import Path
+from time import perf_counter
+import multiprocessing
+import asyncio
+import csv
+import glob
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
 
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
 import click
-import jinja2
 
 from netcad.design import Design
 from netcad.cli.netcad.cli_netcad_main import cli
 from netcad.cli.common_opts import opt_designs
-from netcad.design import load_design
-from netcad.topology import TopologyServiceLike, NoValidateCabling
 
 # -----------------------------------------------------------------------------
 # Private Imports
 # -----------------------------------------------------------------------------
 
-from .consts import DEFAULT_TOPOLOGY_TEMPLATE
-from .clabs_jinja2 import create_j2env
+from .consts import DEFAULT_TOPOLOGY_TEMPLATE, DEFAULT_CAPTURE_DIR
+from .clabs_jinja2 import get_template, get_config_j2env
+from .clabs_artifacts import ArtifactWriter, stage_artifact
+from .clabs_topology import (
+    UNUSED_PORT_MODES,
+    render_topology_chunks,
+    render_merged_topology_chunks,
+)
+from .clabs_cache import load_design_cached, clear_design_cache
+from .clabs_eapi import (
+    EAPI_COMMANDS,
+    EapiCapture,
+    EapiError,
+    EapiSession,
+    get_credentials,
+)
+from .clabs_replay import ReplayServer, load_captures
+from .clabs_shard import ShardBudget, device_graph, partition_devices
+from .clabs_check import CheckTarget, percentiles, run_lab_checks
+from .clabs_configs import (
+    ConfigFingerprints,
+    device_fingerprints,
+    render_config_chunks,
+)
+from ... import profiling
+from ...mgmt_ipam import MgmtAddressTable, MgmtAddressError
+from ...floor_specs import load_floor_specs, build_floor_design
+from ...check_storage import (
+    CHECK_FORMATS,
+    CHECK_COMPRESSIONS,
+    CheckStorageError,
+    check_filename,
+    encode_check_collection,
+    load_check_collection,
+)
+from ...check_store import CheckStore
+from ...check_engine import (
+    CheckTable,
+    evaluate_device,
+    expected_device_state,
+    iter_device_checks,
+    load_snapshot,
+)
 
 
 @cli.group(name="clab")
-def clig_clabs():
+@click.option(
+    "--profile",
+    help="report the time spent in each design build phase",
+    is_flag=True,
+    envvar="NETCAD_CLAB_PROFILE",
+)
+@click.option(
+    "--profile-output",
+    help="save the profile; *.pstats for cProfile, otherwise collapsed stacks",
+    type=click.Path(path_type=Path, dir_okay=False),
+    envvar="NETCAD_CLAB_PROFILE_OUTPUT",
+)
+@click.pass_context
+def clig_clabs(ctx: click.Context, profile: bool, profile_output: Path):
     """ContainerLabs subcommands ..."""
 
+    if profile or profile_output:
+        profiling.start_profiling(output=profile_output)
+        ctx.call_on_close(profiling.stop_profiling)
+
 
 # -----------------------------------------------------------------------------
 #
@@ -82,103 +145,1493 @@ def clig_clabs():
     help="name of dummy bridge to force creation of device interfaces",
     default="br-dummy",
 )
+@click.option(
+    "--no-cache",
+    "no_cache",
+    help="build the designs without using the design snapshot cache",
+    is_flag=True,
+    envvar="NETCAD_CLAB_NOCACHE",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    help="number of worker processes used to build designs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--merge",
+    "merge_name",
+    metavar="NAME",
+    help="merge the designs into the single topology file NAME.clab.yaml",
+)
+@click.option(
+    "--unused-ports",
+    "unused_mode",
+    help="create the unused ports as dummy bridge links, dummy interfaces, or not at all",
+    type=click.Choice(UNUSED_PORT_MODES),
+    default="bridge",
+    show_default=True,
+)
+@click.option(
+    "--shard",
+    "shards",
+    metavar="N",
+    help="partition the devices into N topology files, NAME-<n>.clab.yaml",
+    type=click.IntRange(min=1),
+)
+@click.option("--host-cpus", help="the CPUs of each shard host", type=float)
+@click.option("--host-memory", help="the memory of each shard host, in GB", type=float)
+@click.option(
+    "--node-cpus",
+    help="the CPUs used by each cEOS node",
+    default=1.0,
+    show_default=True,
+)
+@click.option(
+    "--node-memory",
+    help="the memory used by each cEOS node, in GB",
+    default=2.0,
+    show_default=True,
+)
 def clig_clabs_topology(
-    designs: Tuple[str], template_file: Path, save_dir: Path, dummy_bridge: str
+    designs: Tuple[str],
+    template_file: Path,
+    save_dir: Path,
+    dummy_bridge: str,
+    no_cache: bool,
+    jobs: int,
+    merge_name: str,
+    unused_mode: str,
+    shards: int,
+    host_cpus: float,
+    host_memory: float,
+    node_cpus: float,
+    node_memory: float,
 ):
     """
     Create containerlab topology file.
     """
 
-    template_dir = str(template_file.parent)
-    env = create_j2env(template_dir)
-    template = env.get_template(template_file.name)
+    if shards:
+        if not merge_name and len(designs) > 1:
+            raise click.ClickException("Use --merge NAME to shard multiple designs")
 
-    for design_name in designs:
-        design_obj = load_design(design_name)
-        topo_content = render_topology_content(template, design_obj, dummy_bridge)
+        try:
+            budget = ShardBudget(host_cpus, host_memory, node_cpus, node_memory)
+            _build_sharded_topologies(
+                designs,
+                merge_name or designs[0],
+                save_dir,
+                template_file,
+                dummy_bridge,
+                not no_cache,
+                unused_mode,
+                shards,
+                budget,
+            )
+        except Exception as exc:
+            raise click.ClickException(
+                f"Unable to build sharded topology: {exc.__class__.__name__}: {exc}"
+            )
+        return
+
+    if merge_name:
+        topo_file = save_dir / (merge_name + ".clab.yaml")
+        staged, error, savings = _build_merged_topology(
+            designs,
+            merge_name,
+            topo_file,
+            template_file,
+            dummy_bridge,
+            not no_cache,
+            unused_mode,
+        )
+        if error:
+            raise click.ClickException(f"Unable to build merged topology: {error}")
+
+        with ArtifactWriter(save_dir) as writer:
+            writer.commit_staged(topo_file, staged)
+            _remove_stale_topologies(writer, save_dir, merge_name)
 
-        topo_file = save_dir / (design_obj.name + ".clab.yaml")
-        with topo_file.open("w+") as ofile:
-            print(f"SAVE: {ofile.name}")
-            ofile.write(topo_content)
+        writer.report()
+        _report_savings(unused_mode, [savings])
+        return
 
+    build_args = [
+        (design_name, save_dir / (design_name + ".clab.yaml"))
+        for design_name in designs
+    ]
 
-def render_topology_content(
-    template: jinja2.Template, design_obj: Design, dummy_br_name: str
-) -> str:
+    if jobs > 1 and profiling.is_profiling():
+        print("NOTE: profiling is enabled, designs are built one at a time")
+        jobs = 1
+
+    if jobs > 1 and len(designs) > 1:
+        results = _build_topologies_parallel(
+            build_args,
+            template_file,
+            dummy_bridge,
+            use_cache=not no_cache,
+            unused_mode=unused_mode,
+            jobs=jobs,
+        )
+    else:
+        results = _build_topologies_serial(
+            build_args,
+            template_file,
+            dummy_bridge,
+            use_cache=not no_cache,
+            unused_mode=unused_mode,
+        )
+
+    # commit the results in the same order as the designs were given by the
+    # User so that the output is deterministic regardless of the job count.
+
+    failed = list()
+
+    with ArtifactWriter(save_dir) as writer:
+        for (design_name, topo_file), (staged, error, _) in zip(build_args, results):
+            if error:
+                print(f"FAIL: {design_name}: {error}")
+                failed.append(design_name)
+                continue
+
+            writer.commit_staged(topo_file, staged)
+            _remove_stale_topologies(writer, save_dir, design_name)
+
+    writer.report()
+    _report_savings(unused_mode, [savings for _, _, savings in results])
+
+    if failed:
+        raise click.ClickException(
+            f"Unable to build topology for designs: {', '.join(failed)}"
+        )
+
+
+def _remove_stale_topologies(
+    writer: ArtifactWriter, save_dir: Path, name: str, sharded: bool = False
+):
+    """
+    Remove the topology files of a prior run, for the topology name, that were
+    not written in this run; the shard topology files of a prior sharded run,
+    or the shards beyond the shard count of this run.
+    """
+    shard_file = re.compile(rf"{re.escape(name)}-\d+\.clab\.yaml")
+
+    writer.remove_stale(
+        save_dir,
+        f"{glob.escape(name)}-*.clab.yaml",
+        select=lambda filepath: bool(shard_file.fullmatch(filepath.name)),
+    )
+
+    if not sharded:
+        writer.remove_stale(save_dir, f"{glob.escape(name)}.shards.json")
+
+
+def _report_savings(unused_mode: str, results_savings: List[Optional[dict]]):
+    """print the dummy bridge links, and veth interfaces, that are not created"""
+    if unused_mode == "bridge":
+        return
+
+    links = sum(savings["links"] for savings in results_savings if savings)
+    veths = sum(savings["veths"] for savings in results_savings if savings)
+    print(
+        f"Unused ports as {unused_mode}: {links} dummy bridge links, "
+        f"{veths} veth interfaces saved"
+    )
+
+
+def _build_topologies_serial(
+    build_args: List[Tuple[str, Path]],
+    template_file: Path,
+    dummy_bridge: str,
+    use_cache: bool,
+    unused_mode: str,
+) -> List[Tuple[tuple, str, dict]]:
+    """
+    Build the topology file for each design, one at a time, in this process.
+    Returns a list of (staged, error, savings) tuples in the same order as
+    build_args.
     """
-    Generate the topology content for a given design.
+    return [
+        _build_topology(
+            design_name, topo_file, template_file, dummy_bridge, use_cache, unused_mode
+        )
+        for design_name, topo_file in build_args
+    ]
 
-    Parameters
-    ----------
-    template: Template
-        The jinja2 template instance that will be used for rendeing purposes.
 
-    design_obj: Design
-        The design instance that is used to formulate the variables that
-        are passed to the Template for rendering.
+def _build_topologies_parallel(
+    build_args: List[Tuple[str, Path]],
+    template_file: Path,
+    dummy_bridge: str,
+    use_cache: bool,
+    unused_mode: str,
+    jobs: int,
+) -> List[Tuple[tuple, str, dict]]:
+    """
+    Build the topology files for the designs using a pool of worker
+    processes.  Each design is loaded and rendered in a worker; the results are
+    gathered in the same order as the build_args.  A failure in one design does
+    not stop the other workers.
 
-    dummy_br_name: str
-        The User define "dummy bridge" name that is used to define interfaces in
-        the containerlab topology so that they exist as virtual-ethernet
-        interfaces in Linux.
+    Notes
+    -----
+    The workers are forked from this process so that they inherit the netcad
+    configuration that was loaded when the CLI started.  The workers stream
+    the content into staged files; only the staged file names are sent back to
+    this process, not the content or the design objects.
+    """
+    max_workers = min(jobs, len(build_args))
+
+    mp_context = multiprocessing.get_context("fork")
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+        futures = [
+            pool.submit(
+                _build_topology,
+                design_name,
+                topo_file,
+                template_file,
+                dummy_bridge,
+                use_cache,
+                unused_mode,
+            )
+            for design_name, topo_file in build_args
+        ]
+
+        results = list()
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as exc:
+                # the worker process itself died, for example it was killed
+                # by the OOM killer; report and continue with the others.
+                results.append((None, f"worker failed: {exc!r}", None))
+
+    return results
+
+
+def _build_topology(
+    design_name: str,
+    topo_file: Path,
+    template_file: Path,
+    dummy_bridge: str,
+    use_cache: bool,
+    unused_mode: str = "bridge",
+) -> Tuple[tuple, str, dict]:
+    """
+    Load the design and render the containerlab topology content, streaming
+    the content into a staged file next to the topology file.  The staged file
+    is committed by the caller using the ArtifactWriter.  This function is used
+    by both the serial and process-pool code paths, and therefore must remain a
+    module level function.
 
     Returns
     -------
-    str
-        The topology content that needs to be saved to a file.
+    tuple
+        (staged, None, savings) when successful, or (None, error-message,
+        None) when the design could not be built.  See `stage_artifact` for
+        staged, and `render_topology_chunks` for savings.
     """
-    # TODO: should not use hardcoded 'topology', but for demo ok.
-    topo_svc: TopologyServiceLike = design_obj.services["topology"]
+    try:
+        with profiling.for_design(design_name):
+            with profiling.span("load_template"):
+                template = get_template(template_file)
 
-    # create the 'cabling' list of actual ports that are to be cabled
-    # together in the topology.
+            design_obj = load_design_cached(design_name, use_cache=use_cache)
 
-    cabled_ports = set()
-    fake_br_id = 0
-    cabling = []
-    used_uncabled = []
-    unused_ports = []
+            with profiling.span("render_topology"):
+                savings = dict()
+                chunks = render_topology_chunks(
+                    template, design_obj, dummy_bridge, unused_mode, savings
+                )
+                return stage_artifact(topo_file, chunks), None, savings
 
-    for cable_id, endpoints in topo_svc.cabling.cables.items():
-        end_a, end_b = sorted(endpoints, key=lambda e: (e.device, e))
-        cabled_ports.update((end_a, end_b))
+    except Exception as exc:
+        return None, f"{exc.__class__.__name__}: {exc}", None
 
-        if end_b.cable_port_id is NoValidateCabling:
-            side_b = f"{dummy_br_name}:{fake_br_id}"
-            fake_br_id += 1
-        else:
-            side_b = f"{end_b.device.name}:{end_b.short_name.lower()}"
 
-        cabling.append((f"{end_a.device.name}:{end_a.short_name.lower()}", side_b))
+def _build_merged_topology(
+    design_names: Sequence[str],
+    merge_name: str,
+    topo_file: Path,
+    template_file: Path,
+    dummy_bridge: str,
+    use_cache: bool,
+    unused_mode: str = "bridge",
+) -> Tuple[tuple, str, dict]:
+    """
+    Load the designs and render the merged containerlab topology content,
+    streaming the content into a staged file next to the topology file.  The
+    designs are loaded in this process, since all of the designs are needed
+    to render the merged content.
 
-    for dev_obj in design_obj.devices.values():
-        if dev_obj.is_pseudo:
-            continue
+    Returns
+    -------
+    tuple
+        See `_build_topology`.
+    """
+    try:
+        with profiling.for_design(merge_name):
+            with profiling.span("load_template"):
+                template = get_template(template_file)
+
+            design_objs = list()
+            for design_name in design_names:
+                with profiling.for_design(design_name):
+                    design_objs.append(
+                        load_design_cached(design_name, use_cache=use_cache)
+                    )
+
+            with profiling.span("render_topology"):
+                savings = dict()
+                chunks = render_merged_topology_chunks(
+                    template,
+                    design_objs,
+                    merge_name,
+                    dummy_bridge,
+                    unused_mode,
+                    savings,
+                )
+                return stage_artifact(topo_file, chunks), None, savings
+
+    except Exception as exc:
+        return None, f"{exc.__class__.__name__}: {exc}", None
+
+
+def _build_sharded_topologies(
+    design_names: Sequence[str],
+    name: str,
+    save_dir: Path,
+    template_file: Path,
+    dummy_bridge: str,
+    use_cache: bool,
+    unused_mode: str,
+    shards: int,
+    budget: ShardBudget,
+):
+    """
+    Load the designs, partition the lab devices into the shards, and write the
+    topology file of each shard, and the shard manifest file.  The manifest
+    lists the devices of each shard, and the links cut between the shards.
+    """
+    with profiling.for_design(name):
+        with profiling.span("load_template"):
+            template = get_template(template_file)
+
+        design_objs = list()
+        for design_name in design_names:
+            with profiling.for_design(design_name):
+                design_objs.append(load_design_cached(design_name, use_cache=use_cache))
+
+        with profiling.span("partition"):
+            nodes, edges = device_graph(design_objs)
+            members = partition_devices(nodes, edges, shards, budget.max_nodes)
+
+        shard_of = {
+            dev_name: shard_id
+            for shard_id, shard_devs in enumerate(members, start=1)
+            for dev_name in shard_devs
+        }
+
+        manifest = dict(
+            name=name,
+            designs=list(design_names),
+            budget=budget.as_dict(),
+            shards=list(),
+            cut_links=list(),
+        )
+        cut_links: List[Tuple[str, str]] = list()
+        savings = dict()
+
+        with ArtifactWriter(save_dir) as writer:
+            for shard_id, shard_devs in enumerate(members, start=1):
+                if not shard_devs:
+                    print(f"NOTE: shard {shard_id} has no devices")
+                    continue
+
+                shard_name = f"{name}-{shard_id}"
+                topo_file = save_dir / f"{shard_name}.clab.yaml"
+
+                with profiling.span("render_topology"):
+                    chunks = render_merged_topology_chunks(
+                        template,
+                        design_objs,
+                        shard_name,
+                        dummy_bridge,
+                        unused_mode,
+                        savings,
+                        shard=set(shard_devs),
+                        cut_links=cut_links,
+                    )
+                    writer.write_chunks(topo_file, chunks)
+
+                manifest["shards"].append(
+                    dict(
+                        topology=topo_file.name,
+                        devices=shard_devs,
+                        cpus=len(shard_devs) * budget.node_cpus,
+                        memory=len(shard_devs) * budget.node_memory,
+                    )
+                )
+
+            # each cut link is recorded by both of its shards.
+
+            for side_a, side_b in dict.fromkeys(cut_links):
+                manifest["cut_links"].append(
+                    dict(
+                        endpoints=[side_a, side_b],
+                        shards=[
+                            shard_of[side_a.split(":")[0]],
+                            shard_of[side_b.split(":")[0]],
+                        ],
+                    )
+                )
 
-        for ifobj in dev_obj.interfaces.values():
-            if ifobj in cabled_ports:
+            writer.write(
+                save_dir / f"{name}.shards.json", json.dumps(manifest, indent=3)
+            )
+            _remove_stale_topologies(writer, save_dir, name, sharded=True)
+
+    writer.report()
+    _report_savings(unused_mode, [savings])
+
+    for shard in manifest["shards"]:
+        print(
+            f"{shard['topology']:>30} {len(shard['devices']):>6} devices "
+            f"{shard['cpus']:>8.1f} CPUs {shard['memory']:>8.1f} GB"
+        )
+    print(f"{len(manifest['cut_links'])} links cut between shards")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs configs
+#
+# -----------------------------------------------------------------------------
+
+# the designs used by the config render workers, set before the worker
+# processes are forked so that the designs are inherited rather than sent to
+# each worker.
+
+_CONFIG_DESIGNS: Dict[str, Design] = dict()
+
+
+@clig_clabs.command("configs")
+@opt_designs()
+@click.option(
+    "--templates-dir",
+    "templates_dir",
+    help="directory of the device config templates",
+    default="templates",
+    type=click.Path(path_type=Path, resolve_path=True, exists=True, file_okay=False),
+)
+@click.option(
+    "--save-dir",
+    "save_dir",
+    default="configs",
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    help="build the designs without using the design snapshot cache",
+    is_flag=True,
+    envvar="NETCAD_CLAB_NOCACHE",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    help="number of worker processes used to render configs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--force",
+    help="render all device configs, even when unchanged",
+    is_flag=True,
+)
+def clig_clabs_configs(
+    designs: Tuple[str],
+    templates_dir: Path,
+    save_dir: Path,
+    no_cache: bool,
+    jobs: int,
+    force: bool,
+):
+    """
+    Create the device startup-config files.
+
+    A device config is only rendered when its fingerprint changed since the
+    prior run; the fingerprint covers the device, interface profiles, VLANs,
+    IPAM subnets, template files, and the design package code.
+    """
+    j2env = get_config_j2env(templates_dir)
+    fingerprints = ConfigFingerprints(save_dir)
+
+    # find the devices whose config must be rendered.
+
+    render_args = list()
+    unchanged = 0
+
+    with ArtifactWriter(save_dir) as writer:
+        for design_name in designs:
+            with profiling.for_design(design_name):
+                design_obj = load_design_cached(design_name, use_cache=not no_cache)
+
+                with profiling.span("config_fingerprints"):
+                    dev_fingerprints = device_fingerprints(design_obj, j2env)
+
+            _CONFIG_DESIGNS[design_name] = design_obj
+
+            for hostname, fingerprint in dev_fingerprints.items():
+                cfg_file = save_dir / f"{hostname}.cfg"
+
+                if (
+                    not force
+                    and not fingerprints.changed(hostname, fingerprint)
+                    and writer.keep_current(cfg_file)
+                ):
+                    fingerprints.update(design_name, hostname, fingerprint)
+                    unchanged += 1
+                    continue
+
+                render_args.append((design_name, hostname, fingerprint, cfg_file))
+
+        if jobs > 1 and profiling.is_profiling():
+            print("NOTE: profiling is enabled, configs are rendered one at a time")
+            jobs = 1
+
+        results = _render_configs(render_args, templates_dir, jobs)
+
+        # commit the results in the same order as the devices were found, so
+        # that the output is deterministic regardless of the job count.
+
+        failed = list()
+
+        for (design_name, hostname, fingerprint, cfg_file), (staged, error) in zip(
+            render_args, results
+        ):
+            if error:
+                print(f"FAIL: {hostname}: {error}")
+                failed.append(hostname)
                 continue
 
-            if ifobj.used and (ifobj.profile.is_mgmt_only or ifobj.profile.is_virtual):
+            writer.commit_staged(cfg_file, staged)
+            fingerprints.update(design_name, hostname, fingerprint)
+            print(f"RENDER: {hostname}")
+
+        # remove the configs of the devices that are no longer in the designs
+        # of this run; the configs of other designs are not touched.  A config
+        # that failed to render is not stale.
+
+        failed_files = {save_dir / f"{hostname}.cfg" for hostname in failed}
+
+        for cfg_file in writer.remove_stale(
+            save_dir,
+            "*.cfg",
+            select=lambda cfg_file: (
+                cfg_file not in failed_files
+                and fingerprints.designs.get(cfg_file.stem) in designs
+            ),
+        ):
+            fingerprints.remove(cfg_file.stem)
+
+    _CONFIG_DESIGNS.clear()
+    fingerprints.save()
+    writer.report()
+
+    print(
+        f"{save_dir}: {len(render_args) - len(failed)} configs rendered, "
+        f"{unchanged} configs skipped (fingerprint unchanged)"
+    )
+
+    if failed:
+        raise click.ClickException(
+            f"Unable to render configs for devices: {', '.join(failed)}"
+        )
+
+
+def _render_configs(
+    render_args: List[tuple], templates_dir: Path, jobs: int
+) -> List[Tuple[tuple, str]]:
+    """
+    Render the device configs, in this process or using a pool of forked
+    worker processes.  Returns a list of (staged, error) tuples in the same
+    order as the render_args.
+    """
+    call_args = [
+        (design_name, hostname, cfg_file, templates_dir)
+        for design_name, hostname, _, cfg_file in render_args
+    ]
+
+    if jobs == 1 or len(call_args) < 2:
+        return [_render_config(*args) for args in call_args]
+
+    mp_context = multiprocessing.get_context("fork")
+    max_workers = min(jobs, len(call_args))
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+        futures = [pool.submit(_render_config, *args) for args in call_args]
+
+        results = list()
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as exc:
+                results.append((None, f"worker failed: {exc!r}"))
+
+    return results
+
+
+def _render_config(
+    design_name: str, hostname: str, cfg_file: Path, templates_dir: Path
+) -> Tuple[tuple, str]:
+    """
+    Render the device config into a staged file next to the config file.  This
+    function is used by both the serial and process-pool code paths, and
+    therefore must remain a module level function.
+
+    Returns
+    -------
+    tuple
+        (staged, None) when successful, or (None, error-message) when the
+        config could not be rendered.  See `stage_artifact` for staged.
+    """
+    try:
+        with profiling.for_design(design_name):
+            with profiling.span("render_config"):
+                dev_obj = _CONFIG_DESIGNS[design_name].devices[hostname]
+                chunks = render_config_chunks(get_config_j2env(templates_dir), dev_obj)
+                return stage_artifact(cfg_file, chunks), None
+
+    except Exception as exc:
+        return None, f"{exc.__class__.__name__}: {exc}"
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs specs
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("specs")
+@click.argument(
+    "spec_file",
+    type=click.Path(path_type=Path, resolve_path=True, exists=True, dir_okay=False),
+)
+@click.option(
+    "--template",
+    "template_file",
+    help="path to specific template file",
+    default=DEFAULT_TOPOLOGY_TEMPLATE,
+    type=click.Path(path_type=Path, resolve_path=True, exists=True),
+)
+@click.option(
+    "--save-dir",
+    "save_dir",
+    default=".",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--dummy-bridge",
+    help="name of dummy bridge to force creation of device interfaces",
+    default="br-dummy",
+)
+def clig_clabs_specs(
+    spec_file: Path, template_file: Path, save_dir: Path, dummy_bridge: str
+):
+    """
+    Build the designs declared in a floor spec file.
+
+    All of the floors in SPEC_FILE are built in this process, one at a time;
+    the containerlab topology file of each is written as soon as the design is
+    built, and the design is then released.  The designs do not need to be
+    declared in the netcad.toml file.
+    """
+    try:
+        specs = load_floor_specs(spec_file)
+    except (OSError, ValueError) as exc:
+        raise click.ClickException(str(exc))
+
+    template = get_template(template_file)
+    failed = list()
+
+    with ArtifactWriter(save_dir) as writer:
+        for spec in specs:
+            try:
+                with profiling.for_design(spec.name):
+                    design_obj = build_floor_design(spec)
+
+                    with profiling.span("render_topology"):
+                        writer.write_chunks(
+                            save_dir / (spec.name + ".clab.yaml"),
+                            render_topology_chunks(template, design_obj, dummy_bridge),
+                        )
+
+            except Exception as exc:
+                print(f"FAIL: {spec.name}: {exc.__class__.__name__}: {exc}")
+                failed.append(spec.name)
+
+    writer.report()
+
+    if failed:
+        raise click.ClickException(f"Unable to build floor specs: {', '.join(failed)}")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs clear-cache
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("clear-cache")
+@click.argument("designs", nargs=-1)
+def clig_clabs_clear_cache(designs: Tuple[str]):
+    """
+    Remove design snapshots from the build cache.
+
+    When no DESIGNS are given, then all design snapshots are removed.
+    """
+    for cache_file in clear_design_cache(designs):
+        print(f"REMOVE: {cache_file}")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs mgmt-table
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("mgmt-table")
+@opt_designs()
+@click.option(
+    "--no-cache",
+    "no_cache",
+    help="build the designs without using the design snapshot cache",
+    is_flag=True,
+    envvar="NETCAD_CLAB_NOCACHE",
+)
+@click.option(
+    "--reset",
+    help="start from an empty table, rather than updating the existing table",
+    is_flag=True,
+)
+def clig_clabs_mgmt_table(designs: Tuple[str], no_cache: bool, reset: bool):
+    """
+    Store the management address assignments in the address table.
+
+    The address table holds the management addresses of the devices in all
+    designs so that duplicate addresses across designs are detected when the
+    designs are built.
+    """
+    table = MgmtAddressTable()
+    if reset:
+        table.clear()
+
+    assignments = dict()
+
+    for design_name in designs:
+        design_obj = load_design_cached(design_name, use_cache=not no_cache)
+        assignments.update(
+            (dev.name, dev.primary_ip)
+            for dev in design_obj.devices.values()
+            if not dev.is_pseudo and dev.primary_ip
+        )
+
+    try:
+        table.update(assignments)
+    except MgmtAddressError as exc:
+        raise click.ClickException(str(exc))
+
+    table.save()
+    print(f"SAVE: {table.filepath}: {len(table.hosts)} devices")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs checks-store
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("checks-store")
+@click.option(
+    "--checks-dir",
+    "checks_dir",
+    help="the directory of the generated check files",
+    default="checks",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--format",
+    "fmt",
+    help="the check file format",
+    type=click.Choice(CHECK_FORMATS),
+    default="ndjson",
+    show_default=True,
+)
+@click.option(
+    "--compress",
+    "compression",
+    help="the check file compression, not used with the json format",
+    type=click.Choice(CHECK_COMPRESSIONS),
+    default="none",
+    show_default=True,
+)
+@click.option(
+    "--no-elide",
+    "no_elide",
+    help="store the default values in each check",
+    is_flag=True,
+)
+def clig_clabs_checks_store(
+    checks_dir: Path, fmt: str, compression: str, no_elide: bool
+):
+    """
+    Convert the stored check files to the given format.
+
+    The check files of each device, in any format, are converted; use
+    "--format json" to restore the netcad JSON files, for example before
+    running the netcad check commands.
+    """
+    try:
+        check_filename("", fmt, compression)
+    except CheckStorageError as exc:
+        raise click.ClickException(str(exc))
+
+    size_before = size_after = 0
+
+    with ArtifactWriter(checks_dir) as writer:
+        for src_file in sorted(checks_dir.glob("*/*")):
+            if src_file.name.startswith("."):
                 continue
 
-            add_to = used_uncabled if ifobj.used else unused_ports
+            try:
+                collection = load_check_collection(src_file)
+            except CheckStorageError:
+                continue
 
-            add_item = (
-                f"{ifobj.device.name}:{ifobj.short_name.lower()}",
-                fake_br_id,
+            dst_file = src_file.parent / check_filename(
+                collection["name"], fmt, compression
             )
 
-            add_to.append(add_item)
-            fake_br_id += 1
+            try:
+                writer.write_chunks(
+                    dst_file,
+                    encode_check_collection(
+                        collection, fmt, compression, elide=not no_elide
+                    ),
+                )
+            except CheckStorageError as exc:
+                raise click.ClickException(str(exc))
+
+            size_before += src_file.stat().st_size
+            size_after += dst_file.stat().st_size
+
+            if dst_file != src_file:
+                writer.remove(src_file)
+
+    writer.report()
+    print(f"{checks_dir}: {size_before:,} bytes -> {size_after:,} bytes")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs checks-dedup
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("checks-dedup")
+@click.option(
+    "--checks-dir",
+    "checks_dir",
+    help="the directory of the generated check files",
+    default="checks",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--store-dir",
+    "store_dir",
+    help="the directory of the check store",
+    default="check-store",
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--prune",
+    help="remove the objects no longer used by any device",
+    is_flag=True,
+)
+def clig_clabs_checks_dedup(checks_dir: Path, store_dir: Path, prune: bool):
+    """
+    Add the check files of each device to the check store.
+
+    Each unique check is stored once, and each device has a manifest of the
+    checks it uses; so that the same checks of each building-floor are only
+    stored once.
+    """
+    store = CheckStore(store_dir)
+
+    for device_dir in sorted(checks_dir.iterdir()):
+        if device_dir.is_dir():
+            print(f"SAVE: {store.put_checks_dir(device_dir)}")
+
+    if prune:
+        for filepath in store.prune():
+            print(f"REMOVE: {filepath}")
+
+    stats = store.stats()
+    print(
+        f"{store_dir}: {stats['manifests']} devices, {stats['references']} checks, "
+        f"{stats['objects']} unique objects, {stats['object_bytes']:,} bytes; "
+        f"{store.objects_written} objects written, {store.objects_reused} reused"
+    )
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs checks-restore
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("checks-restore")
+@click.argument("devices", nargs=-1)
+@click.option(
+    "--store-dir",
+    "store_dir",
+    help="the directory of the check store",
+    default="check-store",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--checks-dir",
+    "checks_dir",
+    help="the directory of the generated check files",
+    default="checks",
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--format",
+    "fmt",
+    help="the check file format",
+    type=click.Choice(CHECK_FORMATS),
+    default="json",
+    show_default=True,
+)
+@click.option(
+    "--compress",
+    "compression",
+    help="the check file compression, not used with the json format",
+    type=click.Choice(CHECK_COMPRESSIONS),
+    default="none",
+    show_default=True,
+)
+def clig_clabs_checks_restore(
+    devices: Tuple[str], store_dir: Path, checks_dir: Path, fmt: str, compression: str
+):
+    """
+    Write the check files of the devices from the check store.
+
+    When no DEVICES are given, then the check files of all devices in the store
+    are written.
+    """
+    store = CheckStore(store_dir)
+
+    if unknown := set(devices) - set(store.devices()):
+        raise click.ClickException(f"Unknown devices: {', '.join(sorted(unknown))}")
+
+    try:
+        with ArtifactWriter(checks_dir) as writer:
+            for hostname in devices or store.devices():
+                for name, collection in store.get_device(hostname).items():
+                    writer.write_chunks(
+                        checks_dir / hostname / check_filename(name, fmt, compression),
+                        encode_check_collection(collection, fmt, compression),
+                    )
+
+                # remove the check files of a prior run that are not in the
+                # store, or were written in a different format.
+
+                writer.remove_stale(checks_dir / hostname)
+
+    except CheckStorageError as exc:
+        raise click.ClickException(str(exc))
+
+    writer.report()
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs checks-eval
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("checks-eval")
+@click.argument(
+    "snapshot_dir",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--checks-dir",
+    "checks_dir",
+    help="the directory of the generated check files",
+    default="checks",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--csv",
+    "csv_file",
+    help="save the complete results table as a CSV file",
+    type=click.Path(path_type=Path, dir_okay=False),
+)
+@click.option(
+    "--init-snapshot",
+    "init_snapshot",
+    help="write the snapshot files in which all checks pass, and exit",
+    is_flag=True,
+)
+def clig_clabs_checks_eval(
+    snapshot_dir: Path, checks_dir: Path, csv_file: Path, init_snapshot: bool
+):
+    """
+    Evaluate the checks against a device state snapshot.
+
+    The device state of each device is the file SNAPSHOT_DIR/<hostname>.json;
+    see the check_engine module for the file content.  The checks of devices
+    without a snapshot file are not evaluated.
+    """
+    device_dirs = sorted(path for path in checks_dir.iterdir() if path.is_dir())
+
+    if init_snapshot:
+        with ArtifactWriter(snapshot_dir) as writer:
+            for device_dir in device_dirs:
+                state = expected_device_state(iter_device_checks(device_dir))
+                writer.write(
+                    snapshot_dir / f"{device_dir.name}.json",
+                    json.dumps(state, indent=3),
+                )
+        writer.report()
+        return
+
+    snapshot = load_snapshot(snapshot_dir)
+    table = CheckTable()
+
+    for device_dir in device_dirs:
+        if (state := snapshot.get(device_dir.name)) is None:
+            print(f"SKIP: {device_dir.name}: no snapshot file")
+            continue
+        evaluate_device(table, iter_device_checks(device_dir), state)
+
+    for row in table.rows(failed_only=True):
+        print(
+            f"FAIL: {row['device']} {row['collection']} {row['check']} "
+            f"{row['field']}: expected {row['expected']!r}, "
+            f"measured {row['measured']!r}"
+        )
+
+    failed_total = 0
+    for (device, collection), (passed, failed) in sorted(table.summary().items()):
+        print(f"{device:>20} {collection:<12} {passed:>6} passed {failed:>6} failed")
+        failed_total += failed
+
+    for (device, collection), count in sorted(table.skipped.items()):
+        print(f"{device:>20} {collection:<12} {count:>6} not evaluated")
 
-    devices = [dev for dev in design_obj.devices.values() if not dev.is_pseudo]
+    if csv_file:
+        with csv_file.open("w", newline="") as ofile:
+            writer = csv.DictWriter(ofile, fieldnames=list(table.columns))
+            writer.writeheader()
+            writer.writerows(table.rows())
+        print(f"SAVE: {csv_file}")
 
-    return template.render(
-        design=design_obj,
-        devices=devices,
-        cabled_ports=cabling,
-        uncabled_ports=used_uncabled,
-        unused_ports=unused_ports,
+    if failed_total:
+        raise click.ClickException(f"{failed_total} check(s) failed")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs capture
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("capture")
+@opt_designs()
+@click.option(
+    "--capture-dir",
+    "capture_dir",
+    help="the directory of the capture files",
+    default=DEFAULT_CAPTURE_DIR,
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    help="build the designs without using the design snapshot cache",
+    is_flag=True,
+    envvar="NETCAD_CLAB_NOCACHE",
+)
+@click.option(
+    "--concurrency",
+    help="the number of devices captured at the same time",
+    default=16,
+    show_default=True,
+)
+@click.option(
+    "--use-hostname",
+    "use_hostname",
+    help="connect to the device hostname, rather than the management address",
+    is_flag=True,
+)
+def clig_clabs_capture(
+    designs: Tuple[str],
+    capture_dir: Path,
+    no_cache: bool,
+    concurrency: int,
+    use_hostname: bool,
+):
+    """
+    Record the eAPI responses of the lab devices.
+
+    The eAPI commands used to collect the device state, for each check family,
+    are run on each device of the designs; the responses are stored in a
+    capture file per device, for use by the replay server.
+    """
+    try:
+        username, password = get_credentials()
+    except EapiError as exc:
+        raise click.ClickException(str(exc))
+
+    addresses = dict()
+    for design_name in designs:
+        design_obj = load_design_cached(design_name, use_cache=not no_cache)
+        addresses.update(
+            (dev.name, dev.name if use_hostname else str(dev.primary_ip or dev.name))
+            for dev in design_obj.devices.values()
+            if not dev.is_pseudo
+        )
+
+    capture = EapiCapture(capture_dir)
+    failed = asyncio.run(
+        _capture_devices(addresses, capture, username, password, concurrency)
+    )
+
+    for filepath in capture.save():
+        print(f"SAVE: {filepath}")
+
+    if failed:
+        raise click.ClickException(f"Unable to capture: {', '.join(sorted(failed))}")
+
+
+async def _capture_devices(
+    addresses: Dict[str, str],
+    capture: EapiCapture,
+    username: str,
+    password: str,
+    concurrency: int,
+) -> List[str]:
+    """run the eAPI commands on each device, recording the responses"""
+    limit = asyncio.Semaphore(concurrency)
+    failed = list()
+
+    async def capture_device(hostname: str, address: str):
+        async with limit, EapiSession(
+            hostname,
+            username=username,
+            password=password,
+            address=address,
+            capture=capture,
+        ) as eapi:
+            try:
+                for commands in EAPI_COMMANDS.values():
+                    await eapi.cli(commands)
+            except (EapiError, asyncio.TimeoutError) as exc:
+                print(f"FAIL: {hostname}: {exc}")
+                failed.append(hostname)
+
+    await asyncio.gather(
+        *(capture_device(hostname, address) for hostname, address in addresses.items())
+    )
+    return failed
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs replay
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("replay")
+@click.option(
+    "--capture-dir",
+    "capture_dir",
+    help="the directory of the capture files",
+    default=DEFAULT_CAPTURE_DIR,
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option("--host", help="the server address", default="127.0.0.1")
+@click.option("--port", help="the server port", default=8080, show_default=True)
+@click.option(
+    "--latency",
+    help="the response delay, in milliseconds",
+    default=0.0,
+    show_default=True,
+)
+@click.option(
+    "--jitter",
+    help="the maximum random variation of the response delay, in milliseconds",
+    default=0.0,
+    show_default=True,
+)
+@click.option(
+    "--fallback",
+    help="serve the responses of this device for any device without a capture",
+)
+@click.option("--seed", help="the random seed of the jitter", type=int)
+def clig_clabs_replay(
+    capture_dir: Path,
+    host: str,
+    port: int,
+    latency: float,
+    jitter: float,
+    fallback: str,
+    seed: int,
+):
+    """
+    Serve the recorded eAPI responses, as a stand-in for the lab devices.
+
+    All of the devices are served on the one address; the device is selected
+    using the HTTP Host header.  The server runs until interrupted.
+    """
+    captures = load_captures(capture_dir)
+
+    try:
+        server = ReplayServer(
+            captures,
+            latency=latency / 1_000,
+            jitter=jitter / 1_000,
+            fallback=fallback,
+            seed=seed,
+        )
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+    async def serve():
+        port_used = await server.start(host, port)
+        print(f"Replaying {len(captures)} devices on http://{host}:{port_used}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    print(f"Served {server.requests} requests, {server.connections} connections")
+
+
+# -----------------------------------------------------------------------------
+#
+# netcad clabs check
+#
+# -----------------------------------------------------------------------------
+
+
+@clig_clabs.command("check")
+@opt_designs()
+@click.option(
+    "--checks-dir",
+    "checks_dir",
+    help="the directory of the generated check files",
+    default="checks",
+    type=click.Path(
+        path_type=Path, resolve_path=True, exists=True, dir_okay=True, file_okay=False
+    ),
+)
+@click.option(
+    "--no-cache",
+    "no_cache",
+    help="build the designs without using the design snapshot cache",
+    is_flag=True,
+    envvar="NETCAD_CLAB_NOCACHE",
+)
+@click.option(
+    "--concurrency",
+    help="the number of devices validated at the same time",
+    default=16,
+    show_default=True,
+)
+@click.option(
+    "--use-hostname",
+    "use_hostname",
+    help="connect to the device hostname, rather than the management address",
+    is_flag=True,
+)
+@click.option(
+    "--server",
+    help="validate against the eAPI replay server at this host:port",
+)
+@click.option(
+    "--record",
+    "capture_dir",
+    help="record the eAPI responses into this capture directory",
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--save-snapshot",
+    "snapshot_dir",
+    help="save the collected device state into this snapshot directory",
+    type=click.Path(path_type=Path, resolve_path=True, file_okay=False),
+)
+@click.option(
+    "--csv",
+    "csv_file",
+    help="save the complete results table as a CSV file",
+    type=click.Path(path_type=Path, dir_okay=False),
+)
+def clig_clabs_check(
+    designs: Tuple[str],
+    checks_dir: Path,
+    no_cache: bool,
+    concurrency: int,
+    use_hostname: bool,
+    server: str,
+    capture_dir: Path,
+    snapshot_dir: Path,
+    csv_file: Path,
+):
+    """
+    Validate the lab devices using the generated checks.
+
+    The device state of each non-pseudo device of the designs is collected
+    using eAPI, all devices concurrently, and then the device checks are
+    evaluated.  The eAPI request latency percentiles are reported by device
+    and by check family.
+    """
+    try:
+        username, password = get_credentials()
+    except EapiError as exc:
+        # the replay server does not check the credentials.
+        if not server:
+            raise click.ClickException(str(exc))
+        username, password = "", ""
+
+    targets = list()
+    for design_name in designs:
+        design_obj = load_design_cached(design_name, use_cache=not no_cache)
+        for dev in design_obj.devices.values():
+            if dev.is_pseudo:
+                continue
+            if not (device_dir := checks_dir / dev.name).is_dir():
+                print(f"SKIP: {dev.name}: no check files")
+                continue
+            address = dev.name if use_hostname else str(dev.primary_ip or dev.name)
+            targets.append(CheckTarget(dev.name, address, device_dir))
+
+    capture = EapiCapture(capture_dir) if capture_dir else None
+    writer = ArtifactWriter(snapshot_dir) if snapshot_dir else None
+
+    def save_snapshot(hostname: str, state: dict):
+        writer.write(snapshot_dir / f"{hostname}.json", json.dumps(state, indent=3))
+
+    ts_start = perf_counter()
+    table, stats, failed = asyncio.run(
+        run_lab_checks(
+            targets,
+            username,
+            password,
+            concurrency=concurrency,
+            server=server,
+            capture=capture,
+            on_state=save_snapshot if writer else None,
+        )
     )
+    ts_done = perf_counter()
+
+    if capture:
+        for filepath in capture.save():
+            print(f"SAVE: {filepath}")
+
+    if writer:
+        writer.save_manifest()
+        writer.report()
+
+    for row in table.rows(failed_only=True):
+        print(
+            f"FAIL: {row['device']} {row['collection']} {row['check']} "
+            f"{row['field']}: expected {row['expected']!r}, "
+            f"measured {row['measured']!r}"
+        )
+
+    by_device = dict()
+    for (device, _), (passed, failed_count) in table.summary().items():
+        totals = by_device.setdefault(device, [0, 0])
+        totals[0] += passed
+        totals[1] += failed_count
+
+    print(
+        f"{'device':>20} {'passed':>7} {'failed':>7} {'p50':>8} {'p90':>8} {'p99':>8}"
+    )
+    for device, (passed, failed_count) in sorted(by_device.items()):
+        pct = percentiles(stats.by_device.get(device, []))
+        print(
+            f"{device:>20} {passed:>7} {failed_count:>7} "
+            + " ".join(f"{pct[point] * 1_000:>6.1f}ms" for point in (50, 90, 99))
+        )
+
+    print(f"{'family':>20} {'requests':>8} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for family, samples in stats.by_family.items():
+        pct = percentiles(samples)
+        print(
+            f"{family:>20} {len(samples):>8} "
+            + " ".join(f"{pct[point] * 1_000:>6.1f}ms" for point in (50, 90, 99))
+        )
+
+    # the checks of a family without a parser, for example the device family,
+    # are not evaluated.
+
+    for (device, collection), count in sorted(table.skipped.items()):
+        print(f"{device:>20} {collection:<12} {count:>6} not evaluated")
+
+    requests = sum(len(samples) for samples in stats.by_family.values())
+    print(
+        f"Validated {len(targets) - len(failed)} devices, {requests} requests, "
+        f"in {ts_done - ts_start:.2f}s"
+    )
+
+    if csv_file:
+        with csv_file.open("w", newline="") as ofile:
+            csv_writer = csv.DictWriter(ofile, fieldnames=list(table.columns))
+            csv_writer.writeheader()
+            csv_writer.writerows(table.rows())
+        print(f"SAVE: {csv_file}")
+
+    if failed:
+        raise click.ClickException(f"Unable to validate: {', '.join(sorted(failed))}")
+
+    if failed_total := sum(failed_count for _, failed_count in by_device.values()):
+        raise click.ClickException(f"{failed_total} check(s) failed")
@@ -0,0 +1,319 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the functions used to render the device startup-config
+# files.  Each device config depends on the device, its interface profiles, its
+# VLANs, the VLANs of its cable peers (trunk allowed VLANs), its IPAM subnets,
+# the template files, and the design package code.  A fingerprint of all of
+# these is stored for each device so that a device config is only re-rendered
+# when one of its dependencies changed.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterator, Set
+from pathlib import Path
+from functools import lru_cache
+from ipaddress import IPv4Address, IPv4Interface, IPv4Network
+import hashlib
+import json
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import jinja2
+from jinja2 import meta
+
+from netcad.design import Design
+from netcad.device import Device
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .clabs_cache import get_sources_digest
+from ...interface_index import get_interface_index
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "ConfigFingerprints",
+    "device_fingerprints",
+    "render_config_chunks",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                               CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class ConfigFingerprints:
+    """
+    The device config fingerprints of the prior run, stored as a JSON file in
+    the config directory.  The fingerprints of devices that are not rendered in
+    this run, for example devices of other designs, are retained.
+
+    Attributes
+    ----------
+    filepath: Path
+        The fingerprint file.
+
+    fingerprints: Dict[str, str]
+        The fingerprint, by device hostname.
+
+    designs: Dict[str, str]
+        The design name, by device hostname; used to find the configs of
+        devices that are no longer in their design.
+    """
+
+    FILE_NAME = ".netcad-config-fingerprints.json"
+
+    def __init__(self, config_dir: Path):
+        self.filepath = Path(config_dir) / self.FILE_NAME
+
+        try:
+            content = json.loads(self.filepath.read_text())
+        except (OSError, ValueError):
+            content = dict()
+
+        self.fingerprints: Dict[str, str] = content.get("fingerprints", {})
+        self.designs: Dict[str, str] = content.get("designs", {})
+
+    def changed(self, hostname: str, fingerprint: str) -> bool:
+        """returns True if the device fingerprint differs from the prior run"""
+        return self.fingerprints.get(hostname) != fingerprint
+
+    def update(self, design_name: str, hostname: str, fingerprint: str):
+        """record the fingerprint of the device config that was rendered"""
+        self.fingerprints[hostname] = fingerprint
+        self.designs[hostname] = design_name
+
+    def remove(self, hostname: str):
+        """remove the device, whose config was removed"""
+        self.fingerprints.pop(hostname, None)
+        self.designs.pop(hostname, None)
+
+    def save(self):
+        """store the fingerprint file"""
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        self.filepath.write_text(
+            json.dumps(
+                dict(fingerprints=self.fingerprints, designs=self.designs),
+                indent=1,
+                sort_keys=True,
+            )
+        )
+
+
+def device_fingerprints(design: Design, j2env: jinja2.Environment) -> Dict[str, str]:
+    """
+    Returns the config fingerprint of each device in the design, excluding
+    the pseudo-devices that do not have a config.
+
+    Parameters
+    ----------
+    design: Design
+        The completed design instance.
+
+    j2env: jinja2.Environment
+        The environment of the config templates, used to find the template files
+        that each device config depends on.
+
+    Returns
+    -------
+    Dict[str, str]
+        The fingerprint, by device hostname.
+    """
+    if_index = get_interface_index(design)
+    ipam = design.ipams[0]
+
+    peers = dict()
+    for end_a, end_b in if_index.cables:
+        peers[end_a] = end_b
+        peers[end_b] = end_a
+
+    code_digest = get_sources_digest(suffixes=(".py",))
+
+    return {
+        dev_name: _device_fingerprint(dev_obj, peers, ipam, j2env, code_digest)
+        for dev_name, dev_obj in design.devices.items()
+        if not dev_obj.is_pseudo
+    }
+
+
+def render_config_chunks(j2env: jinja2.Environment, device: Device) -> Iterator[str]:
+    """
+    Render the device config, producing the content as a stream of chunks.
+
+    Parameters
+    ----------
+    j2env: jinja2.Environment
+        The environment of the config templates.
+
+    device: Device
+        The device instance.
+
+    Yields
+    ------
+    str
+    """
+    return j2env.get_template(str(device.template)).generate(device=device)
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _device_fingerprint(
+    device: Device,
+    peers: dict,
+    ipam,
+    j2env: jinja2.Environment,
+    code_digest: str,
+) -> str:
+    """returns the config fingerprint of the device"""
+
+    dev_vlans = device.services["vlans"].all_vlans()
+    templates = {str(device.template)}
+    interfaces = list()
+
+    for ifobj in device.interfaces.values():
+        profile = ifobj.profile
+        if_data = [ifobj.name, str(ifobj.desc), ifobj.used, ifobj.enabled]
+
+        if profile is not None:
+            if_data.append(f"{type(profile).__module__}.{type(profile).__qualname__}")
+            if_data.append(
+                {
+                    key: _stable(value)
+                    for key, value in sorted(getattr(profile, "__dict__", {}).items())
+                    if not key.startswith("_")
+                }
+            )
+            if template := getattr(profile, "template", None):
+                templates.add(str(template))
+
+        if (peer := peers.get(ifobj)) is not None:
+            if_data.append(
+                [
+                    peer.device.name,
+                    peer.name,
+                    _stable(peer.device.services["vlans"].all_vlans()),
+                ]
+            )
+
+        interfaces.append(if_data)
+
+    # the IPAM subnets of the VLANs on the device, which are the SVI subnets.
+
+    ipam_slices = sorted(
+        [vlan_id, str(subnet.ip_network)]
+        for vlan_id, (_, subnet) in ipam.vlan_subnets.items()
+        if vlan_id in {vlan.vlan_id for vlan in dev_vlans}
+    )
+
+    fp_data = dict(
+        code=code_digest,
+        device=[
+            device.name,
+            f"{type(device).__module__}.{type(device).__qualname__}",
+            str(device.primary_ip),
+        ],
+        vlans=_stable(dev_vlans),
+        interfaces=interfaces,
+        ipam=ipam_slices,
+        templates={name: _template_digest(j2env, name) for name in sorted(templates)},
+    )
+
+    return hashlib.sha256(
+        json.dumps(fp_data, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _stable(value):
+    """
+    Returns a JSON-able value for the profile attribute value, that is stable
+    across processes.  Object references other than the known value types, for
+    example the back-reference to the interface, are represented by their class
+    name only.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if hasattr(value, "vlan_id"):
+        return ["vlan", value.vlan_id, value.name]
+
+    if isinstance(value, (IPv4Address, IPv4Interface, IPv4Network, Path)):
+        return str(value)
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted((_stable(each) for each in value), key=repr)
+
+    return type(value).__qualname__
+
+
+@lru_cache(maxsize=None)
+def _template_digest(j2env: jinja2.Environment, name: str) -> str:
+    """
+    Returns the hash of the template and all of the templates it includes or
+    imports.  When a template refers to a template by a variable name, the
+    referred template cannot be known, and so all of the templates are part
+    of the hash.  The value is computed once per process.
+    """
+    digest = hashlib.sha256()
+
+    for each in sorted(_template_closure(j2env, name)):
+        source, *_ = j2env.loader.get_source(j2env, each)
+        digest.update(each.encode())
+        digest.update(source.encode())
+
+    return digest.hexdigest()
+
+
+def _template_closure(j2env: jinja2.Environment, name: str) -> Set[str]:
+    """returns the template name, and the names of all templates it refers to"""
+    found = set()
+    pending = [name]
+
+    while pending:
+        if (each := pending.pop()) in found:
+            continue
+
+        found.add(each)
+        source, *_ = j2env.loader.get_source(j2env, each)
+
+        for ref in meta.find_referenced_templates(j2env.parse(source)):
+            if ref is None:
+                return set(j2env.list_templates())
+            pending.append(ref)
+
+    return found
@@ -0,0 +1,410 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the Arista eAPI client used to collect the device state
+# from the cEOS devices of a lab.  A session holds a single HTTP/1.1 keep-alive
+# connection to the device, so that all of the commands sent to a device use
+# the same connection.  The eAPI responses can be recorded into a capture file
+# per device, `<capture-dir>/<hostname>.json`, and later served by the replay
+# server; see clabs_replay.py.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import asyncio
+import base64
+import json
+import os
+import ssl
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .consts import ENV_NETWORK_USERNAME, ENV_NETWORK_PASSWORD
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "EAPI_COMMANDS",
+    "EAPI_PATH",
+    "EapiError",
+    "EapiSession",
+    "EapiCapture",
+    "capture_key",
+    "get_credentials",
+    "read_http_message",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the eAPI commands used to collect the device state, by check family.  The
+# "device" family is captured, for the replay server, but is not evaluated by
+# the lab checks; see clabs_check.py.
+
+EAPI_COMMANDS: Dict[str, List[str]] = {
+    "device": ["show version"],
+    "interfaces": ["show interfaces"],
+    "switchports": ["show interfaces switchport"],
+    "vlans": ["show vlan"],
+    "ipaddrs": ["show ip interface"],
+    "cabling": ["show lldp neighbors"],
+}
+
+EAPI_PATH = "/command-api"
+
+
+class EapiError(Exception):
+    """
+    Raised when an eAPI request fails; a connection or HTTP error, or a
+    command error reported by the device.
+    """
+
+
+class EapiSession:
+    """
+    An eAPI session to a device, using one keep-alive connection for all of
+    the requests.  The connection is opened on first use, and reopened if the
+    device closes it.
+
+    Examples
+    --------
+        async with EapiSession("acc01.11", username=..., password=...) as eapi:
+            version, = await eapi.cli(["show version"])
+
+    Attributes
+    ----------
+    hostname: str
+        The device hostname, sent as the HTTP Host header.
+
+    address: str
+        The address that is connected to; defaults to the hostname.  When
+        using the replay server, this is the server address.
+
+    port: int
+        The TCP port.
+
+    use_tls: bool
+        When True, HTTPS is used; the device certificate is not verified since
+        the lab devices use self-signed certificates.
+
+    requests: int
+        The number of requests sent in this session.
+
+    connects: int
+        The number of connections opened in this session.
+
+    capture: EapiCapture, optional
+        When set, each response is recorded.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        username: str = "",
+        password: str = "",
+        address: Optional[str] = None,
+        port: Optional[int] = None,
+        use_tls: bool = True,
+        timeout: float = 30.0,
+        capture: Optional["EapiCapture"] = None,
+    ):
+        self.hostname = hostname
+        self.address = address or hostname
+        self.use_tls = use_tls
+        self.port = port or (443 if use_tls else 80)
+        self.timeout = timeout
+        self.capture = capture
+
+        self.requests = 0
+        self.connects = 0
+
+        self._auth = base64.b64encode(f"{username}:{password}".encode()).decode()
+        self._streams: Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+        self._streams = None
+
+        # the lock is created on first use, within the event loop.
+
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def cli(self, commands: List[str], ofmt: str = "json") -> List[dict]:
+        """
+        Run the commands on the device.
+
+        Parameters
+        ----------
+        commands: List[str]
+            The commands, run in order.
+
+        ofmt: str
+            The output format, "json" or "text".
+
+        Returns
+        -------
+        List[dict]
+            The output of each command.
+
+        Raises
+        ------
+        EapiError
+            When the request fails, the device reports a command error, or the
+            response is not the response to this request.
+
+        asyncio.TimeoutError
+            When the device does not respond within the timeout; the
+            connection is closed.
+        """
+        self.requests += 1
+        request_id = self.requests
+        body = json.dumps(
+            dict(
+                jsonrpc="2.0",
+                method="runCmds",
+                params=dict(version=1, cmds=commands, format=ofmt),
+                id=request_id,
+            )
+        ).encode()
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # a request that times out, or is cancelled, leaves its response
+            # unread on the connection; the connection is closed so that the
+            # next request does not read that response.
+
+            try:
+                status, content = await asyncio.wait_for(
+                    self._request(body), timeout=self.timeout
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                await self.close()
+                raise
+
+            if status != 200:
+                raise EapiError(f"{self.hostname}: HTTP status {status}")
+
+            try:
+                response = json.loads(content)
+            except ValueError as exc:
+                await self.close()
+                raise EapiError(f"{self.hostname}: invalid response: {exc}")
+
+            if response.get("id") != request_id:
+                await self.close()
+                raise EapiError(
+                    f"{self.hostname}: response id {response.get('id')!r} does "
+                    f"not match request id {request_id}"
+                )
+
+        if error := response.get("error"):
+            raise EapiError(f"{self.hostname}: {error.get('message', error)}")
+
+        result = response["result"]
+        if self.capture is not None:
+            self.capture.record(self.hostname, commands, ofmt, result)
+
+        return result
+
+    async def close(self):
+        """close the connection, if open"""
+        if self._streams is None:
+            return
+
+        _, writer = self._streams
+        self._streams = None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._streams is None:
+            ssl_ctx = None
+            if self.use_tls:
+                ssl_ctx = ssl.create_default_context()
+                ssl_ctx.check_hostname = False
+                ssl_ctx.verify_mode = ssl.CERT_NONE
+
+            try:
+                self._streams = await asyncio.open_connection(
+                    self.address, self.port, ssl=ssl_ctx
+                )
+            except OSError as exc:
+                raise EapiError(f"{self.hostname}: unable to connect: {exc}")
+
+            self.connects += 1
+
+        return self._streams
+
+    async def _request(self, body: bytes) -> Tuple[int, bytes]:
+        """send the request, retrying once if the kept-alive connection closed"""
+        header = (
+            f"POST {EAPI_PATH} HTTP/1.1\r\n"
+            f"Host: {self.hostname}\r\n"
+            f"Authorization: Basic {self._auth}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n"
+        ).encode()
+
+        for attempt in (1, 2):
+            reused = self._streams is not None
+            reader, writer = await self._connect()
+
+            try:
+                writer.write(header + body)
+                await writer.drain()
+                start_line, headers, content = await read_http_message(reader)
+
+            except (OSError, asyncio.IncompleteReadError, EapiError) as exc:
+                await self.close()
+                if reused and attempt == 1:
+                    continue
+                raise EapiError(f"{self.hostname}: request failed: {exc}")
+
+            if headers.get("connection", "").lower() == "close":
+                await self.close()
+
+            return int(start_line.split()[1]), content
+
+        raise EapiError(f"{self.hostname}: request failed")
+
+
+class EapiCapture:
+    """
+    The recorded eAPI responses of each device; stored as a capture file per
+    device in the capture directory.
+
+    Attributes
+    ----------
+    capture_dir: Path
+        The directory of the capture files.
+
+    responses: Dict[str, Dict[str, list]]
+        The recorded response, by device hostname and then capture key; see
+        `capture_key`.
+    """
+
+    def __init__(self, capture_dir: Path):
+        self.capture_dir = Path(capture_dir)
+        self.responses: Dict[str, Dict[str, list]] = dict()
+
+    def record(self, hostname: str, commands: List[str], ofmt: str, result: list):
+        """record the response of the device to the commands"""
+        self.responses.setdefault(hostname, dict())[
+            capture_key(commands, ofmt)
+        ] = result
+
+    def save(self) -> List[Path]:
+        """store the capture file of each recorded device; returns the files"""
+        self.capture_dir.mkdir(parents=True, exist_ok=True)
+        saved = list()
+
+        for hostname, responses in sorted(self.responses.items()):
+            filepath = self.capture_dir / f"{hostname}.json"
+            filepath.write_text(
+                json.dumps(dict(device=hostname, responses=responses), indent=1)
+            )
+            saved.append(filepath)
+
+        return saved
+
+
+def get_credentials() -> Tuple[str, str]:
+    """
+    Returns the eAPI username and password from the environment variables.
+
+    Raises
+    ------
+    EapiError
+        When either environment variable is not set.
+    """
+    env = [ENV_NETWORK_USERNAME, ENV_NETWORK_PASSWORD]
+    if missing := [name for name in env if not os.environ.get(name)]:
+        raise EapiError(f"Missing environment variables: {', '.join(missing)}")
+
+    return os.environ[ENV_NETWORK_USERNAME], os.environ[ENV_NETWORK_PASSWORD]
+
+
+def capture_key(commands: List[str], ofmt: str = "json") -> str:
+    """returns the key of a recorded response"""
+    return json.dumps([ofmt, *commands])
+
+
+async def read_http_message(
+    reader: asyncio.StreamReader,
+) -> Tuple[str, Dict[str, str], bytes]:
+    """
+    Read a HTTP/1.1 request or response message.
+
+    Returns
+    -------
+    tuple
+        The start line, the headers with lower-case names, and the body.
+
+    Raises
+    ------
+    asyncio.IncompleteReadError
+        When the connection is closed before the complete message is read.
+    """
+    start_line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+    headers = dict()
+
+    while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = list()
+        while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        await reader.readuntil(b"\r\n")
+        return start_line, headers, b"".join(chunks)
+
+    length = int(headers.get("content-length", 0))
+    return start_line, headers, await reader.readexactly(length)
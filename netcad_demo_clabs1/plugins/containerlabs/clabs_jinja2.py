@@ -20,17 +20,38 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Optional, Union
+from pathlib import Path
+from functools import lru_cache
+import hashlib
+import tempfile
+import shutil
+import os
+
 # -----------------------------------------------------------------------------
 # Public Imports
 # -----------------------------------------------------------------------------
 
 import jinja2
+import jinja2.meta
+
+from netcad.jinja2.env import get_env as netcad_get_env
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .clabs_cache import get_cache_dir
 
 # -----------------------------------------------------------------------------
 # Exports
 # -----------------------------------------------------------------------------
 
-__all__ = ["create_j2env"]
+__all__ = ["create_j2env", "get_j2env", "get_config_j2env", "get_template"]
 
 
 # -----------------------------------------------------------------------------
@@ -39,8 +60,21 @@ __all__ = ["create_j2env"]
 #
 # -----------------------------------------------------------------------------
 
+# The Jinja2 environment options used for both the topology templates and the
+# device configuration templates.  These same options are used when compiling
+# templates ahead-of-time, since the options are baked into the compiled code.
+
+_J2ENV_OPTIONS = dict(
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+    undefined=jinja2.StrictUndefined,
+)
 
-def create_j2env(template_dir) -> jinja2.Environment:
+
+def create_j2env(
+    template_dir, bytecode_cache: Optional[jinja2.BytecodeCache] = None
+) -> jinja2.Environment:
     """
     Create a Jinja2 enviornment instance used when template building the containerlab
     topology file.
@@ -50,17 +84,190 @@ def create_j2env(template_dir) -> jinja2.Environment:
     template_dir: str
         The file path where the Jinja2 template file is located.
 
+    bytecode_cache: BytecodeCache, optional
+        The Jinja2 bytecode cache so that templates are not recompiled on each
+        run.
+
     Returns
     -------
     A Jinja2 enviornment instance that will be used to template build the
     containerlabs topology file.
     """
     env = jinja2.Environment(
-        trim_blocks=True,
-        lstrip_blocks=True,
-        keep_trailing_newline=True,
         loader=jinja2.FileSystemLoader([template_dir]),
-        undefined=jinja2.StrictUndefined,
+        bytecode_cache=bytecode_cache,
+        **_J2ENV_OPTIONS,
     )
 
     return env
+
+
+def get_j2env(template_dir: Union[str, Path]) -> jinja2.Environment:
+    """
+    Returns the process-wide Jinja2 environment for the template directory.
+    The environment is created on first use, and stores the compiled template
+    bytecode in the project cache directory so that later runs do not need to
+    recompile unchanged templates.
+
+    Parameters
+    ----------
+    template_dir: str|Path
+        The directory of the templates, for example the design "templates"
+        directory, or the directory of the topology template.
+
+    Returns
+    -------
+    jinja2.Environment
+    """
+    return _get_j2env(str(Path(template_dir).resolve()))
+
+
+def get_config_j2env(templates_dir: Union[str, Path]) -> jinja2.Environment:
+    """
+    Returns the process-wide Jinja2 environment used to render the device
+    configs.  The environment is created by netcad, the same as used by the
+    `netcad build configs` command, so that the netcad filters and globals,
+    for example the `vlan_ranges` filter, are available to the templates.  The
+    compiled template bytecode is stored in the project cache directory.
+
+    Parameters
+    ----------
+    templates_dir: str|Path
+        The directory of the device config templates.
+
+    Returns
+    -------
+    jinja2.Environment
+    """
+    return _get_config_j2env(str(Path(templates_dir).resolve()))
+
+
+def get_template(template_file: Path) -> jinja2.Template:
+    """
+    Returns the Jinja2 template for the given template file.  The template is
+    loaded from an ahead-of-time compiled module when one is available; the
+    module is created in the project cache directory on first use.  A template
+    that refers to other templates, using include, import, or extends, and a
+    template whose module cannot be created, are loaded from the shared
+    environment for the template directory.
+
+    Parameters
+    ----------
+    template_file: Path
+        The template file, for example the packaged containerlab topology
+        template.
+
+    Returns
+    -------
+    jinja2.Template
+    """
+    template_file = Path(template_file).resolve()
+
+    try:
+        module_dir = _compile_template(template_file)
+    except (OSError, jinja2.TemplateError):
+        module_dir = None
+
+    if module_dir is None:
+        return get_j2env(template_file.parent).get_template(template_file.name)
+
+    return _get_j2env_compiled(str(module_dir)).get_template(template_file.name)
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=None)
+def _get_j2env(template_dir: str) -> jinja2.Environment:
+    """cached by resolved template directory; see `get_j2env`"""
+    bc_cache = jinja2.FileSystemBytecodeCache(str(get_cache_dir("jinja2")))
+    return create_j2env(template_dir, bytecode_cache=bc_cache)
+
+
+@lru_cache(maxsize=None)
+def _get_config_j2env(templates_dir: str) -> jinja2.Environment:
+    """cached by resolved templates directory; see `get_config_j2env`"""
+    env = netcad_get_env([Path(templates_dir)])
+    env.bytecode_cache = jinja2.FileSystemBytecodeCache(
+        str(get_cache_dir("jinja2-configs"))
+    )
+    return env
+
+
+@lru_cache(maxsize=None)
+def _get_j2env_compiled(module_dir: str) -> jinja2.Environment:
+    """cached by the compiled template module directory"""
+    return jinja2.Environment(loader=jinja2.ModuleLoader(module_dir), **_J2ENV_OPTIONS)
+
+
+def _compile_template(template_file: Path) -> Optional[Path]:
+    """
+    Compile the template file into a Python module stored in the project cache
+    directory; unless it already exists.  The module directory name includes a
+    hash of the template source and the Jinja2 version, so that a changed
+    template is recompiled.
+
+    Only a template that does not refer to other templates is compiled; the
+    compiled module could not load the other templates, and the hash would
+    not cover their source.  A template that refers to other templates is
+    recorded with an empty marker file, so that the template source is only
+    parsed once; when it is first compiled, or first found to refer to other
+    templates.
+
+    Returns
+    -------
+    Path, optional
+        The directory containing the compiled template module, or None when
+        the template refers to other templates.
+    """
+    source = template_file.read_bytes()
+
+    digest = hashlib.sha256(source)
+    digest.update(jinja2.__version__.encode())
+
+    aot_dir = get_cache_dir("jinja2-aot")
+    module_dir = aot_dir / f"{template_file.stem}-{digest.hexdigest()[:16]}"
+    refers_file = aot_dir / f"{module_dir.name}.refers"
+
+    if module_dir.is_dir():
+        return module_dir
+
+    if refers_file.exists():
+        return None
+
+    env = get_j2env(template_file.parent)
+
+    if _refers_templates(env, source.decode()):
+        refers_file.touch()
+        return None
+
+    # compile into a temporary directory, and then rename, so that concurrent
+    # processes never load a partially written module.
+
+    tmp_dir = tempfile.mkdtemp(dir=aot_dir)
+
+    try:
+        env.compile_templates(
+            tmp_dir,
+            zip=None,
+            filter_func=lambda name: name == template_file.name,
+            ignore_errors=False,
+        )
+        os.rename(tmp_dir, module_dir)
+
+    except (OSError, jinja2.TemplateError):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not module_dir.is_dir():
+            raise
+
+    return module_dir
+
+
+def _refers_templates(env: jinja2.Environment, source: str) -> bool:
+    """
+    Returns True if the template source includes, imports, or extends other
+    templates; including a template name that is only known when rendered.
+    """
+    return any(True for _ in jinja2.meta.find_referenced_templates(env.parse(source)))
@@ -0,0 +1,230 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the eAPI replay server.  The server is a local stand-in
+# for the lab devices, serving the eAPI responses recorded in the capture files
+# (see clabs_eapi.py) so that validation can be run, and benchmarked, without
+# a running containerlab.  All devices are served on the one server address;
+# the device is selected by the HTTP Host header, which `EapiSession` sets to
+# the device hostname.
+#
+# Each response is delayed by the configured latency, plus a random jitter, to
+# model the device response time.  A fallback device can be given so that any
+# hostname without a capture file is served the fallback device responses; for
+# example to simulate hundreds of devices from the capture of one.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Optional
+from pathlib import Path
+import asyncio
+import json
+import random
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from .clabs_eapi import EAPI_PATH, capture_key, read_http_message
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = ["ReplayServer", "load_captures"]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the eAPI JSON-RPC error code for a command that cannot be run.
+
+_EAPI_ERROR_CODE = 1002
+
+
+def load_captures(capture_dir: Path) -> Dict[str, Dict[str, list]]:
+    """returns the recorded responses of each capture file, by device hostname"""
+    captures = dict()
+
+    for filepath in sorted(Path(capture_dir).glob("*.json")):
+        content = json.loads(filepath.read_text())
+        captures[content["device"]] = content["responses"]
+
+    return captures
+
+
+class ReplayServer:
+    """
+    The eAPI replay server.
+
+    Examples
+    --------
+        server = ReplayServer(load_captures("captures"), latency=0.020)
+        await server.start("127.0.0.1", 8080)
+        ...
+        await server.stop()
+
+    Attributes
+    ----------
+    captures: Dict[str, Dict[str, list]]
+        The recorded responses, by device hostname and then capture key.
+
+    latency: float
+        The response delay, in seconds.
+
+    jitter: float
+        The maximum random variation of the response delay, in seconds.
+
+    fallback: str, optional
+        The device whose responses are served for hostnames without captures.
+
+    requests: int
+        The number of requests served.
+
+    connections: int
+        The number of client connections accepted.
+    """
+
+    # the listen backlog; large enough that hundreds of simulated devices can
+    # connect at once, without the connections being retried.
+
+    backlog = 1024
+
+    def __init__(
+        self,
+        captures: Dict[str, Dict[str, list]],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fallback: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        if fallback is not None and fallback not in captures:
+            raise ValueError(f"fallback device {fallback!r} has no capture file")
+
+        self.captures = captures
+        self.latency = latency
+        self.jitter = jitter
+        self.fallback = fallback
+        self.requests = 0
+        self.connections = 0
+
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """start serving; returns the port, which is chosen when port is 0"""
+        self._server = await asyncio.start_server(
+            self._serve, host, port, backlog=self.backlog
+        )
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """stop serving"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        """serve until cancelled"""
+        async with self._server:
+            await self._server.serve_forever()
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """serve the requests of a client connection, until the client closes"""
+        self.connections += 1
+
+        try:
+            while True:
+                try:
+                    start_line, headers, body = await read_http_message(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, content = self._respond(start_line, headers, body)
+
+                if delay := self._delay():
+                    await asyncio.sleep(delay)
+
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(content)}\r\n"
+                        "Connection: keep-alive\r\n"
+                        "\r\n"
+                    ).encode()
+                    + content
+                )
+                await writer.drain()
+                self.requests += 1
+
+        finally:
+            writer.close()
+
+    def _delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _respond(self, start_line: str, headers: Dict[str, str], body: bytes):
+        """returns the HTTP status and the JSON-RPC response content"""
+        method, path, *_ = start_line.split()
+        if method != "POST" or path != EAPI_PATH:
+            return "404 Not Found", b"{}"
+
+        hostname = headers.get("host", "").rsplit(":", 1)[0]
+        responses = self.captures.get(hostname)
+        if responses is None and self.fallback:
+            responses = self.captures[self.fallback]
+
+        try:
+            request = json.loads(body)
+            params = request["params"]
+            key = capture_key(params["cmds"], params.get("format", "json"))
+        except (ValueError, KeyError, TypeError):
+            return "400 Bad Request", b"{}"
+
+        if responses is None or (result := responses.get(key)) is None:
+            response = dict(
+                jsonrpc="2.0",
+                id=request.get("id"),
+                error=dict(
+                    code=_EAPI_ERROR_CODE,
+                    message=f"no recorded response for {params['cmds']}",
+                ),
+            )
+        else:
+            response = dict(jsonrpc="2.0", id=request.get("id"), result=result)
+
+        return "200 OK", json.dumps(response).encode()
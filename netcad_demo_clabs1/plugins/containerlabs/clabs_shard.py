@@ -0,0 +1,334 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the topology sharding support.  The devices of the
+# designs are partitioned into N shards, each rendered as its own topology
+# file, so that a large lab can be deployed on several hosts or in batches on
+# one host.  Each shard is limited by the host budget, the number of cEOS
+# nodes that fit the host CPUs and memory.
+#
+# The partition is a greedy graph partition of the device cabling graph:
+#
+#   1. the devices are ordered breadth-first over the cabling, so that cabled
+#      neighbours are next to each other, and the order is split into shards
+#      of equal size
+#
+#   2. each device is then moved to the shard with the most cables to it, when
+#      that reduces the cut cables and the shard has room; repeated until no
+#      device is moved
+#
+# Each pass is linear in the number of devices and cables.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.design import Design
+from netcad.topology import NoValidateCabling
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ...interface_index import get_interface_index
+from .clabs_topology import iter_core_uplinks
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "ShardBudget",
+    "ShardError",
+    "device_graph",
+    "partition_devices",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the maximum number of refinement passes; see `partition_devices`.
+
+_MAX_REFINE_PASSES = 8
+
+
+class ShardError(ValueError):
+    """
+    Raised when the devices cannot be partitioned into the shards within the
+    host budget.
+    """
+
+
+class ShardBudget:
+    """
+    The host resource budget of each shard.
+
+    Attributes
+    ----------
+    host_cpus: float, optional
+        The CPUs of each host; no limit when not set.
+
+    host_memory: float, optional
+        The memory of each host, in GB; no limit when not set.
+
+    node_cpus: float
+        The CPUs used by each cEOS node.
+
+    node_memory: float
+        The memory used by each cEOS node, in GB.
+    """
+
+    def __init__(
+        self,
+        host_cpus: Optional[float] = None,
+        host_memory: Optional[float] = None,
+        node_cpus: float = 1.0,
+        node_memory: float = 2.0,
+    ):
+        if node_cpus <= 0 or node_memory <= 0:
+            raise ShardError("the node CPUs and memory must be greater than zero")
+
+        self.host_cpus = host_cpus
+        self.host_memory = host_memory
+        self.node_cpus = node_cpus
+        self.node_memory = node_memory
+
+    @property
+    def max_nodes(self) -> Optional[int]:
+        """the number of nodes that fit the host, or None when not limited"""
+        limits = [
+            int(host // node)
+            for host, node in (
+                (self.host_cpus, self.node_cpus),
+                (self.host_memory, self.node_memory),
+            )
+            if host is not None
+        ]
+        return min(limits) if limits else None
+
+    def as_dict(self) -> dict:
+        return dict(
+            host_cpus=self.host_cpus,
+            host_memory=self.host_memory,
+            node_cpus=self.node_cpus,
+            node_memory=self.node_memory,
+            max_nodes=self.max_nodes,
+        )
+
+
+def device_graph(
+    design_objs: Sequence[Design],
+) -> Tuple[List[str], Dict[Tuple[str, str], int]]:
+    """
+    Returns the cabling graph of the lab devices of the designs; that is, the
+    non-pseudo devices, and the cables between them including the core uplinks
+    between the designs.
+
+    Returns
+    -------
+    tuple
+        The device hostnames, in design order; and the number of cables
+        between each pair of devices, by (hostname, hostname) in sorted order.
+    """
+    nodes = [
+        dev.name
+        for design_obj in design_objs
+        for dev in design_obj.devices.values()
+        if not dev.is_pseudo
+    ]
+
+    edges: Dict[Tuple[str, str], int] = dict()
+
+    def add_edge(dev_a: str, dev_b: str):
+        key = (dev_a, dev_b) if dev_a < dev_b else (dev_b, dev_a)
+        edges[key] = edges.get(key, 0) + 1
+
+    for design_obj in design_objs:
+        for end_a, end_b in get_interface_index(design_obj).cables:
+            if end_b.cable_port_id is not NoValidateCabling:
+                add_edge(end_a.device.name, end_b.device.name)
+
+    for (ifobj_a, _), (ifobj_b, _) in iter_core_uplinks(design_objs):
+        add_edge(ifobj_a.device.name, ifobj_b.device.name)
+
+    return nodes, edges
+
+
+def partition_devices(
+    nodes: Sequence[str],
+    edges: Dict[Tuple[str, str], int],
+    shards: int,
+    max_nodes: Optional[int] = None,
+) -> List[List[str]]:
+    """
+    Partition the devices into the shards, keeping cabled devices together;
+    see the module description.
+
+    Parameters
+    ----------
+    nodes: Sequence[str]
+        The device hostnames.
+
+    edges: Dict[Tuple[str, str], int]
+        The number of cables between each pair of devices.
+
+    shards: int
+        The number of shards.
+
+    max_nodes: int, optional
+        The maximum number of devices in each shard; see `ShardBudget`.
+
+    Returns
+    -------
+    List[List[str]]
+        The device hostnames of each shard, in the given device order.
+
+    Raises
+    ------
+    ShardError
+        When the devices do not fit the shards.
+    """
+    if shards < 1:
+        raise ShardError("the number of shards must be at least 1")
+
+    if max_nodes is not None and len(nodes) > shards * max_nodes:
+        raise ShardError(
+            f"{len(nodes)} devices do not fit {shards} shards of at most "
+            f"{max_nodes} devices each; at least "
+            f"{-(-len(nodes) // max(max_nodes, 1))} shards are needed"
+        )
+
+    adjacency: Dict[str, Dict[str, int]] = {node: dict() for node in nodes}
+    for (dev_a, dev_b), count in edges.items():
+        if dev_a in adjacency and dev_b in adjacency:
+            adjacency[dev_a][dev_b] = count
+            adjacency[dev_b][dev_a] = count
+
+    # split the breadth-first order into shards of equal size; the shard size
+    # is also the limit used when moving devices, unless the budget allows
+    # for more.
+
+    shard_size = -(-len(nodes) // shards)
+    limit = max(shard_size, max_nodes or shard_size)
+
+    assigned = {
+        node: position // shard_size
+        for position, node in enumerate(_bfs_order(nodes, adjacency))
+    }
+    sizes = [0] * shards
+    for shard_id in assigned.values():
+        sizes[shard_id] += 1
+
+    for _ in range(_MAX_REFINE_PASSES):
+        if not _refine(nodes, adjacency, assigned, sizes, limit):
+            break
+
+    members: List[List[str]] = [list() for _ in range(shards)]
+    for node in nodes:
+        members[assigned[node]].append(node)
+
+    return members
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _bfs_order(nodes: Sequence[str], adjacency: Dict[str, Dict[str, int]]) -> List[str]:
+    """
+    Returns the devices in breadth-first order over the cabling; each connected
+    group starts at its most cabled device, and the neighbours of each device
+    are visited most cabled first.
+    """
+    by_degree = sorted(nodes, key=lambda node: -len(adjacency[node]))
+    visited = set()
+    order = list()
+
+    for start in by_degree:
+        if start in visited:
+            continue
+
+        visited.add(start)
+        queue = deque([start])
+
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+
+            for peer in sorted(adjacency[node], key=lambda p: -adjacency[node][p]):
+                if peer not in visited:
+                    visited.add(peer)
+                    queue.append(peer)
+
+    return order
+
+
+def _refine(
+    nodes: Sequence[str],
+    adjacency: Dict[str, Dict[str, int]],
+    assigned: Dict[str, int],
+    sizes: List[int],
+    limit: int,
+) -> bool:
+    """
+    Move each device to the shard with the most cables to the device, when
+    that shard has room and the move reduces the cut cables.  Returns True if
+    any device was moved.
+    """
+    moved = False
+
+    for node in nodes:
+        current = assigned[node]
+        cables: Dict[int, int] = dict()
+        for peer, count in adjacency[node].items():
+            cables[assigned[peer]] = cables.get(assigned[peer], 0) + count
+
+        if not cables:
+            continue
+
+        best = max(cables, key=lambda shard_id: (cables[shard_id], -shard_id))
+        if (
+            best != current
+            and cables[best] > cables.get(current, 0)
+            and sizes[best] < limit
+            and sizes[current] > 1
+        ):
+            assigned[node] = best
+            sizes[current] -= 1
+            sizes[best] += 1
+            moved = True
+
+    return moved
@@ -0,0 +1,561 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the functions used to render the containerlab topology
+# content for a design.  The content is produced as a stream of chunks so that
+# the complete topology is never held in memory.
+#
+# The designs can also be merged into a single campus topology.  The designs
+# share the one dummy bridge, so the dummy port-ids of each design are
+# prefixed by the design name.  The cores of different designs can be cabled
+# together using the design config "core_uplinks" value in `netcad.toml`:
+#
+#     [design.config]
+#         core_uplinks = [
+#             { interface = "Ethernet8", peer = "b1.f2", peer_interface = "Ethernet8" }
+#         ]
+#
+# The "device" and "peer_device" values default to the "core01" nickname.
+# The uplink is only added when both designs are merged, and it replaces the
+# dummy bridge link of each port.
+#
+# A merged topology can also be limited to a shard, a subset of the devices;
+# see clabs_shard.py.  A cable between a device in the shard and a device in
+# another shard is cut; the endpoint in the shard is connected to the dummy
+# bridge, so that the interface exists, and the cut is recorded.
+#
+# Each unused port is connected to the dummy bridge by default, so that the
+# interface exists in the lab; each such link is a veth pair and a bridge port
+# on the lab host.  The unused ports mode selects a leaner form:
+#
+#   * "dummy" creates each unused interface as a containerlab dummy link, a
+#     Linux dummy interface in the node, without a veth pair or bridge port
+#   * "omit" does not create the unused interfaces at all; the unused
+#     interface checks then fail, since the interfaces do not exist
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from itertools import chain
+import re
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+import jinja2
+
+from netcad.design import Design
+from netcad.device import DeviceInterface
+from netcad.topology import NoValidateCabling
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from ...interface_index import InterfaceIndex, get_interface_index
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "UNUSED_PORT_MODES",
+    "TopologyError",
+    "render_topology_content",
+    "render_topology_chunks",
+    "render_merged_topology_chunks",
+    "iter_core_uplinks",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                               CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the maximum Linux interface name length; the dummy bridge port-id is used as
+# the interface name of the bridge side of the link.
+
+_IFNAME_MAX_LEN = 15
+
+# the ways the unused ports can be created in the topology; see above.
+
+UNUSED_PORT_MODES = ("bridge", "dummy", "omit")
+
+# the device nickname used when a core uplink does not define the device.
+
+_CORE_NICKNAME = "core01"
+
+
+class TopologyError(ValueError):
+    """
+    Raised when the designs cannot be merged into a single topology.
+    """
+
+
+def render_topology_content(
+    template: jinja2.Template,
+    design_obj: Design,
+    dummy_br_name: str,
+    unused_mode: str = "bridge",
+) -> str:
+    """
+    Generate the topology content for a given design.
+
+    Parameters
+    ----------
+    template: Template
+        The jinja2 template instance that will be used for rendeing purposes.
+
+    design_obj: Design
+        The design instance that is used to formulate the variables that
+        are passed to the Template for rendering.
+
+    dummy_br_name: str
+        The User define "dummy bridge" name that is used to define interfaces in
+        the containerlab topology so that they exist as virtual-ethernet
+        interfaces in Linux.
+
+    unused_mode: str
+        How the unused ports are created, one of the UNUSED_PORT_MODES.
+
+    Returns
+    -------
+    str
+        The topology content that needs to be saved to a file.
+    """
+    return "".join(
+        render_topology_chunks(template, design_obj, dummy_br_name, unused_mode)
+    )
+
+
+def render_topology_chunks(
+    template: jinja2.Template,
+    design_obj: Design,
+    dummy_br_name: str,
+    unused_mode: str = "bridge",
+    savings: Optional[Dict[str, int]] = None,
+) -> Iterator[str]:
+    """
+    Generate the topology content for a given design as a stream of chunks.
+    The template variables are generators, so that neither the content nor the
+    lists of links are materialized; the chunks can be written to the topology
+    file as they are produced.  The content is the same as the content returned
+    by `render_topology_content`.
+
+    Parameters
+    ----------
+    See `render_topology_content`.
+
+    savings: Dict[str, int], optional
+        When given, the number of dummy bridge "links" and "veths" that are
+        not created, because of the unused ports mode, are added.
+
+    Returns
+    -------
+    Iterator[str]
+        The topology content chunks, from `jinja2.Template.generate`.
+    """
+    if_index = get_interface_index(design_obj)
+    _check_unused_mode(unused_mode)
+
+    if unused_mode != "bridge" and savings is not None:
+        _add_savings(savings, _iter_dummy_ports(design_obj, if_index, used=False))
+
+    return template.generate(
+        name=design_obj.name,
+        design=design_obj,
+        designs=[design_obj],
+        unused_mode=unused_mode,
+        devices=(dev for dev in design_obj.devices.values() if not dev.is_pseudo),
+        cabled_ports=_iter_cabling(if_index, dummy_br_name),
+        uncabled_ports=_iter_dummy_ports(design_obj, if_index, used=True),
+        unused_ports=_iter_dummy_ports(design_obj, if_index, used=False),
+    )
+
+
+def render_merged_topology_chunks(
+    template: jinja2.Template,
+    design_objs: Sequence[Design],
+    name: str,
+    dummy_br_name: str,
+    unused_mode: str = "bridge",
+    savings: Optional[Dict[str, int]] = None,
+    shard: Optional[Set[str]] = None,
+    cut_links: Optional[List[Tuple[str, str]]] = None,
+) -> Iterator[str]:
+    """
+    Generate the topology content for the designs merged into a single
+    topology, as a stream of chunks.  The links of each design are the same as
+    the design topology, except that the dummy port-ids are prefixed by the
+    design name; and the core uplinks between the designs are added to the
+    cabled ports.  The links are produced in a single pass of each design.
+
+    Parameters
+    ----------
+    template: Template
+        The jinja2 template instance that will be used for rendeing purposes;
+        the template "design" variable is not defined.
+
+    design_objs: Sequence[Design]
+        The designs to merge.
+
+    name: str
+        The topology name.
+
+    dummy_br_name, unused_mode: str
+        See `render_topology_content`.
+
+    savings: Dict[str, int], optional
+        See `render_topology_chunks`.
+
+    shard: Set[str], optional
+        When given, only these devices, by hostname, are in the topology.
+
+    cut_links: List[Tuple[str, str]], optional
+        When given, the (side-a, side-b) endpoint names of each cable that is
+        cut by the shard are added, as the content is produced.
+
+    Returns
+    -------
+    Iterator[str]
+        The topology content chunks.
+
+    Raises
+    ------
+    TopologyError
+        When a device is in more than one design, or a core uplink is not
+        valid, or a dummy port-id is too long.
+    """
+    indexes = [
+        (design_obj, get_interface_index(design_obj), _dummy_prefix(design_obj))
+        for design_obj in design_objs
+    ]
+
+    owners: Dict[str, str] = dict()
+    for design_obj in design_objs:
+        for dev_name in design_obj.devices:
+            if (
+                owner := owners.setdefault(dev_name, design_obj.name)
+            ) != design_obj.name:
+                raise TopologyError(
+                    f"{dev_name}: device in both designs {owner} and {design_obj.name}"
+                )
+
+    _check_unused_mode(unused_mode)
+    uplinks = list(iter_core_uplinks(design_objs))
+    uplink_ports = {ifobj for link in uplinks for ifobj, _ in link}
+
+    if unused_mode != "bridge" and savings is not None:
+        for design_obj, if_index, _ in indexes:
+            _add_savings(
+                savings,
+                _iter_dummy_ports(
+                    design_obj, if_index, False, exclude=uplink_ports, shard=shard
+                ),
+            )
+
+    return template.generate(
+        name=name,
+        designs=design_objs,
+        unused_mode=unused_mode,
+        devices=(
+            dev
+            for design_obj in design_objs
+            for dev in design_obj.devices.values()
+            if not dev.is_pseudo and (shard is None or dev.name in shard)
+        ),
+        cabled_ports=chain(
+            chain.from_iterable(
+                _iter_cabling(if_index, dummy_br_name, prefix, shard, cut_links)
+                for _, if_index, prefix in indexes
+            ),
+            chain.from_iterable(
+                _shard_link(
+                    (ifobj_a.device.name, clab_a),
+                    (ifobj_b.device.name, clab_b),
+                    f"{dummy_br_name}:up{uplink_id}",
+                    shard,
+                    cut_links,
+                )
+                for uplink_id, ((ifobj_a, clab_a), (ifobj_b, clab_b)) in enumerate(
+                    uplinks
+                )
+            ),
+        ),
+        uncabled_ports=chain.from_iterable(
+            _iter_dummy_ports(design_obj, if_index, True, prefix, uplink_ports, shard)
+            for design_obj, if_index, prefix in indexes
+        ),
+        unused_ports=chain.from_iterable(
+            _iter_dummy_ports(design_obj, if_index, False, prefix, uplink_ports, shard)
+            for design_obj, if_index, prefix in indexes
+        ),
+    )
+
+
+def iter_core_uplinks(
+    design_objs: Sequence[Design],
+) -> Iterator[Tuple[Tuple[DeviceInterface, str], Tuple[DeviceInterface, str]]]:
+    """
+    Yields the core uplinks declared between the designs, using the design
+    config "core_uplinks" values.  An uplink declared by both designs is only
+    yielded once; an uplink to a design that is not given is not yielded.
+
+    Yields
+    ------
+    tuple
+        The (interface, containerlab-endpoint-name) of each side.
+
+    Raises
+    ------
+    TopologyError
+        When an uplink device or interface does not exist, or the interface is
+        cabled in its design, or is used by more than one uplink.
+    """
+    by_name = {design_obj.name: design_obj for design_obj in design_objs}
+    links_seen: Set[frozenset] = set()
+    ports_seen: Dict[DeviceInterface, str] = dict()
+
+    for design_obj in design_objs:
+        for uplink in design_obj.config.get("core_uplinks", []):
+            if (peer_obj := by_name.get(uplink["peer"])) is None:
+                continue
+
+            link = (
+                _uplink_endpoint(
+                    design_obj,
+                    uplink.get("device", _CORE_NICKNAME),
+                    uplink["interface"],
+                ),
+                _uplink_endpoint(
+                    peer_obj,
+                    uplink.get("peer_device", _CORE_NICKNAME),
+                    uplink.get("peer_interface", uplink["interface"]),
+                ),
+            )
+
+            link_key = frozenset(clab_name for _, clab_name in link)
+            if link_key in links_seen:
+                continue
+
+            links_seen.add(link_key)
+            desc = " - ".join(clab_name for _, clab_name in link)
+
+            for ifobj, clab_name in link:
+                if (prior := ports_seen.setdefault(ifobj, desc)) != desc:
+                    raise TopologyError(
+                        f"{clab_name}: used by core uplinks {prior} and {desc}"
+                    )
+
+            yield link
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+def _iter_cabling(
+    if_index: InterfaceIndex,
+    dummy_br_name: str,
+    prefix: str = "",
+    shard: Optional[Set[str]] = None,
+    cut_links: Optional[List[Tuple[str, str]]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the (side-a, side-b) endpoint names for each cable.  A cable
+    endpoint that is not validated, for example an access-point that does not
+    exist in the lab, is connected to the dummy bridge instead.  When a shard
+    is given, see `_shard_link`.
+    """
+    fake_br_id = 0
+
+    for cable_id, (end_a, end_b) in enumerate(if_index.cables):
+        side_a = (end_a.device.name, if_index.clab_name(end_a))
+
+        if end_b.cable_port_id is NoValidateCabling:
+            if shard is None or side_a[0] in shard:
+                yield side_a[1], f"{dummy_br_name}:{prefix}{fake_br_id}"
+            fake_br_id += 1
+            continue
+
+        yield from _shard_link(
+            side_a,
+            (end_b.device.name, if_index.clab_name(end_b)),
+            f"{dummy_br_name}:{prefix}c{cable_id}",
+            shard,
+            cut_links,
+        )
+
+
+def _shard_link(
+    side_a: Tuple[str, str],
+    side_b: Tuple[str, str],
+    cut_port: str,
+    shard: Optional[Set[str]],
+    cut_links: Optional[List[Tuple[str, str]]],
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the (side-a, side-b) endpoint names of the link between the two
+    (hostname, endpoint-name) sides, if both are in the shard.  If only one
+    side is in the shard, the link is cut: that side is connected to the dummy
+    bridge cut port instead, suffixed "a" or "b" so that the bridge port names
+    of the two shards differ, and the link is added to the cut links.
+    """
+    in_a = shard is None or side_a[0] in shard
+    in_b = shard is None or side_b[0] in shard
+
+    if in_a and in_b:
+        yield side_a[1], side_b[1]
+        return
+
+    if not (in_a or in_b):
+        return
+
+    if cut_links is not None:
+        cut_links.append((side_a[1], side_b[1]))
+
+    yield (side_a[1], f"{cut_port}a") if in_a else (side_b[1], f"{cut_port}b")
+
+
+def _iter_dummy_ports(
+    design_obj: Design,
+    if_index: InterfaceIndex,
+    used: bool,
+    prefix: str = "",
+    exclude: Set[DeviceInterface] = frozenset(),
+    shard: Optional[Set[str]] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (endpoint-name, dummy-port-id) for each used, or unused, interface
+    that is not cabled, and therefore needs to be connected to the dummy bridge
+    so that it exists in the lab.  The dummy port-ids are first used by the
+    cables that are not validated, and then assigned in device-interface
+    order, across both the used and unused ports; so that the port-ids are the
+    same in both passes.  The excluded interfaces, and the interfaces of the
+    devices not in the shard, keep their port-id, but are not yielded.
+    """
+    dummy_id = _count_dummy_cables(if_index)
+
+    for dev_obj in design_obj.devices.values():
+        if dev_obj.is_pseudo:
+            continue
+
+        dev_index = if_index.devices[dev_obj.name]
+
+        if shard is not None and dev_obj.name not in shard:
+            dummy_id += len(dev_index.uncabled)
+            continue
+
+        for ifobj in dev_index.uncabled:
+            if bool(ifobj.used) == used and ifobj not in exclude:
+                yield dev_index.clab_name(ifobj), f"{prefix}{dummy_id}"
+            dummy_id += 1
+
+
+def _add_savings(savings: Dict[str, int], unused_ports: Iterator[Tuple[str, str]]):
+    """add the dummy bridge links, and their veth pairs, that are not created"""
+    links = sum(1 for _ in unused_ports)
+    savings["links"] = savings.get("links", 0) + links
+    savings["veths"] = savings.get("veths", 0) + 2 * links
+
+
+def _check_unused_mode(unused_mode: str):
+    """raises TopologyError if the unused ports mode is not valid"""
+    if unused_mode not in UNUSED_PORT_MODES:
+        raise TopologyError(
+            f"unused ports mode {unused_mode!r} not one of: {', '.join(UNUSED_PORT_MODES)}"
+        )
+
+
+def _count_dummy_cables(if_index: InterfaceIndex) -> int:
+    """returns the number of cables connected to the dummy bridge"""
+    return sum(end_b.cable_port_id is NoValidateCabling for _, end_b in if_index.cables)
+
+
+def _dummy_prefix(design_obj: Design) -> str:
+    """
+    Returns the dummy port-id prefix of the design in a merged topology; the
+    design name without punctuation, for example "b1f1-".
+
+    Raises
+    ------
+    TopologyError
+        When the longest dummy port-id exceeds the Linux interface name length.
+    """
+    prefix = re.sub(r"[^0-9A-Za-z]", "", design_obj.name) + "-"
+    if_index = get_interface_index(design_obj)
+
+    dummy_count = _count_dummy_cables(if_index) + sum(
+        len(if_index.devices[dev_obj.name].uncabled)
+        for dev_obj in design_obj.devices.values()
+        if not dev_obj.is_pseudo
+    )
+
+    # the longest port-id is either the last dummy port, or the last cable
+    # cut port; see `_shard_link`.
+
+    longest = max(str(dummy_count), f"c{len(if_index.cables)}a", key=len)
+
+    if len(prefix) + len(longest) > _IFNAME_MAX_LEN:
+        raise TopologyError(
+            f"{design_obj.name}: dummy port-id {prefix}{longest} exceeds "
+            f"{_IFNAME_MAX_LEN} characters"
+        )
+
+    return prefix
+
+
+def _uplink_endpoint(
+    design_obj: Design, device: str, if_name: str
+) -> Tuple[DeviceInterface, str]:
+    """
+    Returns the (interface, containerlab-endpoint-name) of a core uplink side;
+    the device is given by nickname or hostname.
+    """
+    dev_obj = design_obj.config.get("nicknames", {}).get(device)
+    dev_obj = dev_obj or design_obj.devices.get(device)
+    if dev_obj is None:
+        raise TopologyError(f"{design_obj.name}: core uplink device {device} not found")
+
+    if_index = get_interface_index(design_obj)
+    dev_index = if_index.devices[dev_obj.name]
+
+    if (clab_name := dev_index.clab_names.get(if_name)) is None:
+        raise TopologyError(
+            f"{design_obj.name}: core uplink interface {dev_obj.name}:{if_name} not found"
+        )
+
+    ifobj = dev_obj.interfaces[if_name]
+    if ifobj in if_index.cabled_ports:
+        raise TopologyError(
+            f"{design_obj.name}: core uplink interface {clab_name} is already cabled"
+        )
+
+    return ifobj, clab_name
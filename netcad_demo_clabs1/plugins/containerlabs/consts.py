@@ -24,3 +24,20 @@ from pathlib import Path
 
 
 DEFAULT_TOPOLOGY_TEMPLATE = Path(__file__).parent / "topology_template.jinja2"
+
+# The project cache directory is used to store build-time caches, for example
+# the Jinja2 bytecode.  The location can be changed using the environment
+# variable.
+
+DEFAULT_CACHE_DIR = Path(".netcad") / "cache"
+ENV_CACHE_DIR = "NETCAD_CLAB_CACHEDIR"
+
+# The device eAPI credentials are sourced from these environment variables, the
+# same as configured for the netcam plugin in the netcad.toml file.
+
+ENV_NETWORK_USERNAME = "NETWORK_USERNAME"
+ENV_NETWORK_PASSWORD = "NETWORK_PASSWORD"
+
+# The eAPI capture files directory, used by the capture and replay commands.
+
+DEFAULT_CAPTURE_DIR = Path("captures")
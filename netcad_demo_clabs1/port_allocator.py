@@ -0,0 +1,352 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the device port allocator.  Each device has a range of
+# front-panel ports, as given by its device type, and the design cabling takes
+# ports from the device allocator rather than computing the interface names.
+# The next free port is found in constant time, so that cabling hundreds of
+# access switches to a core remains linear, and a design that needs more ports
+# than the device has fails with a capacity error when the design is built.
+#
+# The port range of each device type is taken from the front-panel interfaces
+# of its netcad device-type spec, `.netcad/device-types/<device-type>.json`.
+# The port range can be changed, or device types without a spec added, using
+# the design config "port_ranges" value in the `netcad.toml` file:
+#
+#     [design.config]
+#         core_device_type = "cEOS-128"
+#         port_ranges = { "cEOS-128" = "Ethernet1-64" }
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, List, Optional, Union
+from functools import lru_cache
+from pathlib import Path
+import json
+import re
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "PortRange",
+    "PortAllocator",
+    "PortAllocationError",
+    "DEVICE_TYPES_DIR",
+    "read_device_type_ports",
+    "get_port_ranges",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+
+class PortAllocationError(ValueError):
+    """
+    Raised when a port cannot be allocated; either the device has no more free
+    ports, or the port is already allocated, or the device type has no port
+    range.
+    """
+
+
+class PortRange:
+    """
+    A numbered range of device ports, for example "Ethernet1-8".
+
+    Attributes
+    ----------
+    prefix: str
+        The interface name prefix, for example "Ethernet".
+
+    first, last: int
+        The first and last port numbers, inclusive.
+    """
+
+    _re_range = re.compile(r"^(\D+)(\d+)-(\d+)$")
+
+    def __init__(self, prefix: str, first: int, last: int):
+        if not 0 <= first <= last:
+            raise PortAllocationError(f"{prefix}{first}-{last}: invalid port range")
+
+        self.prefix = prefix
+        self.first = first
+        self.last = last
+
+    @classmethod
+    def parse(cls, value: str) -> "PortRange":
+        """returns the port range of the string form, for example "Ethernet1-8" """
+        if not (mo := cls._re_range.match(value)):
+            raise PortAllocationError(
+                f"{value!r}: invalid port range, expected for example 'Ethernet1-8'"
+            )
+
+        return cls(mo.group(1), int(mo.group(2)), int(mo.group(3)))
+
+    def name(self, index: int) -> str:
+        """returns the interface name of the port at the index, starting at 0"""
+        return f"{self.prefix}{self.first + index}"
+
+    def index(self, if_name: str) -> Optional[int]:
+        """returns the index of the interface name, or None if not in range"""
+        if not if_name.startswith(self.prefix):
+            return None
+
+        port = if_name[len(self.prefix) :]
+        if not port.isdigit() or not self.first <= int(port) <= self.last:
+            return None
+
+        return int(port) - self.first
+
+    def __len__(self):
+        return self.last - self.first + 1
+
+    def __str__(self):
+        return f"{self.prefix}{self.first}-{self.last}"
+
+
+# The netcad device-type specs of the project.  The containerlab cEOS devices
+# can use any number of Ethernet ports; the device type defines how many are
+# used.
+
+DEVICE_TYPES_DIR = Path(".netcad") / "device-types"
+
+
+class PortAllocator:
+    """
+    Allocates the ports of a single device.  Ports are allocated lowest first,
+    using a cursor that only moves forward, so that finding the next free port
+    is constant time; ports that are reserved by name are skipped.
+
+    Attributes
+    ----------
+    device_name: str
+        The device hostname, used in the error messages.
+
+    port_range: PortRange
+        The ports of the device.
+
+    owners: Dict[str, str]
+        The owner of each allocated port, by interface name.
+    """
+
+    def __init__(self, device_name: str, port_range: PortRange):
+        self.device_name = device_name
+        self.port_range = port_range
+        self.owners: Dict[str, str] = dict()
+
+        self._next = 0
+
+    @property
+    def available(self) -> int:
+        """the number of free ports"""
+        return len(self.port_range) - len(self.owners)
+
+    def allocate(self, count: int, owner: str) -> List[str]:
+        """
+        Allocate the next free ports, lowest first.
+
+        Parameters
+        ----------
+        count: int
+            The number of ports.
+
+        owner: str
+            The owner of the ports, usually the peer device hostname.
+
+        Returns
+        -------
+        List[str]
+            The interface names of the ports.
+
+        Raises
+        ------
+        PortAllocationError
+            When the device does not have enough free ports.
+        """
+        self._check_capacity(count, owner)
+
+        allocated = list()
+        while len(allocated) < count:
+            if_name = self.port_range.name(self._next)
+            self._next += 1
+            if if_name not in self.owners:
+                self.owners[if_name] = owner
+                allocated.append(if_name)
+
+        return allocated
+
+    def allocate_last(self, count: int, owner: str) -> List[str]:
+        """
+        Allocate the last ports of the range; for example the uplink ports of
+        an access switch.  The ports are returned in interface order.
+
+        Raises
+        ------
+        PortAllocationError
+            When any of the ports is already allocated; none of the ports are
+            allocated.
+        """
+        self._check_capacity(count, owner)
+        size = len(self.port_range)
+        if_names = [self.port_range.name(idx) for idx in range(size - count, size)]
+
+        for if_name in if_names:
+            if (prior := self.owners.get(if_name, owner)) != owner:
+                raise PortAllocationError(
+                    f"{self.device_name}: {if_name} for {owner} already allocated to {prior}"
+                )
+
+        return [self.reserve(if_name, owner) for if_name in if_names]
+
+    def reserve(self, if_name: str, owner: str) -> str:
+        """
+        Allocate the port by interface name.
+
+        Raises
+        ------
+        PortAllocationError
+            When the port is not in the device port range, or is already
+            allocated.
+        """
+        if self.port_range.index(if_name) is None:
+            raise PortAllocationError(
+                f"{self.device_name}: {if_name} for {owner} is not in the "
+                f"port range {self.port_range}"
+            )
+
+        if (prior := self.owners.setdefault(if_name, owner)) != owner:
+            raise PortAllocationError(
+                f"{self.device_name}: {if_name} for {owner} already allocated to {prior}"
+            )
+
+        return if_name
+
+    def release(self, if_names: List[str]):
+        """
+        Release the allocated ports, so that they can be allocated again; for
+        example when cabling fails after the ports were allocated.
+        """
+        for if_name in if_names:
+            if self.owners.pop(if_name, None) is not None:
+                self._next = min(self._next, self.port_range.index(if_name))
+
+    def owner(self, if_name: str) -> Optional[str]:
+        """returns the owner of the port, if allocated"""
+        return self.owners.get(if_name)
+
+    def _check_capacity(self, count: int, owner: str):
+        """raises PortAllocationError if fewer than count ports are free"""
+        if count > self.available:
+            raise PortAllocationError(
+                f"{self.device_name}: no capacity for {count} ports to {owner}; "
+                f"{self.available} of {len(self.port_range)} ports free in "
+                f"{self.port_range}"
+            )
+
+
+def read_device_type_ports(filepath: Path) -> Optional[PortRange]:
+    """
+    Returns the port range of the netcad device-type spec file, from the names
+    of the interfaces that are not management-only; or None when the device
+    type has no numbered ports, for example an access point.
+
+    Raises
+    ------
+    PortAllocationError
+        When the numbered ports are not one contiguous range with one prefix.
+    """
+    spec = json.loads(filepath.read_text())
+    ports = [
+        mo.groups()
+        for iface in spec["interfaces"]
+        if not iface.get("mgmt_only")
+        and (mo := re.match(r"^(\D+)(\d+)$", iface["name"]))
+    ]
+    if not ports:
+        return None
+
+    prefixes = {prefix for prefix, _ in ports}
+    numbers = sorted(int(number) for _, number in ports)
+    if len(prefixes) != 1 or numbers != list(range(numbers[0], numbers[-1] + 1)):
+        raise PortAllocationError(
+            f"{filepath}: device type ports are not a single contiguous range"
+        )
+
+    return PortRange(prefixes.pop(), numbers[0], numbers[-1])
+
+
+def get_port_ranges(
+    design_config: Optional[dict] = None,
+    device_types_dir: Path = DEVICE_TYPES_DIR,
+) -> Dict[str, PortRange]:
+    """
+    Returns the port range of each device type; the ranges of the device-type
+    specs updated with the design config "port_ranges" value.
+
+    Parameters
+    ----------
+    design_config: dict, optional
+        The design config, as defined in the `netcad.toml` file.
+
+    device_types_dir: Path, optional
+        The directory of the netcad device-type spec files.
+
+    Raises
+    ------
+    PortAllocationError
+        When a port range value, or device-type spec, is not valid.
+    """
+    config_ranges: Dict[str, Union[str, PortRange]] = (design_config or {}).get(
+        "port_ranges", {}
+    )
+
+    port_ranges = dict(_device_type_port_ranges(device_types_dir))
+    port_ranges.update(
+        (device_type, PortRange.parse(value) if isinstance(value, str) else value)
+        for device_type, value in config_ranges.items()
+    )
+    return port_ranges
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+@lru_cache()
+def _device_type_port_ranges(device_types_dir: Path) -> Dict[str, PortRange]:
+    """returns the port range of each device-type spec in the directory"""
+    port_ranges = dict()
+    for filepath in sorted(device_types_dir.glob("*.json")):
+        if port_range := read_device_type_ports(filepath):
+            port_ranges[filepath.stem] = port_range
+
+    return port_ranges
@@ -0,0 +1,264 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the profiling instrumentation used to determine where the
+# time goes when building and rendering designs.  The design pipeline phases
+# are wrapped in timing spans, which cost (nearly) nothing when profiling is
+# not enabled.  Optionally the process can be profiled with cProfile, saved
+# as a .pstats file, or sampled into a collapsed-stack file for use with
+# flamegraph tooling.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Optional, Dict, List
+from pathlib import Path
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+import cProfile
+import signal
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "Profiler",
+    "start_profiling",
+    "stop_profiling",
+    "is_profiling",
+    "span",
+    "for_design",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# the active profiler, if any.
+
+_profiler: Optional["Profiler"] = None
+
+
+class Profiler:
+    """
+    Collects the phase timing spans per design, and optionally runs either
+    cProfile or the stack sampler.
+
+    Attributes
+    ----------
+    spans: Dict[str, Dict[str, List]]
+        The [count, seconds] of each phase, by design name.  The span time is
+        inclusive of any nested spans.
+
+    output: Path, optional
+        The profile output file.  When the file suffix is ".pstats" then
+        cProfile is used, otherwise the stack sampler is used and the file
+        will contain collapsed stacks.
+    """
+
+    def __init__(self, output: Optional[Path] = None):
+        self.spans: Dict[str, Dict[str, List]] = defaultdict(dict)
+        self.design: str = "-"
+        self.output = output
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    def start(self):
+        """start the profiler; and cProfile or the sampler if requested"""
+        if not self.output:
+            return
+
+        if self.output.suffix == ".pstats":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = StackSampler()
+            self._sampler.start()
+
+    def stop(self):
+        """stop the profiler and save the output file, if requested"""
+        if self._cprofile:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(str(self.output))
+
+        elif self._sampler:
+            self._sampler.stop()
+            self._sampler.save(self.output)
+
+    def add(self, phase: str, secs: float):
+        """add the span time to the phase of the current design"""
+        entry = self.spans[self.design].setdefault(phase, [0, 0.0])
+        entry[0] += 1
+        entry[1] += secs
+
+    def report(self):
+        """print the per-design phase table, and the output file if any"""
+        phases = list(dict.fromkeys(p for d in self.spans.values() for p in d))
+        name_w = max([len("design"), *map(len, self.spans)])
+
+        print(f"{'design':<{name_w}} " + " ".join(f"{p:>24}" for p in phases))
+
+        for design_name, design_spans in self.spans.items():
+            cols = list()
+            for phase in phases:
+                count, secs = design_spans.get(phase, (0, 0.0))
+                cols.append(f"{secs:>16.3f}s ({count:>3})" if count else f"{'-':>24}")
+            print(f"{design_name:<{name_w}} " + " ".join(cols))
+
+        if self.output:
+            print(f"SAVE: {self.output}")
+
+
+class StackSampler:
+    """
+    A statistical profiler that samples the Python call stack, using the
+    SIGPROF interval timer, and records the samples as collapsed stacks; that
+    is one line per unique stack "frame;frame;frame count".  This is the format
+    used by flamegraph.pl, speedscope, and others.
+
+    Notes
+    -----
+    Only the main thread is sampled, and only on Unix systems.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = Counter()
+
+    def start(self):
+        """start sampling"""
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """stop sampling"""
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def save(self, output: Path):
+        """save the collapsed stacks to the output file"""
+        with output.open("w") as ofile:
+            for stack, count in self.samples.most_common():
+                ofile.write(f"{stack} {count}\n")
+
+    def _sample(self, _signum, frame):
+        """signal handler, records the current stack"""
+        stack = list()
+        while frame:
+            code = frame.f_code
+            stack.append(
+                f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+            )
+            frame = frame.f_back
+
+        self.samples[";".join(reversed(stack))] += 1
+
+
+def start_profiling(output: Optional[Path] = None) -> Profiler:
+    """
+    Start profiling; the timing spans are collected from this point on.
+
+    Parameters
+    ----------
+    output: Path, optional
+        The profile output file, see `Profiler`.
+
+    Returns
+    -------
+    Profiler
+        The active profiler.
+    """
+    global _profiler
+    _profiler = Profiler(output=output)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiling(report: bool = True):
+    """
+    Stop profiling, and print the report.
+    """
+    global _profiler
+    if not _profiler:
+        return
+
+    profiler, _profiler = _profiler, None
+    profiler.stop()
+
+    if report:
+        profiler.report()
+
+
+def is_profiling() -> bool:
+    """returns True when profiling is active"""
+    return _profiler is not None
+
+
+@contextmanager
+def span(phase: str):
+    """
+    Time the enclosed code as the named phase of the current design.  When
+    profiling is not active this does nothing.
+
+    Parameters
+    ----------
+    phase: str
+        The phase name, for example "design.update".
+    """
+    if not (profiler := _profiler):
+        yield
+        return
+
+    ts_start = perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(phase, perf_counter() - ts_start)
+
+
+@contextmanager
+def for_design(design_name: str):
+    """
+    The spans within the enclosed code are recorded for the named design.
+
+    Parameters
+    ----------
+    design_name: str
+        The design name.
+    """
+    if not (profiler := _profiler):
+        yield
+        return
+
+    prev_design, profiler.design = profiler.design, design_name
+    try:
+        yield
+    finally:
+        profiler.design = prev_design
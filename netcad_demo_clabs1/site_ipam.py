@@ -0,0 +1,450 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Jeremy Schulman
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+
+# =============================================================================
+# This file contains the campus-wide IP Address Management for the VLAN
+# subnets.  Each VLAN role, phones, printers, etc., is given a supernet for the
+# entire campus.  The supernet is carved into one block per building, and each
+# building block is carved into one subnet per floor:
+#
+#     supernet 10.101.0.0/16  (Employee_Desk)
+#       building 1  10.101.0.0/20
+#         floor 1   10.101.1.0/24
+#         floor 2   10.101.2.0/24
+#       building 2  10.101.16.0/20
+#         floor 9   10.101.25.0/24
+#
+# The building and floor subnets are computed arithmetically from the building
+# and floor ID values, so the same floor is always given the same subnets.  All
+# of the carved subnets are indexed in a prefix trie so that containment and
+# overlap questions, "which floor owns this address?", are answered by walking
+# at most 32 nodes.
+#
+# The supernets, and the building and floor prefix lengths, can be changed
+# using the design config values "site_supernets", "site_building_prefixlen",
+# and "site_floor_prefixlen" in the `netcad.toml` file.
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# System Imports
+# -----------------------------------------------------------------------------
+
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple, Union
+from functools import lru_cache
+from ipaddress import IPv4Address, IPv4Network
+
+# -----------------------------------------------------------------------------
+# Public Imports
+# -----------------------------------------------------------------------------
+
+from netcad.vlans import VlanProfile
+
+# -----------------------------------------------------------------------------
+# Private Imports
+# -----------------------------------------------------------------------------
+
+from . import vlans
+
+# -----------------------------------------------------------------------------
+# Exports
+# -----------------------------------------------------------------------------
+
+__all__ = [
+    "SiteIPAM",
+    "SiteIPAMError",
+    "PrefixTrie",
+    "get_site_ipam",
+    "SITE_VLAN_ROLES",
+    "DEFAULT_SITE_SUPERNETS",
+    "DEFAULT_SITE_BUILDING_PREFIXLEN",
+    "DEFAULT_SITE_FLOOR_PREFIXLEN",
+]
+
+
+# -----------------------------------------------------------------------------
+#
+#                                 CODE BEGINS
+#
+# -----------------------------------------------------------------------------
+
+# The VLAN roles that are given a subnet on each floor, and the default campus
+# supernet of each.  The building-1 / floor-1 subnets of the phones, WiFi,
+# desk, and inband management VLANs are the same as those used before the
+# campus IPAM existed.  The printers and IPTV subnets were renumbered, a
+# breaking change for existing labs: printers from 10.10.2.0/24 to
+# 10.11.1.0/24, and IPTV from 10.10.3.0/24 to 10.12.1.0/24.
+
+SITE_VLAN_ROLES = (
+    vlans.vlan_phones,
+    vlans.vlan_printers,
+    vlans.vlan_media_iptvs,
+    vlans.vlan_wifi_employee,
+    vlans.vlan_employee_desk,
+    vlans.vlan_wifi_visitor,
+    vlans.vlan_inband_mgmt,
+)
+
+DEFAULT_SITE_SUPERNETS = {
+    vlans.vlan_phones.name: "10.10.0.0/16",
+    vlans.vlan_printers.name: "10.11.0.0/16",
+    vlans.vlan_media_iptvs.name: "10.12.0.0/16",
+    vlans.vlan_wifi_employee.name: "10.100.0.0/16",
+    vlans.vlan_employee_desk.name: "10.101.0.0/16",
+    vlans.vlan_wifi_visitor.name: "10.200.0.0/16",
+    vlans.vlan_inband_mgmt.name: "10.254.0.0/16",
+}
+
+# a /20 per building has room for floors 0-15 using a /24 per floor.
+
+DEFAULT_SITE_BUILDING_PREFIXLEN = 20
+DEFAULT_SITE_FLOOR_PREFIXLEN = 24
+
+
+class SiteIPAMError(ValueError):
+    """
+    Raised when a subnet cannot be carved; either the building or floor ID is
+    outside the supernet, or the supernets overlap.
+    """
+
+
+class _TrieNode:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children: List[Optional["_TrieNode"]] = [None, None]
+        self.entry: Optional[Tuple[IPv4Network, Hashable]] = None
+
+
+class PrefixTrie:
+    """
+    A binary trie of IPv4 prefixes, one node per prefix bit.  Each prefix
+    stored in the trie is associated with an owner value.
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, prefix: Union[str, IPv4Network], owner: Hashable):
+        """
+        Store the prefix, and its owner.  Storing the same prefix again with the
+        same owner has no effect.
+
+        Raises
+        ------
+        SiteIPAMError
+            When the prefix is already stored with a different owner.
+        """
+        prefix = IPv4Network(prefix)
+        node = self._root
+
+        for bit in self._bits(prefix):
+            if (child := node.children[bit]) is None:
+                child = node.children[bit] = _TrieNode()
+            node = child
+
+        if node.entry:
+            if node.entry[1] != owner:
+                raise SiteIPAMError(
+                    f"{prefix}: already assigned to {node.entry[1]}, not {owner}"
+                )
+            return
+
+        node.entry = (prefix, owner)
+        self._count += 1
+
+    def get(self, prefix: Union[str, IPv4Network]) -> Optional[Hashable]:
+        """returns the owner of the exact prefix, if stored"""
+        node = self._find(IPv4Network(prefix))
+        return node.entry[1] if node and node.entry else None
+
+    def longest_match(
+        self, address: Union[str, IPv4Address, IPv4Network]
+    ) -> Optional[Tuple[IPv4Network, Hashable]]:
+        """
+        Returns the most specific stored (prefix, owner) that contains the
+        address, or network; None if there is no such prefix.
+        """
+        found = None
+        for entry in self.covering(address):
+            found = entry
+        return found
+
+    def covering(
+        self, address: Union[str, IPv4Address, IPv4Network]
+    ) -> Iterator[Tuple[IPv4Network, Hashable]]:
+        """
+        Yields the stored (prefix, owner) entries that contain the address, or
+        network, from the least to most specific.
+        """
+        prefix = IPv4Network(address)
+        node = self._root
+
+        for bit in self._bits(prefix):
+            if node.entry:
+                yield node.entry
+            if (node := node.children[bit]) is None:
+                return
+
+        if node.entry:
+            yield node.entry
+
+    def overlaps(
+        self, prefix: Union[str, IPv4Network]
+    ) -> List[Tuple[IPv4Network, Hashable]]:
+        """
+        Returns the stored (prefix, owner) entries that overlap the prefix;
+        that is, those that contain the prefix and those contained by it.
+        """
+        prefix = IPv4Network(prefix)
+        found = list(self.covering(prefix))
+
+        if (node := self._find(prefix)) is None:
+            return found
+
+        # the covering entries include the exact prefix, if stored, so only the
+        # more specific entries below the node are added.
+
+        stack = [child for child in node.children if child]
+        while stack:
+            node = stack.pop()
+            if node.entry:
+                found.append(node.entry)
+            stack.extend(child for child in node.children if child)
+
+        return found
+
+    # -------------------------------------------------------------------------
+    # Private methods
+    # -------------------------------------------------------------------------
+
+    def _find(self, prefix: IPv4Network) -> Optional[_TrieNode]:
+        """returns the node for the prefix, if it exists"""
+        node = self._root
+        for bit in self._bits(prefix):
+            if (node := node.children[bit]) is None:
+                return None
+        return node
+
+    @staticmethod
+    def _bits(prefix: IPv4Network) -> Iterator[int]:
+        """yields the prefix bits, most significant first"""
+        value = int(prefix.network_address)
+        for shift in range(31, 31 - prefix.prefixlen, -1):
+            yield (value >> shift) & 1
+
+
+class SiteIPAM:
+    """
+    The campus-wide VLAN subnets.  Each VLAN role supernet is carved into one
+    block per building, and each block is carved into one subnet per floor.
+    Buildings are numbered from 1, and floors from 0.
+
+    Attributes
+    ----------
+    supernets: Dict[VlanProfile, IPv4Network]
+        The campus supernet of each VLAN role.
+
+    building_prefixlen: int
+        The prefix length of each building block.
+
+    floor_prefixlen: int
+        The prefix length of each floor subnet.
+
+    trie: PrefixTrie
+        The supernets, and the floor subnets carved so far.  The owner of a
+        supernet is the VLAN, and the owner of a floor subnet is the tuple
+        (VLAN, bld_id, flr_id).
+    """
+
+    def __init__(
+        self,
+        supernets: Dict[VlanProfile, Union[str, IPv4Network]],
+        building_prefixlen: int = DEFAULT_SITE_BUILDING_PREFIXLEN,
+        floor_prefixlen: int = DEFAULT_SITE_FLOOR_PREFIXLEN,
+    ):
+        self.supernets = {
+            vlan: IPv4Network(prefix) for vlan, prefix in supernets.items()
+        }
+        self.building_prefixlen = building_prefixlen
+        self.floor_prefixlen = floor_prefixlen
+        self.trie = PrefixTrie()
+
+        for vlan, supernet in self.supernets.items():
+            if not supernet.prefixlen <= building_prefixlen <= floor_prefixlen <= 30:
+                raise SiteIPAMError(
+                    f"{vlan.name}: building /{building_prefixlen} and floor "
+                    f"/{floor_prefixlen} prefix lengths not valid for "
+                    f"supernet {supernet}"
+                )
+
+            if overlaps := self.trie.overlaps(supernet):
+                raise SiteIPAMError(
+                    f"{vlan.name}: supernet {supernet} overlaps "
+                    f"{overlaps[0][1].name} supernet {overlaps[0][0]}"
+                )
+
+            self.trie.insert(supernet, vlan)
+
+        self.max_floors = 1 << (floor_prefixlen - building_prefixlen)
+        self._floors: Dict[Tuple[int, int], Dict[VlanProfile, IPv4Network]] = dict()
+
+    def building(self, vlan: VlanProfile, bld_id: int) -> IPv4Network:
+        """
+        Returns the VLAN building block for the building ID.
+
+        Raises
+        ------
+        SiteIPAMError
+            When the building ID is outside the VLAN supernet.
+        """
+        supernet = self.supernets[vlan]
+        max_buildings = 1 << (self.building_prefixlen - supernet.prefixlen)
+
+        if not 1 <= bld_id <= max_buildings:
+            raise SiteIPAMError(
+                f"bld_id {bld_id} out of range; {vlan.name} supernet {supernet} "
+                f"has {max_buildings} /{self.building_prefixlen} building blocks"
+            )
+
+        block_size = 1 << (32 - self.building_prefixlen)
+        return IPv4Network(
+            (
+                int(supernet.network_address) + (bld_id - 1) * block_size,
+                self.building_prefixlen,
+            )
+        )
+
+    def floor(self, vlan: VlanProfile, bld_id: int, flr_id: int) -> IPv4Network:
+        """
+        Returns the VLAN subnet for the building and floor ID.
+
+        Raises
+        ------
+        SiteIPAMError
+            When the building or floor ID is out of range.
+        """
+        if not 0 <= flr_id < self.max_floors:
+            raise SiteIPAMError(
+                f"flr_id {flr_id} out of range; a /{self.building_prefixlen} "
+                f"building block has {self.max_floors} /{self.floor_prefixlen} "
+                f"floor subnets"
+            )
+
+        block = self.building(vlan, bld_id)
+        subnet_size = 1 << (32 - self.floor_prefixlen)
+        return IPv4Network(
+            (
+                int(block.network_address) + flr_id * subnet_size,
+                self.floor_prefixlen,
+            )
+        )
+
+    def floor_subnets(self, bld_id: int, flr_id: int) -> Dict[VlanProfile, IPv4Network]:
+        """
+        Returns the subnet of each VLAN role for the building and floor ID.  The
+        subnets are carved, and added to the trie, on first use.
+        """
+        if subnets := self._floors.get((bld_id, flr_id)):
+            return subnets
+
+        subnets = {vlan: self.floor(vlan, bld_id, flr_id) for vlan in self.supernets}
+
+        for vlan, subnet in subnets.items():
+            self.trie.insert(subnet, (vlan, bld_id, flr_id))
+
+        self._floors[(bld_id, flr_id)] = subnets
+        return subnets
+
+    def owner(
+        self, address: Union[str, IPv4Address, IPv4Network]
+    ) -> Optional[Tuple[VlanProfile, int, int]]:
+        """
+        Returns the (VLAN, bld_id, flr_id) of the floor subnet containing the
+        address, or None if the address is not within a carved floor subnet.
+        """
+        if (found := self.trie.longest_match(address)) is None:
+            return None
+
+        owner = found[1]
+        return owner if isinstance(owner, tuple) else None
+
+
+def get_site_ipam(design_config: dict) -> SiteIPAM:
+    """
+    Returns the campus IPAM for the design config values "site_supernets",
+    "site_building_prefixlen", and "site_floor_prefixlen".  The IPAM is shared
+    by all designs using the same values in this process.
+
+    Parameters
+    ----------
+    design_config: dict
+        The design config, as defined in the `netcad.toml` file.
+
+    Returns
+    -------
+    SiteIPAM
+
+    Raises
+    ------
+    SiteIPAMError
+        When the "site_supernets" value names a VLAN that is not one of the
+        DEFAULT_SITE_SUPERNETS, for example a misspelled name.
+    """
+    config_supernets = design_config.get("site_supernets", {})
+
+    if unknown := set(config_supernets) - set(DEFAULT_SITE_SUPERNETS):
+        raise SiteIPAMError(
+            f"site_supernets: unknown VLAN names {', '.join(sorted(unknown))}; "
+            f"expected one of {', '.join(DEFAULT_SITE_SUPERNETS)}"
+        )
+
+    supernets = {**DEFAULT_SITE_SUPERNETS, **config_supernets}
+
+    return _get_site_ipam(
+        tuple(sorted(supernets.items())),
+        design_config.get("site_building_prefixlen", DEFAULT_SITE_BUILDING_PREFIXLEN),
+        design_config.get("site_floor_prefixlen", DEFAULT_SITE_FLOOR_PREFIXLEN),
+    )
+
+
+# -----------------------------------------------------------------------------
+# Private functions
+# -----------------------------------------------------------------------------
+
+
+@lru_cache()
+def _get_site_ipam(
+    supernets: Tuple[Tuple[str, str], ...],
+    building_prefixlen: int,
+    floor_prefixlen: int,
+) -> SiteIPAM:
+    """cached by the config values; see `get_site_ipam`"""
+    by_name = dict(supernets)
+    return SiteIPAM(
+        {vlan: by_name[vlan.name] for vlan in SITE_VLAN_ROLES},
+        building_prefixlen=building_prefixlen,
+        floor_prefixlen=floor_prefixlen,
+    )
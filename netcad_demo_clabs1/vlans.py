@@ -32,7 +32,7 @@ vlan_phones = VlanProfile(vlan_id=10, name="Phones", description="Voip Phone por
 vlan_printers = VlanProfile(vlan_id=20, name="Printers", description="Printer ports")
 
 vlan_media_iptvs = VlanProfile(
-    vlan_id=20, name="IPTV", description="IPTV set-top-boxes"
+    vlan_id=30, name="IPTV", description="IPTV set-top-boxes"
 )
 
 vlan_inband_mgmt = VlanProfile(
@@ -3,6 +3,7 @@ from setuptools import setup
 
 packages = [
     "netcad_demo_clabs1",
+    "netcad_demo_clabs1.benchmarks",
     "netcad_demo_clabs1.designs",
     "netcad_demo_clabs1.device_roles",
     "netcad_demo_clabs1.plugins",